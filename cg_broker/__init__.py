@@ -32,6 +32,8 @@ BrokerConfig = TypedDict(  # pylint: disable=invalid-name
         'MAX_AMOUNT_OF_RUNNERS_PER_JOB': int,
         'CELERY_CONFIG': t.Dict,
         'RUNNER_MAX_TIME_ALIVE': int,
+        'RUNNER_MAX_JOB_WAIT': int,
+        'RUNNER_MAX_JOB_WAITERS': int,
         'SECRET_KEY': str,
         'ADMIN_PASSWORD': str,
         'START_TIMEOUT_TIME': int,
@@ -142,6 +144,20 @@ class BrokerFlask(flask.Flask):
             'RUNNER_MAX_TIME_ALIVE', fallback=60
         )
 
+        # The maximum amount of seconds a runner may wait for new jobs in a
+        # single request.
+        self.config['RUNNER_MAX_JOB_WAIT'] = _parser['General'].getint(
+            'RUNNER_MAX_JOB_WAIT', fallback=30
+        )
+
+        # The maximum amount of requests of runners that may wait for new jobs
+        # at the same time, per web process. Every waiting request keeps a web
+        # worker busy, so this should be lower than the amount of workers (or
+        # threads) of a process.
+        self.config['RUNNER_MAX_JOB_WAITERS'] = _parser['General'].getint(
+            'RUNNER_MAX_JOB_WAITERS', fallback=4
+        )
+
         self.config['_TRANSIP_USERNAME'] = _parser['General'].get(
             'TRANSIP_USERNAME', ''
         )
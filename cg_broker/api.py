@@ -4,6 +4,7 @@
 
 SPDX-License-Identifier: AGPL-3.0-only
 """
+import time
 import uuid
 import typing as t
 import secrets
@@ -125,6 +126,7 @@ def register_job() -> cg_json.JSONResponse:
             lambda: tasks.maybe_start_runners_for_job.delay(job_id)
         )
 
+    models.Job.notify_changes()
     db.session.commit()
 
     return cg_json.jsonify(job)
@@ -285,7 +287,18 @@ def mark_runner_as_alive() -> cg_json.JSONResponse[models.Runner]:
 @api.route('/runners/<uuid:public_runner_id>/jobs/', methods=['GET'])
 def get_jobs_for_runner(public_runner_id: uuid.UUID
                         ) -> cg_json.JSONResponse[t.List[t.Mapping[str, str]]]:
-    """Get jobs for a runner"""
+    """Get jobs for a runner.
+
+    If the runner is assigned to a job this job is returned first, including
+    its ``job_id``. After that an item is returned for every instance that has
+    unfinished jobs.
+
+    :qparam wait: The amount of seconds to wait for a job if there are none
+        right now (OPTIONAL). The request returns as soon as a job is
+        registered. This is capped at the ``RUNNER_MAX_JOB_WAIT`` setting.
+        When already ``RUNNER_MAX_JOB_WAITERS`` requests are waiting this
+        request does not wait.
+    """
     runner = db.session.query(models.Runner).filter(
         models.Runner.ipaddr == request.remote_addr,
         models.Runner.public_id == public_runner_id,
@@ -302,18 +315,52 @@ def get_jobs_for_runner(public_runner_id: uuid.UUID
             logger.warning('Got wrong password', found_password=runner_pass)
             raise NotFoundException
 
-    urls = set(
-        url for url, in db.session.query(
-            t.cast(DbColumn[str], models.Job.cg_url),
-        ).filter(
+    runner_id = runner.id
+    wait_time = min(
+        max(request.args.get('wait', 0, type=float), 0),
+        app.config['RUNNER_MAX_JOB_WAIT'],
+    )
+    end_time = time.monotonic() + wait_time
+
+    def get_jobs() -> t.List[t.Mapping[str, str]]:
+        unfinished = db.session.query(models.Job).filter(
             ~t.cast(
                 DbColumn[models.JobState],
                 models.Job.state,
             ).in_(models.JobState.get_finished_states())
         )
-    )
+        res = [
+            {'url': job.cg_url, 'job_id': job.remote_id}
+            for job in unfinished.filter(
+                models.Job.runners.any(models.Runner.id == runner_id)
+            )
+        ]
+        urls = set(
+            url for url, in unfinished.with_entities(
+                t.cast(DbColumn[str], models.Job.cg_url),
+            )
+        )
+        res.extend({'url': url} for url in urls)
+        return res
+
+    jobs = get_jobs()
+    if not jobs and wait_time > 0:
+        with models.Job.listen_for_changes() as wait_for_change:
+            # We don't wait if too many other requests are waiting already.
+            if wait_for_change is not None:
+                # A job might have been registered before we started
+                # listening.
+                jobs = get_jobs()
+            while (
+                wait_for_change is not None and not jobs and
+                time.monotonic() < end_time
+            ):
+                # Don't keep a transaction, or a connection, while waiting.
+                db.session.close()
+                if wait_for_change(end_time - time.monotonic()):
+                    jobs = get_jobs()
 
-    return cg_json.jsonify([{'url': url} for url in urls])
+    return cg_json.jsonify(jobs)
 
 
 @api.route('/ping', methods=['GET'])
@@ -2,15 +2,20 @@
 
 SPDX-License-Identifier: AGPL-3.0-only
 """
+import os
 import enum
 import time
 import uuid
+import select
 import typing as t
 import secrets
+import threading
+import contextlib
 import dataclasses
 from datetime import timedelta
 
 import boto3
+import psycopg2
 import structlog
 import sqlalchemy
 import transip.service
@@ -725,6 +730,7 @@ class Job(Base, mixins.TimestampMixin, mixins.IdMixin):
         for _ in range(needed):
             if unassigned_runners:
                 self.runners.append(unassigned_runners.pop())
+                Job.notify_changes()
             elif startable > 0:
                 runner = Runner.create_of_type(app.config['AUTO_TEST_TYPE'])
                 self.runners.append(runner)
@@ -747,6 +753,166 @@ class Job(Base, mixins.TimestampMixin, mixins.IdMixin):
 
         return len(created)
 
+    # The postgres channel on which a notification is sent when jobs change.
+    _CHANGES_CHANNEL = 'cg_broker_job_changes'
+
+    @classmethod
+    def notify_changes(cls) -> None:
+        """Notify runners waiting for jobs that the jobs have changed.
+
+        The notification is only sent when the current transaction is
+        committed, so waiting runners will see the changes.
+        """
+        db.session.execute(
+            sqlalchemy.text('SELECT pg_notify(:channel, \'\')'),
+            {'channel': cls._CHANGES_CHANNEL},
+        )
+
+    @classmethod
+    @contextlib.contextmanager
+    def listen_for_changes(
+        cls
+    ) -> t.Iterator[t.Optional[t.Callable[[float], bool]]]:
+        """Listen for changes of the jobs.
+
+        All requests of this process share a single listening connection,
+        which is only used by a background thread. Listening starts directly,
+        so no notification is missed between a check for jobs and waiting for
+        a notification.
+
+        :returns: A function that waits at most the given amount of seconds
+            for a change, it returns ``True`` if a change happened. If already
+            ``RUNNER_MAX_JOB_WAITERS`` requests of this process are waiting
+            ``None`` is returned, and you should not wait.
+        """
+        with _JOB_CHANGES_LISTENER.wait_for_changes(
+            db.engine,
+            cls._CHANGES_CHANNEL,
+            app.config['RUNNER_MAX_JOB_WAITERS'],
+        ) as wait_for_change:
+            yield wait_for_change
+
+
+class _JobChangesListener:
+    """Listens for changes of jobs in a background thread, and wakes up the
+    requests waiting for these changes.
+    """
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._generation = 0
+        self._amount_waiting = 0
+        self._thread: t.Optional[threading.Thread] = None
+        self._pid: t.Optional[int] = None
+
+    def _wake_waiters(self) -> None:
+        with self._cond:
+            self._generation += 1
+            self._cond.notify_all()
+
+    def _ensure_started(
+        self, engine: sqlalchemy.engine.Engine, channel: str
+    ) -> None:
+        # The lock of `_cond` is always held when this method is called.
+        if (
+            self._thread is not None and self._thread.is_alive() and
+            self._pid == os.getpid()
+        ):
+            return
+
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run,
+            args=(engine, channel),
+            name='job-changes-listener',
+            daemon=True,
+        )
+        self._thread.start()
+
+    def _run(self, engine: sqlalchemy.engine.Engine, channel: str) -> None:
+        while True:
+            try:
+                self._listen(engine, channel)
+            except:  # pylint: disable=bare-except
+                logger.warning(
+                    'Listening for job changes failed', exc_info=True
+                )
+            # We might have missed notifications, so let all waiters check
+            # for jobs again.
+            self._wake_waiters()
+            time.sleep(1)
+
+    def _listen(self, engine: sqlalchemy.engine.Engine, channel: str) -> None:
+        conn = engine.raw_connection()
+        # This connection is never given back to the pool, as it stays in
+        # autocommit mode and keeps listening.
+        conn.detach()
+        try:
+            dbapi_conn = conn.connection
+            dbapi_conn.set_isolation_level(
+                psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT
+            )
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f'LISTEN {channel}')
+            # Notifications sent before we started listening were missed.
+            self._wake_waiters()
+
+            while True:
+                select.select([dbapi_conn], [], [], 60)
+                dbapi_conn.poll()
+                if dbapi_conn.notifies:
+                    dbapi_conn.notifies.clear()
+                    self._wake_waiters()
+        finally:
+            conn.close()
+
+    @contextlib.contextmanager
+    def wait_for_changes(
+        self,
+        engine: sqlalchemy.engine.Engine,
+        channel: str,
+        max_waiting: int,
+    ) -> t.Iterator[t.Optional[t.Callable[[float], bool]]]:
+        """Wait for changes of the jobs.
+
+        :param engine: The engine used to create the listening connection.
+        :param channel: The channel on which changes are notified, this
+            should be the same for every call.
+        :param max_waiting: The maximum amount of requests of this process
+            that may wait at the same time.
+        :returns: See :meth:`Job.listen_for_changes`.
+        """
+        with self._cond:
+            may_wait = self._amount_waiting < max_waiting
+            if may_wait:
+                self._amount_waiting += 1
+                self._ensure_started(engine, channel)
+            generation = self._generation
+
+        if not may_wait:
+            yield None
+            return
+
+        def wait_for_change(timeout: float) -> bool:
+            nonlocal generation
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._generation != generation,
+                    timeout=max(timeout, 0),
+                )
+                changed = self._generation != generation
+                generation = self._generation
+            return changed
+
+        try:
+            yield wait_for_change
+        finally:
+            with self._cond:
+                self._amount_waiting -= 1
+
+
+_JOB_CHANGES_LISTENER = _JobChangesListener()
+
 
 @dataclasses.dataclass(frozen=True)
 class _PossibleSetting(t.Generic[T]):
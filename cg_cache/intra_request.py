@@ -8,7 +8,7 @@ from functools import wraps
 from collections import defaultdict
 
 import structlog
-from flask import Flask, g
+from flask import Flask, Response, g, stream_with_context
 from typing_extensions import Protocol
 
 from cg_sqlalchemy_helpers.types import ColumnProxy
@@ -37,8 +37,22 @@ def _set_g_vars() -> None:
     g.cg_function_cache = defaultdict(dict)
 
 
-def _clear_g_vars(value: Y) -> Y:
-    _set_g_vars()
+def _clear_g_vars_after(body: t.Iterable[bytes]) -> t.Iterator[bytes]:
+    try:
+        yield from body
+    finally:
+        _set_g_vars()
+
+
+def _clear_g_vars(value: Response) -> Response:
+    if value.is_streamed and not value.direct_passthrough:
+        # The body of the response is still being produced, which might use
+        # the cache, so only clear it when it is done.
+        value.response = stream_with_context(
+            _clear_g_vars_after(value.response)
+        )
+    else:
+        _set_g_vars()
     return value
 
 
@@ -1,3 +1,5 @@
+import flask
+
 import cg_cache.intra_request as c
 
 
@@ -123,3 +125,31 @@ def test_with_object_id(app):
         assert obj2.get_self() is obj2
         assert obj1.get_self() is obj3
         assert amount_called == 4
+
+
+def test_cache_in_streamed_response(app):
+    lst = []
+
+    @c.cache_within_request
+    def fun(a):
+        lst.append(a)
+        return a
+
+    def produce():
+        for _ in range(3):
+            yield str(fun(1))
+
+    app.add_url_rule(
+        '/streamed_cache',
+        'streamed_cache',
+        lambda: flask.Response(flask.stream_with_context(produce())),
+    )
+
+    with app.app_context():
+        with app.test_client() as client:
+            assert client.get('/streamed_cache').get_data() == b'111'
+            # The cache should be kept while the body is produced.
+            assert lst == [1]
+            # But it should be cleared after the request.
+            assert fun(1) == 1
+            assert lst == [1, 1]
@@ -6,7 +6,7 @@ import enum
 import json as system_json
 import uuid
 import typing as t
-import contextlib
+import operator
 from json import JSONEncoder
 
 import flask
@@ -14,6 +14,7 @@ import structlog
 from flask import current_app
 
 T = t.TypeVar('T')
+Z = t.TypeVar('Z')
 logger = structlog.get_logger()
 
 
@@ -113,43 +114,206 @@ _UseExtendedType = t.Union[t.Callable[[object], bool],
                            t.Tuple[type, ...],
                            ]
 
+_SEPERATORS = (',', ':')
+
+
+def _get_dump_options() -> t.Dict[str, bool]:
+    """Get the options :func:`flask.json.dumps` would use for encoding.
+    """
+    if current_app:
+        return {
+            'ensure_ascii': current_app.config['JSON_AS_ASCII'],
+            'sort_keys': current_app.config['JSON_SORT_KEYS'],
+        }
+    return {'ensure_ascii': True, 'sort_keys': True}
+
+
+def _make_use_extended_callable(use_extended: _UseExtendedType
+                                ) -> t.Callable[[object], bool]:
+    if isinstance(use_extended, (tuple, type)):
+        class_only = use_extended
+        return lambda o: isinstance(o, class_only)
+    return use_extended
+
+
+class JSONSerializer:
+    """The base class of the serializers used by :class:`.JSONResponse`.
+    """
+
+    def dumps(
+        self, obj: object, use_extended: t.Optional[_UseExtendedType]
+    ) -> bytes:
+        """Serialize the given object to JSON.
+
+        :param obj: The object to serialize.
+        :param use_extended: If not ``None`` the ``__extended_to_json__``
+            method is used for objects matching it, see
+            :meth:`.ExtendedJSONResponse.make`.
+        :returns: The UTF-8 encoded JSON.
+        """
+        raise NotImplementedError
+
+
+class FlaskJSONSerializer(JSONSerializer):
+    """Serialize objects using :func:`flask.json.dumps` and
+    :class:`.CustomJSONEncoder`.
+
+    This calls a Python level ``default`` method for every custom object and
+    is therefore quite slow, but it is the reference for the output of the
+    other serializers.
+    """
+
+    def dumps(
+        self, obj: object, use_extended: t.Optional[_UseExtendedType]
+    ) -> bytes:
+        if use_extended is None:
+            encoder = CustomJSONEncoder
+        else:
+            encoder = get_extended_encoder_class(
+                _make_use_extended_callable(use_extended)
+            )
+
+        return flask.json.dumps(
+            obj,
+            cls=encoder,
+            indent=None,
+            separators=_SEPERATORS,
+        ).encode('utf-8')
+
+
+_ToJSON = t.Callable[[t.Any], t.Any]
+
+
+class DispatchJSONSerializer(JSONSerializer):
+    """Serialize objects using a dispatch table of conversion functions that
+    is cached per class.
+
+    The output is exactly the same as the output of
+    :class:`.FlaskJSONSerializer`, as the same (C) encoder with the same
+    options is used. The difference is that finding out how to convert an
+    object is done only once for every class instead of for every object.
+    """
+
+    def __init__(self) -> None:
+        self._to_json: t.Dict[type, _ToJSON] = {}
+        self._extended: t.Dict[object, t.Dict[type, _ToJSON]] = {}
+
+    @staticmethod
+    def _is_plain(o: object) -> bool:
+        # Objects that lie about their class (like proxies) or produce their
+        # attributes dynamically cannot be looked up by their class.
+        cls = type(o)
+        return o.__class__ is cls and not hasattr(cls, '__getattr__')
+
+    @staticmethod
+    def _default(o: t.Any) -> t.Any:
+        """Convert ``o`` in exactly the same way as
+        :meth:`.CustomJSONEncoder.default`.
+        """
+        if isinstance(o, uuid.UUID):
+            return str(o)
+        elif hasattr(o, '__to_json__'):
+            return o.__to_json__()
+        raise TypeError(
+            f'Object of type {o.__class__.__name__} is not JSON serializable'
+        )
+
+    def _find_to_json(self, o: object) -> _ToJSON:
+        cls = type(o)
+        if not self._is_plain(o):
+            return self._default
+        elif issubclass(cls, uuid.UUID):
+            return str
+        elif hasattr(cls, '__to_json__'):
+            return operator.methodcaller('__to_json__')
+        return self._default
+
+    def _find_extended_to_json(
+        self, o: object, class_only: t.Union[type, t.Tuple[type, ...]]
+    ) -> _ToJSON:
+        cls = type(o)
+        if not self._is_plain(o):
+
+            def slow_default(o: t.Any) -> t.Any:
+                if hasattr(o, '__extended_to_json__'
+                           ) and isinstance(o, class_only):
+                    return o.__extended_to_json__()
+                return self._default(o)
+
+            return slow_default
+        elif (
+            hasattr(cls, '__extended_to_json__') and
+            issubclass(cls, class_only)
+        ):
+            return operator.methodcaller('__extended_to_json__')
+        return self._find_to_json(o)
+
+    def _get_default(self, use_extended: t.Optional[_UseExtendedType]
+                     ) -> _ToJSON:
+        if use_extended is None:
+            table = self._to_json
+            find = self._find_to_json
+        elif isinstance(use_extended, (tuple, type)):
+            class_only = use_extended
+            table = self._extended.setdefault(class_only, {})
+            find = lambda o: self._find_extended_to_json(o, class_only)
+        else:
+            use_extended_fun = use_extended
+            to_json_default = self._get_default(None)
+
+            def callable_default(o: t.Any) -> t.Any:
+                if hasattr(o, '__extended_to_json__') and use_extended_fun(o):
+                    return o.__extended_to_json__()
+                return to_json_default(o)
+
+            return callable_default
+
+        def default(o: object) -> t.Any:
+            try:
+                to_json = table[type(o)]
+            except KeyError:
+                to_json = table[type(o)] = find(o)
+            return to_json(o)
+
+        return default
+
+    def dumps(
+        self, obj: object, use_extended: t.Optional[_UseExtendedType]
+    ) -> bytes:
+        return JSONEncoder(
+            indent=None,
+            separators=_SEPERATORS,
+            default=self._get_default(use_extended),
+            **_get_dump_options(),
+        ).encode(obj).encode('utf-8')
+
 
 class JSONResponse(t.Generic[T], flask.Response):  # pylint: disable=too-many-ancestors
     """A datatype for a JSON response.
 
     This is a subtype of :py:class:`werkzeug.wrappers.Response` where the body
     is a valid JSON object and ``content-type`` is ``application/json``.
+
+    :cvar serializer: The serializer used to create the body of the response,
+        this can be replaced by any :class:`.JSONSerializer`.
     """
 
-    _SEPERATORS = (',', ':')
+    serializer: t.ClassVar[JSONSerializer] = DispatchJSONSerializer()
 
     @classmethod
-    @contextlib.contextmanager
-    def _setup_env(
+    def _dump(
         cls,
+        obj: T,
         use_extended: _UseExtendedType,  # pylint: disable=unused-argument
-    ) -> t.Generator[None, None, None]:
-        try:
-            old_encoder = current_app.json_encoder
-            current_app.json_encoder = CustomJSONEncoder
-            yield
-        finally:
-            current_app.json_encoder = old_encoder
-
-    @classmethod
-    def _dump_to_string(cls, obj: T, use_extended: _UseExtendedType) -> str:
-        with cls._setup_env(use_extended):
-            return flask.json.dumps(
-                obj,
-                indent=None,
-                separators=cls._SEPERATORS,
-            ) + '\n'
+    ) -> bytes:
+        # Normal responses never use ``__extended_to_json__``.
+        return cls.serializer.dumps(obj, None)
 
     @classmethod
     def dump_to_object(cls, obj: T) -> t.Mapping:
         """Serialize the given object and parse its serialization.
         """
-        return system_json.loads(cls._dump_to_string(obj, use_extended=object))
+        return system_json.loads(cls._dump(obj, use_extended=object))
 
     @classmethod
     def _make(
@@ -160,7 +324,7 @@ class JSONResponse(t.Generic[T], flask.Response):  # pylint: disable=too-many-an
         use_extended: _UseExtendedType,
     ) -> T_JSONResponse:
         return cls(
-            cls._dump_to_string(obj, use_extended=use_extended),
+            cls._dump(obj, use_extended=use_extended) + b'\n',
             mimetype=flask.current_app.config['JSONIFY_MIMETYPE'],
             status=status_code,
         )
@@ -190,19 +354,8 @@ class ExtendedJSONResponse(t.Generic[T], JSONResponse[T]):  # pylint: disable=to
     """
 
     @classmethod
-    @contextlib.contextmanager
-    def _setup_env(cls, use_extended: _UseExtendedType
-                   ) -> t.Generator[None, None, None]:
-        if isinstance(use_extended, (tuple, type)):
-            class_only = use_extended
-            use_extended = lambda o: isinstance(o, class_only)
-
-        try:
-            old_encoder = current_app.json_encoder
-            current_app.json_encoder = get_extended_encoder_class(use_extended)
-            yield
-        finally:
-            current_app.json_encoder = old_encoder
+    def _dump(cls, obj: T, use_extended: _UseExtendedType) -> bytes:
+        return cls.serializer.dumps(obj, use_extended)
 
     @classmethod
     def dump_to_object(
@@ -215,9 +368,7 @@ class ExtendedJSONResponse(t.Generic[T], JSONResponse[T]):  # pylint: disable=to
         See :meth:`.ExtendedJSONResponse.make` for the meaning of the
         arguments of this method.
         """
-        return system_json.loads(
-            cls._dump_to_string(obj, use_extended=use_extended)
-        )
+        return system_json.loads(cls._dump(obj, use_extended=use_extended))
 
     @classmethod
     def make(
@@ -248,5 +399,122 @@ class ExtendedJSONResponse(t.Generic[T], JSONResponse[T]):  # pylint: disable=to
         return self
 
 
+class StreamedJSONResponse(t.Generic[T], JSONResponse[T]):  # pylint: disable=too-many-ancestors
+    """A JSON response of which the body is serialized in chunks.
+
+    Only the item that is currently being serialized needs to be in memory as
+    an object, the items that were already serialized are kept as bytes. So
+    when the items are produced by an iterator (like one that loads a query
+    in batches) the amount of objects in memory does not depend on the amount
+    of items. The body of an array is exactly the same as the body of a
+    :class:`.JSONResponse` (or :class:`.ExtendedJSONResponse`) of a list of
+    the same items.
+
+    .. note::
+
+        All items are serialized before the response is returned, and not
+        while the body is being sent. So an exception while serializing
+        results in the normal error response, and the items can use the
+        database without keeping a connection busy while the client
+        downloads the body.
+    """
+
+    _CHUNK_SIZE = 1 << 16
+
+    @classmethod
+    def _stream(
+        cls,
+        start: bytes,
+        parts: t.Iterable[t.Tuple[bytes, object]],
+        end: bytes,
+        use_extended: t.Optional[_UseExtendedType],
+    ) -> t.Iterator[bytes]:
+        serializer = cls.serializer
+        buf = [start]
+        size = len(start)
+        sep = b''
+
+        for prefix, item in parts:
+            data = serializer.dumps(item, use_extended)
+            buf.extend((sep, prefix, data))
+            size += len(prefix) + len(data) + 1
+            sep = b','
+
+            if size >= cls._CHUNK_SIZE:
+                yield b''.join(buf)
+                buf = []
+                size = 0
+
+        buf.append(end)
+        yield b''.join(buf)
+
+    @classmethod
+    def _make_streamed(
+        cls: t.Type['StreamedJSONResponse[Z]'],
+        body: t.Iterator[bytes],
+        status_code: int,
+        extended: bool,
+    ) -> 'StreamedJSONResponse[Z]':
+        ext = 'extended ' if extended else ''
+        logger.info(f'Created streamed {ext}json return response')
+
+        return cls(
+            list(body),
+            mimetype=flask.current_app.config['JSONIFY_MIMETYPE'],
+            status=status_code,
+        )
+
+    @classmethod
+    def make_array(
+        cls,
+        items: t.Iterable[Z],
+        status_code: int = 200,
+        use_extended: t.Optional[_UseExtendedType] = None,
+    ) -> 'StreamedJSONResponse[t.Sequence[Z]]':
+        """Create a response with the items of ``items`` as a json array.
+
+        :param items: The items that should be in the array.
+        :param status_code: The status code of the response.
+        :param use_extended: If given ``__extended_to_json__`` is used for
+            the items matching it, see :meth:`.ExtendedJSONResponse.make`.
+        :returns: A response containing the serialized items.
+        """
+        parts = ((b'', item) for item in items)
+        return cls._make_streamed(
+            cls._stream(b'[', parts, b']\n', use_extended),
+            status_code,
+            use_extended is not None,
+        )
+
+    @classmethod
+    def make_object(
+        cls,
+        items: t.Iterable[t.Tuple[str, Z]],
+        status_code: int = 200,
+        use_extended: t.Optional[_UseExtendedType] = None,
+    ) -> 'StreamedJSONResponse[t.Mapping[str, Z]]':
+        """Create a response with the given key value pairs as a json object.
+
+        .. warning::
+
+            The keys are not sorted, they are in the order of ``items``.
+
+        :param items: The key value pairs that should be in the object.
+        :param status_code: The status code of the response.
+        :param use_extended: See :meth:`.StreamedJSONResponse.make_array`.
+        :returns: A response containing the serialized items.
+        """
+        serializer = cls.serializer
+        parts = (
+            (serializer.dumps(key, None) + b':', value)
+            for key, value in items
+        )
+        return cls._make_streamed(
+            cls._stream(b'{', parts, b'}\n', use_extended),
+            status_code,
+            use_extended is not None,
+        )
+
+
 extended_jsonify = ExtendedJSONResponse.make  # pylint: disable=invalid-name
 jsonify = JSONResponse.make  # pylint: disable=invalid-name
@@ -0,0 +1,123 @@
+"""Compare the speed of the JSON serializers of this module.
+
+Run this file with ``python -m cg_json.benchmark``. It serializes a structure
+shaped like the extended output of a list of submissions with every
+:class:`.JSONSerializer` and checks that they all give the same output.
+
+SPDX-License-Identifier: AGPL-3.0-only
+"""
+import sys
+import uuid
+import timeit
+import typing as t
+import datetime
+import argparse
+
+import flask
+
+import cg_json
+
+
+class _User:
+    def __init__(self, idx: int) -> None:
+        self.id = idx
+        self.name = f'Student {idx}'
+        self.username = f'student{idx}'
+
+    def __to_json__(self) -> t.Mapping[str, object]:
+        return {'id': self.id, 'name': self.name, 'group': None}
+
+    def __extended_to_json__(self) -> t.Mapping[str, object]:
+        return {**self.__to_json__(), 'username': self.username}
+
+
+class _Comment:
+    def __init__(self, idx: int, user: _User) -> None:
+        self.id = idx
+        self.user = user
+
+    def __to_json__(self) -> t.Mapping[str, object]:
+        return {
+            'id': self.id,
+            'line': self.id % 40,
+            'msg': 'Could you explain this line? ✓',
+            'author': self.user,
+        }
+
+
+class _Work:
+    def __init__(self, idx: int) -> None:
+        self.id = idx
+        self.user = _User(idx)
+        self.assignee = _User(idx % 7)
+        self.created_at = datetime.datetime(2020, 1, 1) + datetime.timedelta(
+            minutes=idx
+        )
+        self.comments = [
+            _Comment(idx * 10 + i, self.assignee) for i in range(3)
+        ]
+
+    def __to_json__(self) -> t.Mapping[str, object]:
+        return {
+            'id': self.id,
+            'user': self.user,
+            'created_at': self.created_at.isoformat(),
+            'grade': self.id % 10 + 0.5,
+            'assignee': self.assignee,
+            'grade_overridden': False,
+            'extra': uuid.UUID(int=self.id),
+        }
+
+    def __extended_to_json__(self) -> t.Mapping[str, object]:
+        return {
+            **self.__to_json__(),
+            'comments': self.comments,
+            'rubric_items': [{'points': i / 2} for i in range(5)],
+        }
+
+
+def _get_serializers() -> t.Mapping[str, cg_json.JSONSerializer]:
+    return {
+        'flask': cg_json.FlaskJSONSerializer(),
+        'dispatch': cg_json.DispatchJSONSerializer(),
+    }
+
+
+def main(argv: t.Sequence[str]) -> None:
+    """Run the benchmark.
+
+    :param argv: The command line arguments, see ``--help``.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--works', type=int, default=1500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    works = [_Work(i) for i in range(args.works)]
+    app = flask.Flask(__name__)
+
+    with app.app_context():
+        outputs = {}
+        for name, serializer in _get_serializers().items():
+            outputs[name] = serializer.dumps(works, object)
+            best = min(
+                timeit.repeat(
+                    lambda s=serializer: s.dumps(works, object),
+                    number=1,
+                    repeat=args.repeat,
+                )
+            )
+            print(
+                f'{name:>10}: {best * 1000:8.1f} ms'
+                f' ({len(outputs[name])} bytes)'
+            )
+
+    if len(set(outputs.values())) != 1:
+        print(
+            'The serializers did not give the same output!', file=sys.stderr
+        )
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,21 @@
+import flask
+import pytest
+
+
+def pytest_addoption(parser):
+    try:
+        parser.addoption(
+            "--postgresql",
+            action="store",
+            default=False,
+            help="Run the test using postresql"
+        )
+    except ValueError:
+        pass
+
+
+@pytest.fixture
+def app():
+    app = flask.Flask(__name__)
+    with app.app_context():
+        yield app
@@ -0,0 +1,167 @@
+import enum
+import json
+import uuid
+
+import pytest
+from werkzeug.local import LocalProxy
+
+import cg_json
+
+
+class Simple:
+    def __init__(self, value):
+        self.value = value
+
+    def __to_json__(self):
+        return {'value': self.value, 'id': uuid.UUID(int=self.value)}
+
+
+class Extended(Simple):
+    def __extended_to_json__(self):
+        return {**self.__to_json__(), 'extended': [Simple(self.value + 1)]}
+
+
+class OtherExtended(Extended):
+    pass
+
+
+class Enum(cg_json.SerializableEnum):
+    a = 1
+    b = 2
+
+
+class IntEnum(enum.IntEnum):
+    c = 3
+
+
+OBJECTS = [
+    None,
+    'héllo "world"\n',
+    ['a', ('b', 'c'), {}],
+    {'b': 1, 'a': [Simple(1), Extended(2), OtherExtended(3)]},
+    {5: 'int', 1: 'keys'},
+    {'floats': [1.5, 1e16, 1e-7, float('nan'), float('inf'), -0.0]},
+    [Enum.a, IntEnum.c, True, False, uuid.UUID(int=5)],
+    [LocalProxy(lambda: Extended(4)), LocalProxy(lambda: Simple(5))],
+]
+
+USE_EXTENDED = [
+    None,
+    object,
+    OtherExtended,
+    (Simple, OtherExtended),
+    lambda o: isinstance(o, Extended) and o.value > 2,
+]
+
+
+@pytest.mark.parametrize('obj', OBJECTS)
+@pytest.mark.parametrize('use_extended', USE_EXTENDED)
+@pytest.mark.parametrize('as_ascii', [True, False])
+def test_serializers_give_equal_output(app, obj, use_extended, as_ascii):
+    app.config['JSON_AS_ASCII'] = as_ascii
+    expected = cg_json.FlaskJSONSerializer().dumps(obj, use_extended)
+
+    serializer = cg_json.DispatchJSONSerializer()
+    # Do it twice so we also use the cached dispatch table.
+    assert serializer.dumps(obj, use_extended) == expected
+    assert serializer.dumps(obj, use_extended) == expected
+
+
+def test_unserializable_objects(app):
+    for serializer in [
+        cg_json.FlaskJSONSerializer(),
+        cg_json.DispatchJSONSerializer(),
+    ]:
+        with pytest.raises(TypeError, match='Object of type set is not'):
+            serializer.dumps([{1}], None)
+
+
+def test_responses_use_serializer(app):
+    obj = {'item': Extended(1)}
+
+    response = cg_json.jsonify(obj)
+    assert response.get_data() == (
+        cg_json.FlaskJSONSerializer().dumps(obj, None) + b'\n'
+    )
+
+    response = cg_json.extended_jsonify(obj, use_extended=Extended)
+    assert response.get_data() == (
+        cg_json.FlaskJSONSerializer().dumps(obj, Extended) + b'\n'
+    )
+    assert cg_json.ExtendedJSONResponse.dump_to_object(obj) == {
+        'item': {
+            'value': 1,
+            'id': str(uuid.UUID(int=1)),
+            'extended': [{'value': 2, 'id': str(uuid.UUID(int=2))}],
+        }
+    }
+
+
+@pytest.mark.parametrize('chunk_size', [1, 1 << 16])
+@pytest.mark.parametrize('use_extended', USE_EXTENDED)
+def test_streamed_array(app, monkeypatch, chunk_size, use_extended):
+    monkeypatch.setattr(
+        cg_json.StreamedJSONResponse, '_CHUNK_SIZE', chunk_size
+    )
+    consumed = []
+
+    def produce():
+        for obj in OBJECTS:
+            consumed.append(obj)
+            yield obj
+
+    with app.test_request_context():
+        response = cg_json.StreamedJSONResponse.make_array(
+            produce(), use_extended=use_extended
+        )
+        # Everything should be serialized before the response is returned.
+        assert consumed == OBJECTS
+
+        if use_extended is None:
+            expected = cg_json.jsonify(OBJECTS)
+        else:
+            expected = cg_json.extended_jsonify(
+                OBJECTS, use_extended=use_extended
+            )
+        chunks = list(response.response)
+
+    assert b''.join(chunks) == expected.get_data()
+    assert len(chunks) == (len(OBJECTS) + 1 if chunk_size == 1 else 1)
+
+
+def test_streamed_array_error(app, monkeypatch):
+    monkeypatch.setattr(cg_json.StreamedJSONResponse, '_CHUNK_SIZE', 1)
+
+    class Broken:
+        def __to_json__(self):
+            raise ValueError('Cannot serialize')
+
+    with app.test_request_context():
+        # Errors are raised directly, also after the first chunk, so the
+        # normal error response is used.
+        with pytest.raises(ValueError):
+            cg_json.StreamedJSONResponse.make_array(iter([Broken(), 1]))
+        with pytest.raises(ValueError):
+            cg_json.StreamedJSONResponse.make_array(
+                iter([Simple(1), Broken()])
+            )
+
+
+def test_streamed_object(app):
+    items = [('b', Simple(1)), ('a', [Extended(2)]), ('ü', None)]
+
+    with app.test_request_context():
+        response = cg_json.StreamedJSONResponse.make_object(
+            iter(items), use_extended=Extended
+        )
+        data = response.get_data()
+
+    assert data.startswith(b'{"b":')
+    assert data.endswith(b'}\n')
+    assert json.loads(data) == cg_json.ExtendedJSONResponse.dump_to_object(
+        dict(items), use_extended=Extended
+    )
+
+    with app.test_request_context():
+        response = cg_json.StreamedJSONResponse.make_object([])
+        assert response.get_data() == b'{}\n'
@@ -104,8 +104,10 @@ class _PrioQueue:
 
         self._version = 0
         self._amount_waiting = 0
+        self._amount_taken = 0
         self._closed = False
         self._new_work = mp.Condition(self.mutex)
+        self._work_taken = mp.Condition(self.mutex)
         self._work_needed = mp.Semaphore(0)
         self._retried: t.MutableMapping[Work, int
                                         ] = collections.defaultdict(lambda: 0)
@@ -126,6 +128,7 @@ class _PrioQueue:
         with self.mutex:
             self._closed = True
             self._new_work.notify_all()
+            self._work_taken.notify_all()
             self._work_needed.release()
 
     def _inc_version(self) -> None:
@@ -141,6 +144,32 @@ class _PrioQueue:
         with self.mutex:
             return self._version, self._peek() is None, self._amount_waiting
 
+    def amount_queued(self) -> int:
+        """Get the amount of work in the queue.
+
+        This might include work that will never be returned, as newer work for
+        the same student was added.
+        """
+        with self.mutex:
+            return len(self.queue)
+
+    def wait_for_work_taken(self, below: int, timeout: float) -> None:
+        """Wait until work is taken from the queue while it contains less
+        than ``below`` items.
+
+        :param below: Only stop waiting if less than this amount of items are
+            in the queue after the work was taken.
+        :param timeout: The maximum amount of seconds to wait.
+        """
+        with self.mutex:
+            start = self._amount_taken
+            self._work_taken.wait_for(
+                lambda: self._closed or (
+                    self._amount_taken != start and len(self.queue) < below
+                ),
+                timeout,
+            )
+
     def put_all(self, works: t.Iterable[Work]) -> bool:
         """Put all the given work in the queue.
 
@@ -215,6 +244,8 @@ class _PrioQueue:
                 if work is not None:
                     # Remove item from the queue
                     self.queue.popleft()
+                    self._amount_taken += 1
+                    self._work_taken.notify_all()
                     # Do not forget that what the newest work for this student
                     # is, as we might want need to retry the returned work
                     # later.
@@ -266,8 +297,10 @@ class WorkerPool:
         extra_amount: int,
         initial_work: t.Iterable[Work],
         max_retry_amount: int = 2,
+        low_water_mark: int = 0,
     ) -> None:
         self._processes = processes
+        self._low_water_mark = low_water_mark
         self._func = function
         self._manager = _Manager()
         self._manager.start()
@@ -287,6 +320,11 @@ class WorkerPool:
         self._producer_lock = self._manager.Lock()
         self._processes_update_lock = mp.Lock()
 
+    def get_amount_queued(self) -> int:
+        """Get the amount of work that is waiting to be processed.
+        """
+        return self._work_queue.amount_queued()
+
     def _drain_finish_queue(self) -> None:
         while not self._finish_queue.empty():
             val = self._finish_queue.get()
@@ -376,8 +414,16 @@ class WorkerPool:
                             bonus_done += 1
                         bonus_round_result.put(produced)
 
+                if self._low_water_mark > 0:
+                    # Do not wait the full sleep time if the queue is running
+                    # low, so the workers do not have to wait on the producer.
+                    self._work_queue.wait_for_work_taken(
+                        self._low_water_mark, self._sleep_time
+                    )
+                    if self._stop.is_set():
+                        return
                 # This call returns the value of the internal flag
-                if self._stop.wait(self._sleep_time):
+                elif self._stop.wait(self._sleep_time):
                     return
 
         producer_thread = threading.Thread(target=producer_fun)
@@ -203,3 +203,33 @@ def test_producer_producing_work_twice(work_done):
     assert work_done.get(False) is None
     assert work_done.get(False) == main_work
     assert work_done.empty()
+
+
+def test_producer_is_woken_when_queue_runs_low(work_done):
+    initial_work = [Work(result_id=i, student_id=i) for i in range(3)]
+    extra_work = [Work(result_id=i, student_id=i) for i in range(3, 6)]
+    all_work = sorted(initial_work + extra_work)
+
+    def worker_fun(opts):
+        work = opts.get_work()
+        if work is None:
+            return
+        work_done.put((work, time.monotonic()))
+        time.sleep(0.1)
+
+    def producer(_):
+        if extra_work:
+            return [extra_work.pop()]
+        return []
+
+    pool = WorkerPool(1, worker_fun, 5, 1, initial_work, low_water_mark=2)
+    start = time.monotonic()
+    pool.start(producer)
+
+    result = []
+    while not work_done.empty():
+        result.append(work_done.get())
+
+    assert sorted(work for work, _ in result) == all_work
+    # The producer should not have waited the full sleep time between calls.
+    assert max(done for _, done in result) - start < 4
@@ -82,6 +82,13 @@ FlaskConfig = TypedDict(
         'AUTO_TEST_MAX_JOBS_PER_RUNNER': int,
         'AUTO_TEST_MAX_OUTPUT_TAIL': int,
         'AUTO_TEST_MAX_CONCURRENT_BATCH_RUNS': int,
+        'AUTO_TEST_CONTAINER_POOL_SIZE': int,
+        'AUTO_TEST_WORK_BUFFER_PER_CORE': int,
+        'AUTO_TEST_MAX_CORES_PER_SUITE': int,
+        'AUTO_TEST_TARGET_DRAIN_TIME': int,
+        'AUTO_TEST_RUNNER_CONCURRENCY': int,
+        'AUTO_TEST_DURATION_HISTORY': int,
+        'AUTO_TEST_RUNNER_PREWARM_TIME': int,
         'AUTO_TEST_RUNNER_INSTANCE_PASS': str,
         'AUTO_TEST_RUNNER_CONTAINER_URL': t.Optional[str],
         'CUR_COMMIT': str,
@@ -90,6 +97,9 @@ FlaskConfig = TypedDict(
         'Celery': CeleryConfig,
         'LTI_CONSUMER_KEY_SECRETS': t.Mapping[str, t.Tuple[str, t.List[str]]],
         'LTI1.3_MIN_POLL_INTERVAL': int,
+        'LTI_PASSBACK_CONCURRENCY': int,
+        'LTI_PASSBACK_MAX_TRIES': int,
+        'LTI_PASSBACK_CHUNK_SIZE': int,
         'DEBUG': bool,
         'SQLALCHEMY_DATABASE_URI': str,
         'SECRET_KEY': str,
@@ -133,6 +143,8 @@ FlaskConfig = TypedDict(
         'ESLINT_PROGRAM': t.List[str],
         'PYLINT_PROGRAM': t.List[str],
         'FLAKE8_PROGRAM': t.List[str],
+        'LINTER_BATCH_SIZE': int,
+        'LINTER_MAX_CONCURRENT_BATCHES': int,
         '_USING_SQLITE': str,
         '_TRANSIP_PRIVATE_KEY_FILE': str,
         '_TRANSIP_USERNAME': str,
@@ -551,6 +563,8 @@ set_list(
         '{config}',
     ]
 )
+set_int(CONFIG, backend_ops, 'LINTER_BATCH_SIZE', 25, min=1)
+set_int(CONFIG, backend_ops, 'LINTER_MAX_CONCURRENT_BATCHES', 2, min=1)
 
 set_list(
     CONFIG, backend_ops, 'GIT_CLONE_PROGRAM', [
@@ -649,6 +663,9 @@ if lti_parser.read(config_file) and 'LTI Consumer keys' in lti_parser:
         parse_lti_value(CONFIG['LTI_CONSUMER_KEY_SECRETS'], key, value)
 
 set_int(CONFIG, backend_ops, 'LTI1.3_MIN_POLL_INTERVAL', 60)
+set_int(CONFIG, backend_ops, 'LTI_PASSBACK_CONCURRENCY', 8, min=1)
+set_int(CONFIG, backend_ops, 'LTI_PASSBACK_MAX_TRIES', 3, min=1)
+set_int(CONFIG, backend_ops, 'LTI_PASSBACK_CHUNK_SIZE', 100, min=1)
 
 ###################
 # Jplag languages #
@@ -707,6 +724,19 @@ set_int(CONFIG, auto_test_ops, 'AUTO_TEST_MAX_JOBS_PER_RUNNER', 25)
 assert CONFIG['AUTO_TEST_MAX_JOBS_PER_RUNNER'
               ] > 0, "Max jobs per runner should be higher than 0"
 set_int(CONFIG, auto_test_ops, 'AUTO_TEST_MAX_CONCURRENT_BATCH_RUNS', 3)
+# The amount of started containers kept ready on a runner, a negative value
+# means one for every worker of the runner, and zero disables the pool.
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_CONTAINER_POOL_SIZE', -1)
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_WORK_BUFFER_PER_CORE', 4, min=1)
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_MAX_CORES_PER_SUITE', 4, min=1)
+# The time (in seconds) in which we try to finish all outstanding results of a
+# run, set to zero to only use ``AUTO_TEST_MAX_JOBS_PER_RUNNER``.
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_TARGET_DRAIN_TIME', 10 * 60, min=0)
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_RUNNER_CONCURRENCY', 4, min=1)
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_DURATION_HISTORY', 50, min=1)
+# The time (in seconds) before the deadline of a batch run at which we start
+# runners for it, this should be about the time it takes to start a runner.
+set_int(CONFIG, auto_test_ops, 'AUTO_TEST_RUNNER_PREWARM_TIME', 5 * 60, min=0)
 
 set_float(CONFIG, auto_test_ops, 'AUTO_TEST_CF_SLEEP_TIME', 5.0)
 set_int(CONFIG, auto_test_ops, 'AUTO_TEST_CF_EXTRA_AMOUNT', 20)
@@ -169,6 +169,25 @@ def create_lti_provider():
     print(prov.id)
 
 
+@manager.command
+def check_latest_works():
+    wrong = m.LatestWork.find_inconsistencies()
+    for assig_id, user_id, stored_id, expected_id in wrong:
+        print(
+            f'Assignment {assig_id}, user {user_id}: found work {stored_id}'
+            f' but expected work {expected_id}',
+            file=sys.stderr,
+        )
+    print(f'Found {len(wrong)} wrong latest works')
+    return 1 if wrong else 0
+
+
+@manager.command
+def backfill_latest_works():
+    m.LatestWork.backfill()
+    m.db.session.commit()
+
+
 @manager.command
 def test_data(db=None):
     db = psef.models.db if db is None else db
@@ -0,0 +1,91 @@
+"""Add AutoTestResultStateCount table
+
+Revision ID: 3c8a1f5e9d2b
+Revises: b55e304ba00c
+Create Date: 2020-07-20 11:02:43.316719
+
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '3c8a1f5e9d2b'
+down_revision = 'b55e304ba00c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'AutoTestResultStateCount',
+        sa.Column('auto_test_run_id', sa.Integer(), nullable=False),
+        sa.Column(
+            'state',
+            postgresql.ENUM(
+                name='autoteststepresultstate', create_type=False
+            ),
+            nullable=False
+        ),
+        sa.Column('amount', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['auto_test_run_id'], ['AutoTestRun.id'],
+                                ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('auto_test_run_id', 'state')
+    )
+
+    conn = op.get_bind()
+    # Results that are not of a latest submission were never skipped before,
+    # and will never be run. These are the results of deleted submissions and
+    # of user submissions hidden by a submission of their group. Skip them so
+    # they are not counted as results that still need to be run.
+    conn.execute(
+        sa.text(
+            """
+    WITH latest AS (
+        SELECT DISTINCT ON ("Assignment_id", "User_id")
+            id, "Assignment_id" AS assignment_id, "User_id" AS user_id
+        FROM "Work"
+        WHERE NOT deleted
+        ORDER BY "Assignment_id", "User_id", created_at DESC, id DESC
+    ), visible AS (
+        SELECT latest.id FROM latest
+        JOIN "Assignment" AS assig ON assig.id = latest.assignment_id
+        WHERE assig.group_set_id IS NULL OR NOT EXISTS (
+            SELECT 1 FROM "users-groups" AS ug
+            JOIN "Group" AS grp ON grp.id = ug.group_id
+            WHERE ug.user_id = latest.user_id
+                AND grp.group_set_id = assig.group_set_id
+                AND EXISTS (
+                    SELECT 1 FROM latest AS group_latest
+                    WHERE group_latest.assignment_id = latest.assignment_id
+                        AND group_latest.user_id = grp.virtual_user_id
+                )
+        )
+    )
+    UPDATE "AutoTestResult" SET state = 'skipped'
+    WHERE state = 'not_started' AND work_id NOT IN (SELECT id FROM visible)
+    """
+        )
+    )
+
+    conn.execute(
+        sa.text(
+            """
+    INSERT INTO "AutoTestResultStateCount" (auto_test_run_id, state, amount)
+    SELECT
+        run.id,
+        states.state,
+        (
+            SELECT count(*) FROM "AutoTestResult" AS res
+            WHERE res.auto_test_run_id = run.id AND res.state = states.state
+        )
+    FROM "AutoTestRun" AS run
+    CROSS JOIN unnest(enum_range(NULL::autoteststepresultstate))
+        AS states(state)
+    """
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('AutoTestResultStateCount')
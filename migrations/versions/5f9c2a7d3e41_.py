@@ -0,0 +1,38 @@
+"""Add finished_at column to AutoTestResult
+
+Revision ID: 5f9c2a7d3e41
+Revises: 8e2d4b7a1c6f
+Create Date: 2020-07-30 10:12:37.804125
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '5f9c2a7d3e41'
+down_revision = '8e2d4b7a1c6f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'AutoTestResult',
+        sa.Column(
+            'finished_at', sa.TIMESTAMP(timezone=True), nullable=True
+        )
+    )
+    # The last update of a finished result is a good approximation of the
+    # moment it finished.
+    op.execute(
+        """
+    UPDATE "AutoTestResult"
+    SET finished_at = updated_at
+    WHERE started_at IS NOT NULL
+      AND state IN ('passed', 'failed', 'timed_out')
+    """
+    )
+
+
+def downgrade():
+    op.drop_column('AutoTestResult', 'finished_at')
@@ -0,0 +1,28 @@
+"""Add cpu_cores column to AutoTestSuite
+
+Revision ID: 8e2d4b7a1c6f
+Revises: 3c8a1f5e9d2b
+Create Date: 2020-07-27 14:21:09.512843
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '8e2d4b7a1c6f'
+down_revision = '3c8a1f5e9d2b'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'AutoTestSuite',
+        sa.Column(
+            'cpu_cores', sa.Integer(), server_default='1', nullable=False
+        )
+    )
+
+
+def downgrade():
+    op.drop_column('AutoTestSuite', 'cpu_cores')
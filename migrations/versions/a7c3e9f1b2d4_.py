@@ -0,0 +1,48 @@
+"""Add LatestWork table
+
+Revision ID: a7c3e9f1b2d4
+Revises: 5f9c2a7d3e41
+Create Date: 2020-08-04 14:21:09.512317
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e9f1b2d4'
+down_revision = '5f9c2a7d3e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'LatestWork',
+        sa.Column('assignment_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('work_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['assignment_id'], ['Assignment.id'],
+                                ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['user_id'], ['User.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['work_id'], ['Work.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('assignment_id', 'user_id'),
+        sa.UniqueConstraint('work_id')
+    )
+
+    conn = op.get_bind()
+    conn.execute(
+        sa.text(
+            """
+    INSERT INTO "LatestWork" (assignment_id, user_id, work_id)
+    SELECT DISTINCT ON ("Assignment_id", "User_id")
+        "Assignment_id", "User_id", id
+    FROM "Work"
+    WHERE NOT deleted
+    ORDER BY "Assignment_id", "User_id", created_at DESC, id DESC
+    """
+        )
+    )
+
+
+def downgrade():
+    op.drop_table('LatestWork')
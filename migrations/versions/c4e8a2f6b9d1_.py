@@ -0,0 +1,31 @@
+"""Add a version of the files of a submission
+
+Revision ID: c4e8a2f6b9d1
+Revises: e2b6d4a8c1f3
+Create Date: 2020-08-07 09:31:17.204638
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4e8a2f6b9d1'
+down_revision = 'e2b6d4a8c1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        'Work',
+        sa.Column(
+            'files_version',
+            sa.Integer(),
+            server_default='0',
+            nullable=False,
+        ),
+    )
+
+
+def downgrade():
+    op.drop_column('Work', 'files_version')
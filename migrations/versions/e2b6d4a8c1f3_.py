@@ -0,0 +1,32 @@
+"""Add index on the finished at time of AutoTest results
+
+Revision ID: e2b6d4a8c1f3
+Revises: a7c3e9f1b2d4
+Create Date: 2020-08-06 10:12:44.381920
+
+"""
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6d4a8c1f3'
+down_revision = 'a7c3e9f1b2d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_AutoTestResult_auto_test_run_id_finished_at',
+        'AutoTestResult',
+        ['auto_test_run_id', 'finished_at'],
+        unique=False,
+        postgresql_where=sa.text('finished_at IS NOT NULL'),
+    )
+
+
+def downgrade():
+    op.drop_index(
+        'ix_AutoTestResult_auto_test_run_id_finished_at',
+        table_name='AutoTestResult',
+    )
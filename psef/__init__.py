@@ -41,6 +41,7 @@ class _PsefInterProcessCache:
     # pylint: disable=unsubscriptable-object
     lti_access_tokens: cg_cache.inter_request.Backend[str]
     lti_public_keys: cg_cache.inter_request.Backend['_KeySet']
+    file_trees: cg_cache.inter_request.Backend[t.Dict[str, t.Any]]
 
 
 class PsefFlask(Flask):
@@ -90,6 +91,9 @@ class PsefFlask(Flask):
             lti_public_keys=cg_cache.inter_request.RedisBackend(
                 'lti_public_keys', timedelta(seconds=3600), redis_conn
             ),
+            file_trees=cg_cache.inter_request.RedisBackend(
+                'file_trees', timedelta(seconds=600), redis_conn
+            ),
         )
 
     @property
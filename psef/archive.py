@@ -200,7 +200,11 @@ class Archive(t.Generic[TT]):  # pylint: disable=unsubscriptable-object
 
     @classmethod
     @contextlib.contextmanager
-    def create_from_file(cls, filename: str) -> t.Iterator['Archive[object]']:
+    def create_from_file(
+        cls,
+        filename: str,
+        fileobj: t.Optional[t.IO[bytes]] = None,
+    ) -> t.Iterator['Archive[object]']:
         """Create a instance of this class from the given filename.
 
         >>> with Archive.create_from_file('test_data/test_blackboard/correct.tar.gz') as arch:
@@ -218,6 +222,11 @@ class Archive(t.Generic[TT]):  # pylint: disable=unsubscriptable-object
         psef.archive.UnrecognizedArchiveFormat: Path is not a recognized archive format
 
         :param filename: The path to the file as source for this archive.
+        :param fileobj: An already opened, seekable, binary file to read the
+            archive from. If given ``filename`` is only used to determine the
+            format of the archive, which makes it possible to extract an
+            uploaded archive without first copying it to disk. The caller
+            remains responsible for closing this file.
         :returns: An instance of :class:`Archive` when the filename was a
             recognized archive format.
         """
@@ -227,7 +236,7 @@ class Archive(t.Generic[TT]):  # pylint: disable=unsubscriptable-object
             raise UnrecognizedArchiveFormat(
                 'Path is not a recognized archive format'
             )
-        arr = base_archive_cls(filename)
+        arr = base_archive_cls(filename, fileobj)
 
         try:
             yield t.cast(t.Type[Archive[object]], cls)(arr)
@@ -421,8 +430,11 @@ class Archive(t.Generic[TT]):  # pylint: disable=unsubscriptable-object
 
 
 class _BaseArchive(abc.ABC, t.Generic[TT]):
-    def __init__(self, filename: str) -> None:
+    def __init__(
+        self, filename: str, fileobj: t.Optional[t.IO[bytes]] = None
+    ) -> None:
         self.filename = filename
+        self.fileobj = fileobj
 
     @abc.abstractmethod
     def extract_member(
@@ -498,9 +510,14 @@ class _TarArchive(_BaseArchive[tarfile.TarInfo]):  # pylint: disable=unsubscript
     def close(self) -> None:
         self._archive.close()
 
-    def __init__(self, filename: str) -> None:
-        super().__init__(filename)
-        self._archive = tarfile.open(name=self.filename)
+    def __init__(
+        self, filename: str, fileobj: t.Optional[t.IO[bytes]] = None
+    ) -> None:
+        super().__init__(filename, fileobj)
+        if self.fileobj is None:
+            self._archive = tarfile.open(name=self.filename)
+        else:
+            self._archive = tarfile.open(fileobj=self.fileobj)
 
     def extract_member(
         self, member: ArchiveMemberInfo[tarfile.TarInfo], to_path: str,
@@ -659,9 +676,13 @@ class _ZipArchive(_BaseArchive[zipfile.ZipInfo]):  # pylint: disable=unsubscript
     def has_unsafe_filetypes(self) -> bool:  # pylint: disable=no-self-use
         return False
 
-    def __init__(self, filename: str) -> None:
-        super().__init__(filename)
-        self._archive = zipfile.ZipFile(self.filename)
+    def __init__(
+        self, filename: str, fileobj: t.Optional[t.IO[bytes]] = None
+    ) -> None:
+        super().__init__(filename, fileobj)
+        self._archive = zipfile.ZipFile(
+            self.filename if self.fileobj is None else self.fileobj
+        )
 
     def extract_member(
         self, member: ArchiveMemberInfo[zipfile.ZipInfo], to_path: str,
@@ -711,14 +732,17 @@ class _ZipArchive(_BaseArchive[zipfile.ZipInfo]):  # pylint: disable=unsubscript
 @_archive_handlers.register('.7z')
 class _7ZipArchive(_BaseArchive[py7zlib.ArchiveFile]):  # pylint: disable=unsubscriptable-object
     def close(self) -> None:
-        self._fp.close()
+        if self.fileobj is None:
+            self._fp.close()
 
     def has_unsafe_filetypes(self) -> bool:  # pylint: disable=no-self-use
         return False
 
-    def __init__(self, filename: str) -> None:
-        super().__init__(filename)
-        self._fp = open(filename, 'rb')
+    def __init__(
+        self, filename: str, fileobj: t.Optional[t.IO[bytes]] = None
+    ) -> None:
+        super().__init__(filename, fileobj)
+        self._fp = open(filename, 'rb') if fileobj is None else fileobj
         self._archive = py7zlib.Archive7z(self._fp)
 
     def extract_member(  # pylint: disable=no-self-use
@@ -1069,6 +1069,105 @@ class FeedbackReplyPermissions(CoursePermissionChecker):
             self._ensure(CPerm.can_see_others_work)
 
 
+class AssignmentFeedbackPermissions(CoursePermissionChecker):
+    """The permission checker for the feedback on all the submissions of an
+    :class:`psef.models.Assignment`.
+
+    This checker gives the same answers as :class:`.WorkPermissions` and
+    :class:`.FeedbackReplyPermissions`, however it only looks up the
+    permissions of the current user once. This makes it usable to check the
+    feedback of a lot of submissions of the same assignment at once.
+    """
+    __slots__ = (
+        'assignment',
+        '_author_ids',
+        '_is_enrolled',
+        '_may_see_others_work',
+        '_may_see_user_feedback',
+        '_may_see_linter_feedback',
+    )
+
+    def __init__(self, assignment: 'psef.models.Assignment') -> None:
+        super().__init__(course_id=assignment.course_id)
+        self.assignment: Final = assignment
+
+        user = self.user
+        # The ids of all users for which the current user is (one of) the
+        # authors, so the user itself and all the groups it is a member of.
+        groups_of_user = psef.models.Group.contains_users(
+            [user]
+        ).with_entities(psef.models.Group.virtual_user_id)
+        self._author_ids: Final = set(
+            virtual_user_id for virtual_user_id, in groups_of_user
+        )
+        self._author_ids.add(user.id)
+
+        self._is_enrolled: Final = user.is_enrolled(self.course_id)
+        self._may_see_others_work: Final = self._has_permission(
+            CPerm.can_see_others_work
+        )
+        is_done = assignment.is_done
+        self._may_see_user_feedback: Final = (
+            is_done or
+            self._has_permission(CPerm.can_see_user_feedback_before_done)
+        )
+        self._may_see_linter_feedback: Final = (
+            features.has_feature(features.Feature.LINTERS) and (
+                is_done or self._has_permission(
+                    CPerm.can_see_linter_feedback_before_done
+                )
+            )
+        )
+
+    def _is_author(self, work: 'psef.models.Work') -> bool:
+        return work.user_id in self._author_ids
+
+    def may_see_general_feedback(self, work: 'psef.models.Work') -> bool:
+        """Check if the current user may see the general feedback of the
+            given work.
+
+        :param work: The work to check for, it should be a submission of
+            :attr:`assignment`.
+        :returns: The same as
+            :meth:`.WorkPermissions.ensure_may_see_general_feedback` as a
+            bool.
+        """
+        return self._may_see_user_feedback and (
+            self._may_see_others_work or self._is_author(work)
+        )
+
+    def may_see_linter_feedback(self, work: 'psef.models.Work') -> bool:
+        """Check if the current user may see the linter feedback of the given
+            work.
+
+        :param work: The work to check for, it should be a submission of
+            :attr:`assignment`.
+        :returns: The same as
+            :meth:`.WorkPermissions.ensure_may_see_linter_feedback` as a
+            bool.
+        """
+        return self._may_see_linter_feedback and (
+            self._may_see_others_work or self._is_author(work)
+        )
+
+    def may_see_reply(
+        self, work: 'psef.models.Work', reply: 'psef.models.CommentReply'
+    ) -> bool:
+        """Check if the current user may see the given feedback reply.
+
+        :param work: The work on which the reply was placed, it should be a
+            submission of :attr:`assignment`.
+        :param reply: The reply to check for.
+        :returns: The same as
+            :meth:`.FeedbackReplyPermissions.ensure_may_see` as a bool.
+        """
+        if work.deleted:
+            return False
+        elif reply.author_id in self._author_ids:
+            return self._is_enrolled
+        return self.may_see_general_feedback(work)
+
+
 class NotificationPermissions(CoursePermissionChecker):
     """The permission checker for :class:`psef.models.Notification`.
     """
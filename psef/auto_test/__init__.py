@@ -9,6 +9,7 @@ import grp
 import pwd
 import sys
 import copy
+import gzip
 import json
 import time
 import uuid
@@ -16,8 +17,10 @@ import errno
 import queue
 import random
 import select
+import shutil
 import signal
 import typing as t
+import tarfile
 import datetime
 import tempfile
 import threading
@@ -27,6 +30,7 @@ import collections
 import dataclasses
 import multiprocessing
 from pathlib import Path
+from concurrent.futures import Future, ThreadPoolExecutor
 from multiprocessing import Event, Queue, context, managers
 
 import lxc  # typing: ignore
@@ -107,6 +111,21 @@ _SYSTEMD_WAIT_CMD = [
 _REQUEST_TIMEOUT = 10
 _REQUEST_RETRIES = 5
 _REQUEST_BACKOFF_FACTOR = 1.2
+_DOWNLOAD_THREADS = 4
+# Creating the archive of a submission can take a while, so we are a lot more
+# lenient with timeouts when downloading files.
+_DOWNLOAD_TIMEOUT = 60
+# Output archives smaller than this amount of bytes are uploaded without
+# compressing them, as compressing is slower than simply sending them.
+_OUTPUT_COMPRESS_THRESHOLD = 1 << 20
+# Updates of step results are sent to the server in batches. A batch is sent
+# when the previous one was sent at least this many seconds ago, or when it
+# contains updates for this many different step results.
+_STEP_RESULT_FLUSH_INTERVAL = 1.0
+_STEP_RESULT_BATCH_SIZE = 25
+# The amount of seconds we ask the broker to wait for a new job when there
+# are no jobs, so we get a job as soon as it is registered.
+_BROKER_JOB_WAIT = 30
 
 
 class LXCProcessError(Exception):
@@ -194,6 +213,34 @@ def _waitpid_noblock(pid: int) -> t.Optional[int]:
     assert False
 
 
+def _open_pidfd(pid: int) -> t.Optional[int]:
+    """Open a file descriptor that becomes readable when the given process
+    exits.
+
+    :param pid: The process to open a file descriptor for.
+    :returns: The file descriptor, or ``None`` if this is not supported by the
+        Python version or kernel.
+
+    >>> from subprocess import Popen
+    >>> p = Popen(['sleep', '0.1'])
+    >>> fd = _open_pidfd(p.pid)
+    >>> fd is None or select.select([fd], [], [], 5)[0] == [fd]
+    True
+    >>> p.wait()
+    0
+    >>> if fd is not None: os.close(fd)
+    """
+    pidfd_open = getattr(os, 'pidfd_open', None)
+    if pidfd_open is None:
+        return None
+
+    try:
+        return pidfd_open(pid)
+    except OSError:
+        logger.info('Could not open pidfd', pid=pid, exc_info=True)
+        return None
+
+
 def _wait_for_attach(
     pid: int,
     command_started: threading.Event,
@@ -299,19 +346,26 @@ def _wait_for_pid(pid: int, timeout: float) -> t.Tuple[int, float]:
     def timed_out() -> bool:
         return get_time_left() < 0
 
-    # This timeout delay code is very similar to that of the timeout
-    # implementation of `subprocess`. It could probably be improved, but I'm
-    # pretty happy with it for now.
+    # If possible we wait on a pidfd, which becomes readable the moment the
+    # process exits. Otherwise we poll, this timeout delay code is very similar
+    # to that of the timeout implementation of `subprocess`.
+    pidfd = _open_pidfd(pid)
     delay = 0.0005
 
-    while not timed_out():
-        exit_code = _waitpid_noblock(pid)
+    try:
+        while not timed_out():
+            exit_code = _waitpid_noblock(pid)
 
-        if exit_code is None:
-            delay = max(min(delay * 2, get_time_left(), 0.05), 0)
-            time.sleep(delay)
-        else:
-            return exit_code, get_time_left()
+            if exit_code is not None:
+                return exit_code, get_time_left()
+            elif pidfd is None:
+                delay = max(min(delay * 2, get_time_left(), 0.05), 0)
+                time.sleep(delay)
+            else:
+                select.select([pidfd], [], [], max(get_time_left(), 0))
+    finally:
+        if pidfd is not None:
+            os.close(pidfd)
 
     logger.warning('Process took too long, killing', pid=pid)
     os.kill(pid, signal.SIGTERM)
@@ -386,39 +440,61 @@ class CpuCores:
     With this class you can make sure only one of the containers is using
     specific core at any specific moment. This also works across multiple
     processes.
+
+    A reservation can consist of multiple cpus, these are picked based on the
+    topology of the machine, see :func:`_pick_cpus`. Reservations are handed
+    out in the order they are requested, so a request for many cpus cannot be
+    starved by requests for a single cpu.
     """
 
     class Core:
-        """A class representing the currently reserved core.
+        """A class representing the currently reserved cpus.
 
         .. note::
 
-            This class is mutable, so :meth:`~Core.get_core_number` might
-            change.
+            This class is mutable, so :meth:`~Core.get_core_number` and
+            :meth:`~Core.get_cpus` might change.
         """
 
-        def __init__(self, core_number: int, cores: 'CpuCores') -> None:
-            self._core_number = core_number
+        def __init__(self, cpus: t.List[int], cores: 'CpuCores') -> None:
+            self._cpus = cpus
             self._cores = cores
 
         def get_core_number(self) -> int:
-            """Get the number of the core that is reserved.
+            """Get the number of the first core that is reserved.
             """
-            return self._core_number
+            return self._cpus[0]
+
+        def get_cpus(self) -> t.List[int]:
+            """Get the numbers of all cpus that are reserved.
+            """
+            return list(self._cpus)
 
         def yield_core(self) -> bool:
-            """Yield the current core.
+            """Yield the current cores.
 
             .. warning::
 
-                The core that is reserved might be changed after this call. So
-                make sure that you actually lock the container to this core
-                after the call.
+                The cores that are reserved might be changed after this call.
+                So make sure that you actually lock the container to these
+                cores after the call.
+            """
+            return self.resize(len(self._cpus))
+
+        def resize(self, amount: int) -> bool:
+            """Change the amount of cpus that are reserved.
+
+            The current cpus are released before the new cpus are reserved,
+            so the same warning as for :meth:`~Core.yield_core` applies.
+
+            :param amount: The amount of cpus to reserve, this is capped at
+                the amount of cpus available on this machine.
+            :returns: ``True`` if the reserved cpus changed.
             """
-            new_number = self._cores.yield_core(self._core_number)
-            old_number = self._core_number
-            self._core_number = new_number
-            return new_number != old_number
+            new_cpus = self._cores.yield_cpus(self._cpus, amount)
+            old_cpus = self._cpus
+            self._cpus = new_cpus
+            return new_cpus != old_cpus
 
     def __init__(
         self,
@@ -426,40 +502,63 @@ class CpuCores:
         number_of_cores: t.Optional[int] = None,
     ) -> None:
         self._number_of_cores = number_of_cores or _get_amount_cpus()
-        self._available_cores: 'Queue[int]' = manager.Queue(  # type: ignore
-            self._number_of_cores
+        self._topology = _get_cpu_topology(self._number_of_cores)
+        self._free_cpus: t.List[int] = manager.list(  # type: ignore
+            range(self._number_of_cores)
+        )
+        self._cpus_freed: threading.Condition = manager.Condition(  # type: ignore
         )
         self._lock: cg_threading_utils.FairLock = manager.FairLock(  # type: ignore
         )
-        for core in range(self._number_of_cores):
-            self._available_cores.put(core)
 
-    def yield_core(self, core_number: int) -> int:
-        """Yield the given core.
+    def yield_cpus(self, cpus: t.List[int], amount: int) -> t.List[int]:
+        """Yield the given cpus and reserve ``amount`` new cpus.
 
-        :returns: The number of the newly reserved core.
+        :returns: The numbers of the newly reserved cpus.
         """
-        self._available_cores.put(core_number)
-        return self._get_core()
+        self._release_cpus(cpus)
+        return self._get_cpus(amount)
+
+    def _release_cpus(self, cpus: t.List[int]) -> None:
+        with self._cpus_freed:
+            self._free_cpus.extend(cpus)
+            self._cpus_freed.notify_all()
+
+    def _get_cpus(self, amount: int) -> t.List[int]:
+        amount = max(1, min(amount, self._number_of_cores))
 
-    def _get_core(self) -> int:
+        # The fair lock makes sure cpus are handed out in order, while the
+        # condition is used to wait for enough cpus to be released.
         self._lock.acquire()
         try:
-            return self._available_cores.get()
+            with self._cpus_freed:
+                while True:
+                    free = self._free_cpus[:]
+                    picked = _pick_cpus(free, amount, self._topology)
+                    if picked is not None:
+                        self._free_cpus[:] = [
+                            cpu for cpu in free if cpu not in picked
+                        ]
+                        return picked
+                    self._cpus_freed.wait()
         finally:
             self._lock.release()
 
     @contextlib.contextmanager
-    def reserved_core(self) -> t.Generator['CpuCores.Core', None, None]:
-        """Reserve a core for the duration of the ``with`` block.
+    def reserved_core(
+        self, amount: int = 1
+    ) -> t.Generator['CpuCores.Core', None, None]:
+        """Reserve cores for the duration of the ``with`` block.
+
+        :param amount: The amount of cpus to reserve initially.
         """
-        core = self.Core(self._get_core(), self)
-        logger.info('Got core number', core=core)
+        core = self.Core(self._get_cpus(amount), self)
+        logger.info('Got cores', cpus=core.get_cpus())
 
         try:
             yield core
         finally:
-            self._available_cores.put(core.get_core_number())
+            self._release_cpus(core.get_cpus())
 
 
 class StopContainerException(Exception):
@@ -507,6 +606,17 @@ def _maybe_quit_running() -> None:
         raise StopContainerException
 
 
+def _remove_download(future: 'Future[str]') -> None:
+    """Remove the directory of a download that is done.
+
+    :param future: The done download, which resolves to the path of the
+        downloaded file.
+    :returns: Nothing.
+    """
+    if future.exception() is None:
+        shutil.rmtree(os.path.dirname(future.result()), ignore_errors=True)
+
+
 def _get_new_container_name() -> str:
     """Get a new unique container name
 
@@ -531,6 +641,158 @@ def _get_amount_cpus() -> int:
     return os.cpu_count() or 1
 
 
+@dataclasses.dataclass(frozen=True)
+class _CpuInfo:
+    """The location of a single (logical) cpu.
+
+    :ivar number: The number of the cpu, as used by ``cpuset.cpus``.
+    :ivar core: The physical core of this cpu, cpus with the same core are
+        hyperthread siblings.
+    :ivar node: The NUMA node of this cpu.
+    """
+    number: int
+    core: t.Tuple[int, int]
+    node: int
+
+
+def _read_int_file(path: str, default: int) -> int:
+    try:
+        with open(path, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return default
+
+
+def _get_cpu_topology(amount: int) -> t.List[_CpuInfo]:
+    """Get the topology of the first ``amount`` cpus of this system.
+
+    If the topology cannot be read every cpu is considered to be its own
+    physical core on a single NUMA node.
+
+    >>> topo = _get_cpu_topology(1)
+    >>> [cpu.number for cpu in topo]
+    [0]
+    >>> isinstance(topo[0].node, int)
+    True
+    """
+    res = []
+    for number in range(amount):
+        base = f'/sys/devices/system/cpu/cpu{number}'
+        package = _read_int_file(f'{base}/topology/physical_package_id', 0)
+        core_id = _read_int_file(f'{base}/topology/core_id', number)
+        node = 0
+        try:
+            nodes = [n for n in os.listdir(base) if n.startswith('node')]
+        except OSError:
+            nodes = []
+        if nodes:
+            try:
+                node = int(nodes[0][len('node'):])
+            except ValueError:
+                pass
+        res.append(_CpuInfo(number=number, core=(package, core_id), node=node))
+    return res
+
+
+def _pick_cpus(
+    free: t.Collection[int],
+    amount: int,
+    topology: t.Sequence[_CpuInfo],
+) -> t.Optional[t.List[int]]:
+    """Pick ``amount`` cpus from the ``free`` cpus.
+
+    A single cpu is packed as tightly as possible: we prefer a cpu of which
+    the hyperthread siblings are already in use, so completely free physical
+    cores stay available. Multiple cpus are spread over different physical
+    cores on a single NUMA node where possible, so they don't compete for the
+    same core.
+
+    >>> topo = [
+    ...  _CpuInfo(0, (0, 0), 0), _CpuInfo(1, (0, 1), 0),
+    ...  _CpuInfo(2, (0, 0), 0), _CpuInfo(3, (0, 1), 0),
+    ...  _CpuInfo(4, (1, 0), 1), _CpuInfo(5, (1, 0), 1),
+    ... ]
+    >>> # Fill the smallest node first, so the larger one stays free
+    >>> _pick_cpus({0, 1, 2, 3, 4, 5}, 1, topo)
+    [4]
+    >>> # Pack onto the core of which cpu 0 is already used
+    >>> _pick_cpus({1, 2, 3, 4, 5}, 1, topo)
+    [2]
+    >>> # Spread over the two physical cores of node 0
+    >>> _pick_cpus({0, 1, 2, 3, 4, 5}, 2, topo)
+    [0, 1]
+    >>> # Prefer the node that can hold all cpus on different cores
+    >>> _pick_cpus({1, 2, 4, 5}, 2, topo)
+    [1, 2]
+    >>> _pick_cpus({0, 1, 2, 3, 4, 5}, 4, topo)
+    [0, 1, 2, 3]
+    >>> _pick_cpus({1, 4}, 2, topo)
+    [1, 4]
+    >>> _pick_cpus({1}, 2, topo) is None
+    True
+
+    :param free: The cpus that are currently free.
+    :param amount: The amount of cpus wanted.
+    :param topology: The topology of all cpus.
+    :returns: The picked cpus, or ``None`` if there are not enough free cpus.
+    """
+    if len(free) < amount:
+        return None
+
+    free_cpus = [cpu for cpu in topology if cpu.number in free]
+    free_per_core = collections.Counter(cpu.core for cpu in free_cpus)
+    size_per_core = collections.Counter(cpu.core for cpu in topology)
+    free_per_node = collections.Counter(cpu.node for cpu in free_cpus)
+
+    if amount == 1:
+        # The cpu on the core with the most used siblings, on the most used
+        # node.
+        best = min(
+            free_cpus,
+            key=lambda cpu: (
+                free_per_core[cpu.core] - size_per_core[cpu.core],
+                free_per_core[cpu.core],
+                free_per_node[cpu.node],
+                cpu.number,
+            )
+        )
+        return [best.number]
+
+    def spread(cpus: t.List[_CpuInfo]) -> t.List[int]:
+        # Take one cpu per physical core in every round, so siblings are only
+        # used when there are not enough physical cores.
+        res: t.List[int] = []
+        rounds: t.DefaultDict[int, t.List[_CpuInfo]]
+        rounds = collections.defaultdict(list)
+        seen: t.Counter[t.Tuple[int, int]] = collections.Counter()
+        for cpu in sorted(cpus, key=lambda c: c.number):
+            rounds[seen[cpu.core]].append(cpu)
+            seen[cpu.core] += 1
+        for idx in sorted(rounds):
+            res.extend(cpu.number for cpu in rounds[idx])
+        return sorted(res[:amount])
+
+    # Prefer a single node, first one where every cpu gets its own physical
+    # core, and otherwise the node with the least free cpus that fits.
+    cores_per_node: t.DefaultDict[int, t.Set[t.Tuple[int, int]]]
+    cores_per_node = collections.defaultdict(set)
+    for cpu in free_cpus:
+        cores_per_node[cpu.node].add(cpu.core)
+    nodes = sorted(
+        free_per_node,
+        key=lambda node: (
+            len(cores_per_node[node]) < amount,
+            free_per_node[node],
+            node,
+        ),
+    )
+    for node in nodes:
+        if free_per_node[node] >= amount:
+            return spread([cpu for cpu in free_cpus if cpu.node == node])
+
+    return spread(free_cpus)
+
+
 def _get_base_container(config: 'psef.FlaskConfig') -> 'AutoTestContainer':
     helpers.ensure_on_test_server()
     template_name = config['AUTO_TEST_TEMPLATE_CONTAINER']
@@ -645,11 +907,13 @@ class SuiteInstructions(TypedDict, total=True):
     :ivar network_disabled: Should this suite be run with networking disabled.
     :ivar submission_info: Should submission information be included in the
         environment.
+    :ivar cpu_cores: The amount of cpu cores reserved for this suite.
     """
     id: int
     steps: t.List[StepInstructions]
     network_disabled: bool
     submission_info: bool
+    cpu_cores: int
 
 
 class SetInstructions(TypedDict, total=True):
@@ -748,11 +1012,11 @@ def init_app(_: 'psef.PsefFlask') -> None:
 # This wrapper function is needed for Python multiprocessing
 def _run_student(
     cont: 'AutoTestRunner',
-    bc_name: str,
+    container_pool: 'ContainerPool',
     cores: CpuCores,
     opts: cg_worker_pool.CallbackArguments,
 ) -> None:
-    cont.run_student(bc_name, cores, opts)
+    cont.run_student(container_pool, cores, opts)
 
 
 def _try_to_run_job(
@@ -768,7 +1032,9 @@ def _try_to_run_job(
         items = []
         try:
             response = ses.get(
-                f'/api/v1/runners/{runner_id}/jobs/', timeout=_REQUEST_TIMEOUT
+                f'/api/v1/runners/{runner_id}/jobs/',
+                params={'wait': _BROKER_JOB_WAIT},
+                timeout=_REQUEST_TIMEOUT + _BROKER_JOB_WAIT,
             )
             response.raise_for_status()
         except:  # pylint: disable=bare-except
@@ -787,12 +1053,14 @@ def _try_to_run_job(
         logger.bind(server=url)
         logger.info('Checking next server')
 
+        params = {'get': 'tests_to_run'}
+        if 'job_id' in item:
+            params['job_id'] = item['job_id']
+
         try:
             response = requests.get(
                 f'{url}/api/v-internal/auto_tests/',
-                params={
-                    'get': 'tests_to_run',
-                },
+                params=params,
                 headers=headers,
                 timeout=_REQUEST_TIMEOUT,
             )
@@ -879,9 +1147,12 @@ def start_polling(config: 'psef.FlaskConfig') -> None:
                     break
 
         while True:
+            start = time.monotonic()
             if _try_to_run_job(get_broker_session(), runner_id, config, cont):
                 break
-            time.sleep(sleep_time)
+            # The broker waits for new jobs before answering, so we only sleep
+            # when it answered quicker than our poll time.
+            time.sleep(max(sleep_time - (time.monotonic() - start), 0))
 
 
 class StartedContainer:
@@ -975,7 +1246,14 @@ class StartedContainer:
                 self._container.snapshot_destroy(self._snapshots.pop())
 
     def pin_to_core(self, core_number: int) -> None:
-        self.set_cgroup_item('cpuset.cpus', str(core_number))
+        self.pin_to_cpus([core_number])
+
+    def pin_to_cpus(self, cpus: t.Sequence[int]) -> None:
+        """Only allow this container to run on the given cpus.
+
+        :param cpus: The numbers of the cpus the container may use.
+        """
+        self.set_cgroup_item('cpuset.cpus', ','.join(map(str, cpus)))
 
     def set_cgroup_item(self, key: str, value: str) -> None:
         """Set a cgroup option in the given container.
@@ -1098,18 +1376,12 @@ class StartedContainer:
                 )
 
     @staticmethod
-    def _read_fifo(
-        files: t.Mapping[str, OutputCallback], stop: LockableValue[bool]
+    def _read_pipes(
+        files: t.Mapping[int, OutputCallback], stop: LockableValue[bool]
     ) -> None:
-        fds = {}
+        fds = dict(files)
 
         try:
-            for fname, callback in files.items():
-                # We use os primitives here to make sure we get a non blocking
-                # file descriptor.
-                f = os.open(fname, os.O_RDONLY | os.O_NONBLOCK)
-                fds[f] = callback
-
             while fds and not stop.get():
                 reads, _, _ = select.select(list(fds.keys()), [], [], 0.5)
                 for f in reads:
@@ -1421,7 +1693,7 @@ class StartedContainer:
         cmd: t.List[str],
         stdout: t.Union[OutputCallback, None, str] = None,
         stderr: t.Optional[OutputCallback] = None,
-        stdin: t.Optional[bytes] = None,
+        stdin: t.Union[None, bytes, str] = None,
         user: t.Optional[str] = None,
         check: bool = True,
         retry_amount: int = 1,
@@ -1435,7 +1707,9 @@ class StartedContainer:
             filename, where ``stdout`` is redirected to.
         :param stderr: Same as ``stdout`` but for output to stderr, only the
             file option is not supported.
-        :param stdin: The stdin that should be provided to the container.
+        :param stdin: The stdin that should be provided to the container. If
+            passed a string this is interpreted as the name of a file on the
+            host, which is used as stdin.
         :param user: The user that should run the command. If not provided the
             command will be executed by the root user.
         :param check: If ``true`` and exception will be raised when the exit
@@ -1476,17 +1750,22 @@ class StartedContainer:
         self,
         stdout: t.Union[OutputCallback, None, str],
         stderr: t.Optional[OutputCallback],
-        stdin: t.Union[None, bytes],
+        stdin: t.Union[None, bytes, str],
     ) -> t.Generator[t.Tuple[t.IO[bytes], t.BinaryIO, t.BinaryIO, threading.
                              Event, t.Callable[[float], None]], None, None]:
+        stdin_ctx: t.ContextManager[t.IO[bytes]]
+        if stdin is None:
+            stdin_ctx = open('/dev/null', 'rb')
+        elif isinstance(stdin, str):
+            stdin_ctx = open(stdin, 'rb')
+        else:
+            stdin_ctx = tempfile.NamedTemporaryFile()
 
-        with tempfile.TemporaryDirectory() as output_dir, (
-            open('/dev/null', 'rb')
-            if stdin is None else tempfile.NamedTemporaryFile()
-        ) as stdin_file:
+        with stdin_ctx as stdin_file:
             local_logger = structlog.threadlocal.as_immutable(logger)
             if stdin is not None:
                 os.chmod(stdin_file.name, 0o777)
+            if isinstance(stdin, bytes):
                 stdin_file.write(stdin)
                 stdin_file.flush()
                 stdin_file.seek(0, 0)
@@ -1514,22 +1793,25 @@ class StartedContainer:
             stop_reader_threads = LockableValue(False)
             stderr_callback = stderr or _make_log_function('stderr')
 
-            stderr_fifo = os.path.join(output_dir, 'stderr')
-            os.mkfifo(stderr_fifo)
-
-            reader_fifo_files = {stderr_fifo: stderr_inceptor}
+            # We use anonymous pipes instead of named fifos, as these do not
+            # need a directory on disk. The reader thread takes ownership of
+            # the read ends.
+            stderr_read, stderr_write = os.pipe()
+            reader_pipes = {stderr_read: stderr_inceptor}
 
             # If `stdout` is a string this is the path to the file where stdout
             # should be redirected to.
-            if not isinstance(stdout, str):
-                stdout_fifo = os.path.join(output_dir, 'stdout')
-                os.mkfifo(stdout_fifo)
+            if isinstance(stdout, str):
+                out_ctx = open(stdout, 'wb')
+            else:
+                stdout_read, stdout_write = os.pipe()
                 stdout_callback = stdout or _make_log_function('stdout')
-                reader_fifo_files[stdout_fifo] = stdout_callback
+                reader_pipes[stdout_read] = stdout_callback
+                out_ctx = os.fdopen(stdout_write, 'wb')
 
             reader_thread = threading.Thread(
-                target=self._read_fifo,
-                args=(reader_fifo_files, stop_reader_threads)
+                target=self._read_pipes,
+                args=(reader_pipes, stop_reader_threads)
             )
             reader_thread.start()
 
@@ -1538,13 +1820,11 @@ class StartedContainer:
                 stop_reader_threads.set(True)
 
             # The order is really important here! We first need to close the
-            # two fifo files before we join our threads. As otherwise the
-            # threads will hang because they are still reading from these
-            # files.
+            # write ends of the two pipes before we join our threads. As
+            # otherwise the threads will hang because they are still reading
+            # from these pipes.
             try:
-                with open(
-                    stdout if isinstance(stdout, str) else stdout_fifo, 'wb'
-                ) as out, open(stderr_fifo, 'wb') as err:
+                with out_ctx as out, os.fdopen(stderr_write, 'wb') as err:
                     yield (
                         stdin_file,
                         out,
@@ -1561,7 +1841,7 @@ class StartedContainer:
         callback: t.Callable[[T], int],
         stdout: t.Union[OutputCallback, None, str],
         stderr: t.Optional[OutputCallback],
-        stdin: t.Union[None, bytes],
+        stdin: t.Union[None, bytes, str],
         check: bool,
         timeout: t.Union[None, float, int],
     ) -> int:
@@ -1672,6 +1952,9 @@ class AutoTestContainer:
     def start_container(self) -> None:
         _start_container(self._cont)
 
+    def stop_container(self) -> None:
+        _stop_container(self._cont)
+
     def destroy_container(self) -> None:
         self._cont.destroy()
 
@@ -1702,6 +1985,278 @@ class AutoTestContainer:
             return type(self)(new_name, self._config, cont)
 
 
+class ContainerPool:
+    """A pool of started containers, all cloned from the same base container.
+
+    The pool is filled in the background by ``size`` threads, so a worker can
+    claim a container that is already booted instead of having to wait for a
+    clone to start. Claimed containers are destroyed after use, and a new
+    container is cloned in their place.
+
+    The pool can be shared between processes, as the started containers are
+    passed around by name.
+    """
+
+    def __init__(
+        self,
+        manager: _Manager,
+        base_container_name: str,
+        config: 'psef.FlaskConfig',
+        size: int,
+    ) -> None:
+        self._base_container_name = base_container_name
+        self._config = config
+        self._size = size
+        self._ready: 'Queue[str]' = manager.Queue()  # type: ignore
+        self._free_slots = manager.Semaphore(size)  # type: ignore
+        self._fillers: t.List[threading.Thread] = []
+
+    def _new_container(self) -> AutoTestContainer:
+        base = AutoTestContainer(self._base_container_name, self._config)
+        return base.clone()
+
+    def _fill(self) -> None:
+        while not _STOP_RUNNING.is_set():
+            if not self._free_slots.acquire(timeout=1):
+                continue
+
+            cont = None
+            try:
+                cont = self._new_container()
+                cont.start_container()
+            except StopContainerException:
+                self._free_slots.release()
+                if cont is not None:
+                    self._destroy(cont)
+                return
+            except:  # pylint: disable=bare-except
+                logger.warning('Failed to fill container pool', exc_info=True)
+                self._free_slots.release()
+                if cont is not None:
+                    self._destroy(cont)
+                _STOP_RUNNING.wait(1)
+            else:
+                logger.info('Added container to pool', container=cont.name)
+                self._ready.put(cont.name)
+
+    @staticmethod
+    def _destroy(cont: AutoTestContainer) -> None:
+        try:
+            cont.stop_container()
+        finally:
+            cont.destroy_container()
+
+    def start(self) -> None:
+        """Start filling this pool in the background.
+
+        The filling stops when ``_STOP_RUNNING`` is set.
+        """
+        for _ in range(self._size):
+            filler = threading.Thread(target=self._fill)
+            filler.start()
+            self._fillers.append(filler)
+
+    def stop(self) -> None:
+        """Wait for the filling of the pool to stop, and destroy all
+        containers that were never claimed.
+
+        .. note:: ``_STOP_RUNNING`` should be set before calling this method.
+        """
+        while self._fillers:
+            self._fillers.pop().join()
+
+        while True:
+            try:
+                name = self._ready.get(False)
+            except queue.Empty:
+                break
+            with cg_logger.bound_to_logger(container=name):
+                try:
+                    self._destroy(AutoTestContainer(name, self._config))
+                except:  # pylint: disable=bare-except
+                    logger.warning(
+                        'Failed to destroy pooled container', exc_info=True
+                    )
+
+    def _claim(self) -> AutoTestContainer:
+        if self._size > 0:
+            # If no container is ready every filler is busy starting one, or
+            # is about to start one for a slot that was just freed. Waiting for
+            # it is not faster than cloning a container ourselves.
+            try:
+                name = self._ready.get(False)
+            except queue.Empty:
+                logger.info('No container available in pool')
+            else:
+                self._free_slots.release()
+                return AutoTestContainer(name, self._config)
+
+        return self._new_container()
+
+    @contextlib.contextmanager
+    def claimed_container(
+        self
+    ) -> t.Generator[StartedContainer, None, None]:
+        """Claim a started container from the pool for the duration of the
+        ``with`` block.
+
+        The container is destroyed when the block is exited. If no container
+        is available in the pool a new one is cloned.
+        """
+        with self._claim().started_container() as cont:
+            yield cont
+
+
+class _StepResultReporter:
+    """Send updates of step results to the server in batches.
+
+    Multiple updates of the same step result are coalesced into one, only the
+    last update is sent. Pending updates are sent at most
+    ``_STEP_RESULT_FLUSH_INTERVAL`` seconds after they were made, so the
+    progress of a student is still visible while the steps are running.
+
+    :param req: The session used to do the requests. As pending updates are
+        also sent from a background thread this session should not be used
+        for anything else, it is closed when the reporter is closed.
+    :param url: The url of the step results of the result we are reporting
+        for.
+    """
+
+    def __init__(self, req: requests.Session, url: str) -> None:
+        self._req = req
+        self._url = url
+        self._lock = threading.RLock()
+        # Mapping from step id to the last update of its result.
+        self._pending: t.Dict[int, t.Dict[str, object]] = {}
+        self._step_result_ids: t.Dict[int, int] = {}
+        self._last_flush = -_STEP_RESULT_FLUSH_INTERVAL
+        self._timer: t.Optional[threading.Timer] = None
+
+    def update(
+        self,
+        test_step: StepInstructions,
+        state: models.AutoTestStepResultState,
+        log: t.Dict[str, object],
+        attachment: t.Optional[t.IO[bytes]],
+    ) -> None:
+        """Update the result of the given step.
+
+        :param test_step: The step of which the result should be updated.
+        :param state: The new state of the result.
+        :param log: The new log of the result.
+        :param attachment: An attachment of the result, updates with an
+            attachment are sent directly.
+        """
+        data: t.Dict[str, object] = {
+            'log': log,
+            'state': state.name,
+            'auto_test_step_id': test_step['id'],
+        }
+
+        with self._lock:
+            if attachment is not None:
+                # Attachments cannot be sent in a batch, so we send this update
+                # on its own, after all updates that were made before it.
+                self._pending.pop(test_step['id'], None)
+                self.flush()
+                self._send_with_attachment(data, attachment)
+                return
+
+            self._pending[test_step['id']] = data
+            if (
+                time.monotonic() - self._last_flush >=
+                _STEP_RESULT_FLUSH_INTERVAL or
+                len(self._pending) >= _STEP_RESULT_BATCH_SIZE
+            ):
+                self.flush()
+            elif self._timer is None:
+                delay = _STEP_RESULT_FLUSH_INTERVAL - (
+                    time.monotonic() - self._last_flush
+                )
+                self._timer = threading.Timer(delay, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _send_with_attachment(
+        self, data: t.Dict[str, object], attachment: t.IO[bytes]
+    ) -> None:
+        step_id = t.cast(int, data['auto_test_step_id'])
+        data = {**data, 'has_attachment': True}
+        if step_id in self._step_result_ids:
+            data['id'] = self._step_result_ids[step_id]
+
+        logger.info('Posting result data', json=data, url=self._url)
+        json_data = io.StringIO()
+        json.dump(data, json_data)
+        json_data.seek(0, 0)
+
+        response = self._req.put(
+            self._url,
+            files={
+                'attachment': attachment,
+                'json': json_data,
+            },
+            timeout=_REQUEST_TIMEOUT,
+        )
+        logger.info('Posted result data', response=response)
+        response.raise_for_status()
+        self._step_result_ids[step_id] = response.json()['id']
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except:  # pylint: disable=bare-except
+            logger.warning('Failed to send step results', exc_info=True)
+
+    def flush(self) -> None:
+        """Send all pending updates to the server.
+
+        If sending fails the updates are kept, so they will be sent again by
+        the next flush.
+
+        :returns: Nothing.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+
+            updates = []
+            for step_id, data in self._pending.items():
+                step_result_id = self._step_result_ids.get(step_id)
+                if step_result_id is not None:
+                    data = {**data, 'id': step_result_id}
+                updates.append(data)
+
+            logger.info(
+                'Posting result data', amount=len(updates), url=self._url
+            )
+            response = self._req.put(
+                f'{self._url}batch/',
+                json={'step_results': updates},
+                timeout=_REQUEST_TIMEOUT,
+            )
+            logger.info('Posted result data', response=response)
+            response.raise_for_status()
+
+            for step_id, step_result in zip(self._pending, response.json()):
+                self._step_result_ids[step_id] = step_result['id']
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+
+    def close(self) -> None:
+        """Try to send all pending updates, without raising when this fails,
+        and close the session of this reporter.
+
+        :returns: Nothing.
+        """
+        with self._lock:
+            self._flush_in_background()
+            self._req.close()
+
+
 class AutoTestRunner:
     """This class contains all functionality needed to run a single AutoTest.
     """
@@ -1727,6 +2282,11 @@ class AutoTestRunner:
 
         self.fixtures = self.instructions['fixtures']
         self._reqs: t.Dict[t.Tuple[int, int], requests.Session] = {}
+        self._downloaders: t.Dict[int, ThreadPoolExecutor] = {}
+        self._student_infos: t.MutableMapping[int, StudentInformation] = {
+            info['result_id']: info
+            for info in instructions.get('student_infos', None) or []
+        }
 
     @staticmethod
     def _get_amount_of_needed_workers() -> int:
@@ -1750,7 +2310,7 @@ class AutoTestRunner:
 
     def _make_worker_pool(
         self,
-        base_container_name: str,
+        container_pool: ContainerPool,
         cpu_cores: CpuCores,
     ) -> cg_worker_pool.WorkerPool:
         mult = int(self._should_poll_after_done(self.instructions))
@@ -1759,23 +2319,56 @@ class AutoTestRunner:
             # Over provision a bit so clones can be made quicker.
             processes=self._get_amount_of_needed_workers(),
             function=lambda get_work:
-            _run_student(self, base_container_name, cpu_cores, get_work),
+            _run_student(self, container_pool, cpu_cores, get_work),
             sleep_time=mult * self.config['AUTO_TEST_CF_SLEEP_TIME'],
             extra_amount=mult * self.config['AUTO_TEST_CF_EXTRA_AMOUNT'],
             initial_work=self.work,
+            low_water_mark=max(self._get_work_buffer_size() // 2, 1),
+        )
+
+    def _get_work_buffer_size(self) -> int:
+        """Get the amount of results we want to have queued at any time.
+        """
+        return (
+            _get_amount_cpus() * self.config['AUTO_TEST_WORK_BUFFER_PER_CORE']
         )
 
-    def _work_producer(self, last_call: bool) -> t.List[cg_worker_pool.Work]:
+    def _work_producer(
+        self, pool: cg_worker_pool.WorkerPool, last_call: bool
+    ) -> t.List[cg_worker_pool.Work]:
+        buffer_size = self._get_work_buffer_size()
+        if not last_call and pool.get_amount_queued() >= buffer_size:
+            return []
+
+        # The server returns the oldest results that still need to run, so
+        # this includes the results we already have queued.
         url = furl.furl(self.base_url).add(
             path=['runs', self.instructions['run_id'], 'results', ''],
             args={
                 'last_call': last_call,
-                'limit': _get_amount_cpus() * 4,
+                'limit': buffer_size,
+                'with_student_info': True,
             },
         )
         res = self.req.get(str(url), timeout=_REQUEST_TIMEOUT)
         res.raise_for_status()
-        return [cg_worker_pool.Work(**item) for item in res.json()]
+        items = res.json()
+
+        # Store the information before the results are queued, so it is
+        # available when a worker starts with the result. Older servers do not
+        # return this information, in which case we only have the information
+        # from the instructions.
+        self._student_infos.update(
+            {
+                item['result_id']: item['student_info']
+                for item in items if item.get('student_info') is not None
+            }
+        )
+        return [
+            cg_worker_pool.Work(
+                result_id=item['result_id'], student_id=item['student_id']
+            ) for item in items
+        ]
 
     @staticmethod
     def _make_req_key() -> t.Tuple[int, int]:
@@ -1824,84 +2417,88 @@ class AutoTestRunner:
         key = self._make_req_key()
 
         if key not in self._reqs:
-            req = requests.Session()
-            req.auth = ('', '')
-            req.headers.update(
-                {
-                    'CG-Internal-Api-Password': self._global_password,
-                    'CG-Internal-Api-Runner-Password': self._local_password,
-                }
-            )
-            adapter = self._get_retry_adapter()
-            req.mount('http://', adapter)
-            req.mount('https://', adapter)
-            self._reqs[key] = req
+            self._reqs[key] = self._make_session()
         return self._reqs[key]
 
+    def _make_session(self) -> requests.Session:
+        """Create a new request session with the correct headers for
+            authentication.
+        """
+        req = requests.Session()
+        req.auth = ('', '')
+        req.headers.update(
+            {
+                'CG-Internal-Api-Password': self._global_password,
+                'CG-Internal-Api-Runner-Password': self._local_password,
+            }
+        )
+        adapter = self._get_retry_adapter()
+        req.mount('http://', adapter)
+        req.mount('https://', adapter)
+        return req
+
     @property
     def _local_password(self) -> str:
         return self.instructions["runner_id"]
 
     @property
-    def _wget_headers(self) -> t.List[str]:
-        return [
-            '--header',
-            f'CG-Internal-Api-Password: {self._global_password}',
-            '--header',
-            f'CG-Internal-Api-Runner-Password: {self._local_password}',
-        ]
+    def _downloader(self) -> ThreadPoolExecutor:
+        """Get a pool of threads, unique for this process, that should be
+        used to download files to the host.
 
-    def download_file(
-        self,
-        cont: StartedContainer,
-        url: str,
-        dst: str,
-        from_home: bool = True
-    ) -> None:
-        """Download the given url to the given destination.
+        As every thread has its own session (see :attr:`.AutoTestRunner.req`)
+        the connections to the server are reused between downloads.
+        """
+        pid = os.getpid()
+        if pid not in self._downloaders:
+            self._downloaders[pid] = ThreadPoolExecutor(_DOWNLOAD_THREADS)
+        return self._downloaders[pid]
+
+    def download_file(self, url: str, dst: str) -> None:
+        """Download the given url to the given destination on the host.
 
-        :param cont: The container in which to download the files.
-        :param url: The url from which to download the files.
-        :param dst: The path in the container where to store the file.
-        :param from_home: Should the ``dst`` path be interpreted as a relative
-            path from the home directory of the codegrade user.
+        :param url: The url from which to download the file.
+        :param dst: The path on the host where to store the file.
         """
-        if from_home:
-            dst = f'{_get_home_dir(CODEGRADE_USER)}/{dst}'
-        for _ in helpers.retry_loop(
-            _REQUEST_RETRIES,
-            sleep_time=lambda n: min(
-                _REQUEST_BACKOFF_FACTOR * (2 ** (n - 1)),
-                Retry.BACKOFF_MAX,
-            ),
-            make_exception=StopRunningStudentException
-        ):
-            if cont.run_command(
-                [
-                    'wget',
-                    *self._wget_headers,
-                    f'{self.base_url}/{url}',
-                    '-O',
-                    dst,
-                ],
-                user=CODEGRADE_USER,
-                check=False,
-            ) == 0:
-                break
-        cont.run_command(['chmod', '-R', '750', dst], user=CODEGRADE_USER)
+        with self.req.get(
+            f'{self.base_url}/{url}', stream=True, timeout=_DOWNLOAD_TIMEOUT
+        ) as res:
+            res.raise_for_status()
+            with open(dst, 'wb') as f:
+                for chunk in res.iter_content(chunk_size=2 ** 16):
+                    f.write(chunk)
         logger.info('Downloaded file', dst=dst, url=url)
 
     def download_fixtures(self, cont: StartedContainer) -> None:
         """Download all the fixtures of this test.
 
+        The fixtures are downloaded in parallel on the host, and copied into
+        the container in one go.
+
         :param cont: The container in which the fixtures should be downloaded.
         """
-        for name, fixture_id in self.fixtures:
-            self.download_file(
-                cont,
-                f'fixtures/{fixture_id}',
-                f'{cont.fixtures_dir}{name}',
-                from_home=False,
+        with tempfile.TemporaryDirectory() as tmpdir:
+            urls = [f'fixtures/{fix_id}' for _, fix_id in self.fixtures]
+            paths = [
+                os.path.join(tmpdir, str(idx))
+                for idx in range(len(self.fixtures))
+            ]
+            # Consume the iterator so we raise any errors of the downloads.
+            list(self._downloader.map(self.download_file, urls, paths))
+
+            def set_mode(info: tarfile.TarInfo) -> tarfile.TarInfo:
+                info.mode = 0o750
+                return info
+
+            archive = os.path.join(tmpdir, 'fixtures.tar')
+            with tarfile.open(archive, 'w') as tar:
+                for (name, _), path in zip(self.fixtures, paths):
+                    tar.add(path, arcname=name, filter=set_mode)
+
+            cont.run_command(
+                ['tar', '-xpf', '-', '-C', cont.fixtures_dir],
+                stdin=archive,
+                user=CODEGRADE_USER,
             )
 
         cont.run_command(
@@ -1909,35 +2506,88 @@ class AutoTestRunner:
             user=CODEGRADE_USER,
         )
 
+    def _download_to_tmp_dir(self, url: str, name: str) -> str:
+        """Download the given url to a new temporary directory on the host.
+
+        :param url: The url from which to download the file.
+        :param name: The name of the file in the temporary directory.
+        :returns: The path of the downloaded file, the caller should remove
+            its directory.
+        """
+        tmpdir = tempfile.mkdtemp()
+        dst = os.path.join(tmpdir, name)
+        try:
+            self.download_file(url, dst)
+        except:  # pylint: disable=bare-except
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise
+        return dst
+
+    @contextlib.contextmanager
+    def prefetched_student_code(self, result_id: int
+                                ) -> t.Generator['Future[str]', None, None]:
+        """Start downloading the code of the student on the host in the
+        background.
+
+        :param result_id: The id of the result of which the code should be
+            downloaded.
+        :returns: A future resolving to the path on the host of the downloaded
+            zip archive. This path is only valid inside the ``with`` block.
+            Leaving the block does not wait for the download, it is removed
+            when it is done.
+        """
+        future = self._downloader.submit(
+            self._download_to_tmp_dir,
+            f'results/{result_id}?type=submission_files',
+            'student.zip',
+        )
+        try:
+            yield future
+        finally:
+            if not future.cancel():
+                future.add_done_callback(_remove_download)
+
     @timed_function
     def download_student_code(
-        self, cont: StartedContainer, result_id: int
+        self,
+        cont: StartedContainer,
+        result_id: int,
+        prefetched: t.Optional['Future[str]'] = None,
     ) -> None:
         """Download the code of the student.
 
         :param cont: The lxc container in which to download the code.
         :param result_id: The id of the code which should be downloaded.
+        :param prefetched: The already started download of the code, see
+            :meth:`.AutoTestRunner.prefetched_student_code`.
         """
-        url = f'results/{result_id}?type=submission_files'
-        self.download_file(cont, url, 'student.zip')
+        if prefetched is None:
+            with self.prefetched_student_code(result_id) as future:
+                self.download_student_code(cont, result_id, future)
+            return
 
+        home_dir = _get_home_dir(CODEGRADE_USER)
+        # Do everything in a single command, as every command we run in the
+        # container has quite some overhead.
         cont.run_command(
             [
-                'unzip', '-DD', f'{_get_home_dir(CODEGRADE_USER)}/student.zip',
-                '-d', f'{_get_home_dir(CODEGRADE_USER)}/student/'
+                BASH_PATH,
+                '-c',
+                (
+                    'cat > "{zip}" && '
+                    'unzip -DD "{zip}" -d "{student}" && '
+                    'chmod -R +x "{student}" && '
+                    'rm -f "{zip}"'
+                ).format(
+                    zip=f'{home_dir}/student.zip',
+                    student=f'{home_dir}/student/',
+                ),
             ],
-            user=CODEGRADE_USER
+            stdin=prefetched.result(),
+            user=CODEGRADE_USER,
         )
         logger.info('Extracted student code')
 
-        cont.run_command(
-            ['chmod', '-R', '+x', f'{_get_home_dir(CODEGRADE_USER)}/student/'],
-            user=CODEGRADE_USER
-        )
-        cont.run_command(
-            ['rm', '-f', f'{_get_home_dir(CODEGRADE_USER)}/student.zip']
-        )
-
     @timed_function
     def _upload_output_folder(
         self,
@@ -1945,38 +2595,42 @@ class AutoTestRunner:
         result_id: int,
         test_suite: SuiteInstructions,
     ) -> None:
-        has_files = False
-
-        def stdout_callback(output: bytes) -> None:
-            nonlocal has_files
-            if output:
-                has_files = True
-
-        cont.run_command(
-            ['find', cont.output_dir, '-type', 'f'],
-            stdout=stdout_callback,
-        )
-        if not has_files:
-            return
-
-        with tempfile.NamedTemporaryFile() as tfile:
-            os.chmod(tfile.name, 0o622)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # The archive is created without compression inside the container,
+            # so that the core of the student is not busy compressing files.
+            # If needed we compress on the host afterwards.
+            tar_path = os.path.join(tmpdir, 'f.tar')
             cont.run_command(
-                ['tar', 'cjf', '/dev/stdout', cont.output_dir],
+                ['tar', 'cf', '/dev/stdout', cont.output_dir],
                 user=CODEGRADE_USER,
-                stdout=tfile.name
+                stdout=tar_path,
             )
-            tfile.seek(0, 0)
+
+            with tarfile.open(tar_path) as tar:
+                if not any(member.isfile() for member in tar):
+                    return
+
+            upload_path = tar_path
+            if os.path.getsize(tar_path) > _OUTPUT_COMPRESS_THRESHOLD:
+                upload_path = f'{tar_path}.gz'
+                with open(tar_path, 'rb') as src, gzip.open(
+                    upload_path, 'wb', compresslevel=1
+                ) as dst:
+                    shutil.copyfileobj(src, dst)
 
             suite_id = test_suite['id']
             base = self.base_url
             url = f'{base}/results/{result_id}/suites/{suite_id}/files/'
-            response = self.req.post(
-                url,
-                files={
-                    'file': ('f.tar.bz2', tfile, 'application/octet-stream'),
-                },
-            )
+            with open(upload_path, 'rb') as upload:
+                response = self.req.post(
+                    url,
+                    files={
+                        'file': (
+                            os.path.basename(upload_path), upload,
+                            'application/octet-stream'
+                        ),
+                    },
+                )
             logger.info(
                 'Uploaded files to server',
                 response=response,
@@ -1994,63 +2648,33 @@ class AutoTestRunner:
         def yield_core() -> None:
             with snap.stopped_container():
                 cpu_core.yield_core()
-            snap.pin_to_core(cpu_core.get_core_number())
+            snap.pin_to_cpus(cpu_core.get_cpus())
+
+        # The student container is idle between suites, so we can change the
+        # amount of reserved cpus before the snapshot is started.
+        wanted_cpus = test_suite.get('cpu_cores', 1)
+        if wanted_cpus != len(cpu_core.get_cpus()):
+            cpu_core.resize(wanted_cpus)
 
         extra_env = self._get_suite_env(
             result_id,
             submission_info=test_suite.get('submission_info', False),
         )
 
-        step_result_id: t.Optional[int] = None
-
-        def outer_update_test_result(
-            state: models.AutoTestStepResultState,
-            log: t.Dict[str, object],
-            test_step: StepInstructions,
-            attachment: t.Optional[t.IO[bytes]],
-        ) -> None:
-            nonlocal step_result_id
-            data = {
-                'log': log,
-                'state': state.name,
-                'auto_test_step_id': test_step['id'],
-                'has_attachment': attachment is not None,
-            }
-            if step_result_id is not None:
-                data['id'] = step_result_id
-
-            logger.info('Posting result data', json=data, url=url)
-            if attachment is not None:
-                json_data = io.StringIO()
-                json.dump(data, json_data)
-                json_data.seek(0, 0)
-
-                response = self.req.put(
-                    url,
-                    files={
-                        'attachment': attachment,
-                        'json': json_data,
-                    },
-                    timeout=_REQUEST_TIMEOUT,
-                )
-            else:
-                response = self.req.put(
-                    url,
-                    json=data,
-                    timeout=_REQUEST_TIMEOUT,
-                )
-            logger.info('Posted result data', response=response)
-            response.raise_for_status()
-            step_result_id = response.json()['id']
+        # The reporter gets its own session, as the session of this thread
+        # is not thread safe and the reporter also uses it in the background.
+        reporter = _StepResultReporter(
+            self._make_session(),
+            f'{self.base_url}/results/{result_id}/step_results/',
+        )
 
         with student_container.as_snapshot(
             test_suite['network_disabled']
-        ) as snap, snap.extra_env(extra_env):
-            url = f'{self.base_url}/results/{result_id}/step_results/'
+        ) as snap, snap.extra_env(extra_env), contextlib.closing(reporter):
+            snap.pin_to_cpus(cpu_core.get_cpus())
 
             for idx, test_step in enumerate(test_suite['steps']):
                 logger.info('Running step', step=test_step)
-                step_result_id = None
 
                 def update_test_result(
                     state: models.AutoTestStepResultState,
@@ -2059,9 +2683,7 @@ class AutoTestRunner:
                     attachment: t.Optional[t.IO[bytes]] = None,
                     test_step: StepInstructions = test_step,
                 ) -> None:
-                    return outer_update_test_result(
-                        state, log, test_step=test_step, attachment=attachment
-                    )
+                    reporter.update(test_step, state, log, attachment)
 
                 typ = auto_test_handlers[test_step['test_type_name']]
 
@@ -2106,8 +2728,13 @@ class AutoTestRunner:
                     finally:
                         possible_points += test_step['weight']
 
+            reporter.flush()
             self._upload_output_folder(snap, result_id, test_suite)
 
+        # Don't keep the extra cpus of this suite longer than needed.
+        if len(cpu_core.get_cpus()) > 1:
+            cpu_core.resize(1)
+
         return total_points, possible_points
 
     @staticmethod
@@ -2155,6 +2782,7 @@ class AutoTestRunner:
         cont: StartedContainer,
         cpu: CpuCores.Core,
         result_id: int,
+        student_code: t.Optional['Future[str]'] = None,
     ) -> bool:
         # TODO: Split this function
         result_url = f'{self.base_url}/results/{result_id}'
@@ -2168,13 +2796,13 @@ class AutoTestRunner:
                     'memory.limit_in_bytes',
                     self.config['AUTO_TEST_MEMORY_LIMIT']
                 )
-                cont.pin_to_core(cpu.get_core_number())
+                cont.pin_to_cpus(cpu.get_cpus())
                 cont.set_cgroup_item(
                     'memory.memsw.limit_in_bytes',
                     self.config['AUTO_TEST_MEMORY_LIMIT']
                 )
 
-            self.download_student_code(cont, result_id)
+            self.download_student_code(cont, result_id, student_code)
 
             cont.move_fixtures_dir(uuid.uuid4().hex)
             self._maybe_run_setup(cont, self.setup_script, result_url)
@@ -2267,19 +2895,17 @@ class AutoTestRunner:
                 )
 
     def run_student(
-        self, base_container_name: str, cpu_cores: CpuCores,
+        self, container_pool: ContainerPool, cpu_cores: CpuCores,
         opts: cg_worker_pool.CallbackArguments
     ) -> None:
         """Run the test for a single student.
 
-        :param base_container_name: The name of the base lxc container.
+        :param container_pool: The pool from which the container for the
+            student is claimed.
         :param cpu_cores: The cpu cores which are available during testing.
-        :param result_id: The id of the student to run.
         :param opts: The way to get work from the worker pool.
         :returns: Nothing.
         """
-        base_container = AutoTestContainer(base_container_name, self.config)
-        student_container = base_container.clone()
 
         def retry_work(work: cg_worker_pool.Work) -> None:
             try:
@@ -2296,45 +2922,55 @@ class AutoTestRunner:
             finally:
                 opts.retry_work(work)
 
-        with student_container.started_container() as cont:
-            while True:
-                work = opts.get_work()
-                if work is None:
-                    return
-                result_id = work.result_id
-
-                with cpu_cores.reserved_core() as cpu:
-                    patch_res = self.req.patch(
-                        f'{self.base_url}/results/{result_id}',
-                        json={
-                            'state':
-                                models.AutoTestStepResultState.running.name
-                        },
-                        timeout=_REQUEST_TIMEOUT,
-                    )
+        def finish_work(work: cg_worker_pool.Work) -> None:
+            opts.mark_work_as_finished(work)
+            # The information is not needed anymore, so don't let the shared
+            # mapping grow during the run.
+            self._student_infos.pop(work.result_id, None)
 
-                    try:
-                        patch_res.raise_for_status()
-                    except requests.HTTPError as e:
-                        if self._is_old_submission_error(e):
-                            opts.mark_work_as_finished(work)
-                        else:
-                            retry_work(work)
-                        continue
+        while True:
+            work = opts.get_work()
+            if work is None:
+                return
+            result_id = work.result_id
+
+            # Start downloading the code while we wait for a core and a
+            # container to become available.
+            with self.prefetched_student_code(
+                result_id
+            ) as student_code, cpu_cores.reserved_core() as cpu:
+                patch_res = self.req.patch(
+                    f'{self.base_url}/results/{result_id}',
+                    json={
+                        'state': models.AutoTestStepResultState.running.name
+                    },
+                    timeout=_REQUEST_TIMEOUT,
+                )
 
-                    if patch_res.json()['taken']:
-                        opts.mark_work_as_finished(work)
+                try:
+                    patch_res.raise_for_status()
+                except requests.HTTPError as e:
+                    if self._is_old_submission_error(e):
+                        finish_work(work)
                     else:
-                        with cg_logger.bound_to_logger(result_id=result_id):
-                            if self._run_student(cont, cpu, result_id):
-                                opts.mark_work_as_finished(work)
-                            else:
-                                # Student didn't finish correctly. So put back
-                                # in the queue. The retry function contains the
-                                # functionality for only retrying a fixed
-                                # amount of time.
-                                retry_work(work)
-                            return
+                        retry_work(work)
+                    continue
+
+                if patch_res.json()['taken']:
+                    finish_work(work)
+                    continue
+
+                with cg_logger.bound_to_logger(
+                    result_id=result_id
+                ), container_pool.claimed_container() as cont:
+                    if self._run_student(cont, cpu, result_id, student_code):
+                        finish_work(work)
+                    else:
+                        # Student didn't finish correctly. So put back in the
+                        # queue. The retry function contains the functionality
+                        # for only retrying a fixed amount of time.
+                        retry_work(work)
+                    return
 
     def _get_suite_env(
         self,
@@ -2379,13 +3015,7 @@ class AutoTestRunner:
                 instructions=instructions,
             )
 
-        student_info: t.Optional[StudentInformation] = None
-        student_infos = instructions.get('student_infos')
-        if student_infos is not None:
-            student_info = next(
-                (s for s in student_infos if s['result_id'] == result_id),
-                None,
-            )
+        student_info = self._student_infos.get(result_id, None)
         if student_info is not None:
             submission_info.update(
                 {
@@ -2511,10 +3141,27 @@ class AutoTestRunner:
             # Known issue from typeshed:
             # https://github.com/python/typeshed/issues/3018
             cpu_cores: CpuCores = CpuCores(manager)  # type: ignore
-            pool = self._make_worker_pool(base_container.name, cpu_cores)
+            # Results fetched by the work producer in this process should also
+            # have their information available in the workers.
+            self._student_infos = manager.dict(  # type: ignore
+                self._student_infos
+            )
+            pool_size = self.config['AUTO_TEST_CONTAINER_POOL_SIZE']
+            if pool_size < 0:
+                pool_size = self._get_amount_of_needed_workers()
+            container_pool = ContainerPool(
+                manager,
+                base_container.name,
+                self.config,
+                pool_size,
+            )
+            pool = self._make_worker_pool(container_pool, cpu_cores)
 
             try:
-                pool.start(self._work_producer)
+                container_pool.start()
+                pool.start(
+                    lambda last_call: self._work_producer(pool, last_call)
+                )
             except:
                 logger.error('AutoTest crashed', exc_info=True)
                 raise
@@ -2522,3 +3169,4 @@ class AutoTestRunner:
                 logger.info('Done with containers, cleaning up')
             finally:
                 _STOP_RUNNING.set()
+                container_pool.stop()
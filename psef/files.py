@@ -10,7 +10,9 @@ import re
 import sys
 import copy
 import uuid
+import errno
 import shutil
+import hashlib
 import typing as t
 import tarfile
 import zipfile
@@ -217,11 +219,40 @@ class FileTree(t.Generic[T]):
     :param entries: If not ``None`` this file is a directory, and contains
         these files as direct children.
     """
-    __slots__ = ('name', 'id', 'entries')
+    __slots__ = ('name', 'id', 'entries', '_path_index')
     name: str
     id: T
     entries: t.Optional[t.Sequence['FileTree[T]']]
 
+    def get_path_index(self) -> t.Mapping[str, T]:
+        """Get a mapping from every path in this tree to the id of the file at
+        that path.
+
+        The paths are relative to this tree, do not contain empty parts and do
+        not start or end with a slash, the path of the root is the empty
+        string. The index is computed once and cached on this tree, so the tree
+        should not be modified after calling this method.
+
+        :returns: The index as described above.
+        """
+        try:
+            return self._path_index  # type: ignore
+        except AttributeError:
+            pass
+
+        index: t.Dict[str, T] = {}
+        todo: t.List[t.Tuple[str, FileTree[T]]] = [('', self)]
+        while todo:
+            path, tree = todo.pop()
+            # When a directory contains duplicate names the first one wins.
+            index.setdefault(path, tree.id)
+            for entry in reversed(tree.entries or []):
+                todo.append(
+                    (f'{path}/{entry.name}' if path else entry.name, entry)
+                )
+        self._path_index = index  # pylint: disable=attribute-defined-outside-init
+        return index
+
     def __to_json__(
         self
     ) -> t.Mapping[str, t.Union[str, t.Sequence['FileTree[T]']]]:
@@ -357,21 +388,19 @@ def search_path_in_filetree(filetree: FileTree[T], path: str) -> T:
     ...
     KeyError: 'Path (Non existing/path) not in tree'
 
+    This uses the index of the tree (see :meth:`FileTree.get_path_index`),
+    so only the first search in a tree has to walk the tree.
+
     :param filetree: The filetree to search.
     :param path: The path the search for.
     :returns: The id of the file associated with the path in the filetree.
     """
-    cur = filetree
-    for part in path.split('/'):
-        if not part:
-            continue
-        for entry in (cur.entries or []):
-            if entry.name == part:
-                cur = entry
-                break
-        else:
-            raise KeyError(f'Path ({path}) not in tree')
-    return cur.id
+    try:
+        return filetree.get_path_index()['/'.join(
+            part for part in path.split('/') if part
+        )]
+    except KeyError:
+        raise KeyError(f'Path ({path}) not in tree')
 
 
 def restore_directory_structure(
@@ -427,6 +456,45 @@ def restore_directory_structure(
     return _restore_directory_structure(code, parent, cache)
 
 
+def restore_directory_structures(
+    works: t.Sequence[models.Work],
+    get_parent: t.Callable[[models.Work], str],
+    exclude: models.FileOwner = models.FileOwner.teacher
+) -> t.Dict[int, t.Union[FileTree[int], Exception]]:
+    """Restore the directory structures of multiple submissions.
+
+    This does the same as :func:`restore_directory_structure` for every given
+    submission, but it loads the files of all submissions in a single query.
+
+    :param works: The submissions to restore.
+    :param get_parent: Function to get the path of the parent directory for
+        the given submission.
+    :param exclude: The file owner to exclude.
+    :returns: A mapping from work id to the tree of the restored submission
+        (as described in :func:`restore_directory_structure`), or the
+        exception that occurred while restoring the submission.
+    """
+    caches = models.Work.get_file_children_mappings(works, exclude)
+    res: t.Dict[int, t.Union[FileTree[int], Exception]] = {}
+
+    for work in works:
+        cache = caches[work.id]
+        try:
+            code, = cache.get(None, [])
+        except ValueError as e:
+            res[work.id] = e
+            continue
+
+        try:
+            res[work.id] = _restore_directory_structure(
+                code, get_parent(work), cache
+            )
+        except OSError as e:
+            res[work.id] = e
+
+    return res
+
+
 def _restore_directory_structure(
     code: models.FileMixin[T],
     parent: str,
@@ -453,6 +521,176 @@ def _restore_directory_structure(
         return FileTree(name=code.name, id=code.get_id(), entries=None)
 
 
+class _ZipChunkBuffer(io.RawIOBase):
+    """An unseekable sink for a :class:`zipfile.ZipFile` that collects the
+    written bytes so they can be yielded in chunks.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: t.List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: t.Any) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def pop(self) -> bytes:
+        """Get and remove all bytes written since the last call to this
+        function.
+        """
+        res = b''.join(self._chunks)
+        self._chunks.clear()
+        return res
+
+
+@dataclasses.dataclass(frozen=True)
+class _ZipMember:
+    arcname: str
+    diskname: t.Optional[str]
+    date_time: t.Tuple[int, int, int, int, int, int]
+
+
+def _get_zip_members(
+    code: models.NestedFileMixin[T],
+    cache: t.Mapping[t.Optional[T], t.Sequence[models.NestedFileMixin[T]]],
+    prefix: str,
+) -> t.Iterator[_ZipMember]:
+    name = f'{prefix}{code.name}'
+    date_time = t.cast(
+        t.Tuple[int, int, int, int, int, int],
+        tuple(code.modification_date.timetuple())[:6],
+    )
+    if code.is_directory:
+        yield _ZipMember(
+            arcname=f'{name}/', diskname=None, date_time=date_time
+        )
+        for child in cache[code.get_id()]:
+            yield from _get_zip_members(
+                t.cast(models.NestedFileMixin[T], child), cache, f'{name}/'
+            )
+    else:
+        yield _ZipMember(
+            arcname=name, diskname=code.get_diskname(), date_time=date_time
+        )
+
+
+def _get_tree_zip_members(
+    code: models.NestedFileMixin[T],
+    cache: t.Mapping[t.Optional[T], t.Sequence[models.NestedFileMixin[T]]],
+    prefix: str,
+    create_leading_directory: bool,
+) -> t.List[_ZipMember]:
+    root, *members = _get_zip_members(code, cache, prefix)
+    # Like an extracted archive only the leading directory and the files are
+    # stored, the other directories are implied by the paths of the files.
+    members = [m for m in members if m.diskname is not None]
+    if create_leading_directory:
+        members.insert(0, root)
+    else:
+        strip = len(root.arcname) - len(prefix)
+        members = [
+            dataclasses.replace(
+                m, arcname=prefix + m.arcname[len(prefix) + strip:]
+            ) for m in members
+        ]
+    return members
+
+
+def _stream_zip(members: t.Sequence[_ZipMember],
+                chunk_size: int) -> t.Iterator[bytes]:
+    buf = _ZipChunkBuffer()
+    with zipfile.ZipFile(buf, 'w', compression=zipfile.ZIP_DEFLATED) as zipf:
+        for member in members:
+            info = zipfile.ZipInfo(member.arcname, member.date_time)
+            if member.diskname is None:
+                info.external_attr = 0o40775 << 16 | 0x10
+                zipf.writestr(info, b'')
+            else:
+                info.external_attr = 0o664 << 16
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.file_size = os.path.getsize(member.diskname)
+                with open(member.diskname,
+                          'rb') as src, zipf.open(info, 'w') as dst:
+                    for block in iter(lambda: src.read(chunk_size), b''):
+                        dst.write(block)
+                        chunk = buf.pop()
+                        if chunk:
+                            yield chunk
+            chunk = buf.pop()
+            if chunk:
+                yield chunk
+    # Closing the zip file writes the central directory.
+    yield buf.pop()
+
+
+def stream_zip_of_tree(
+    code: models.NestedFileMixin[T],
+    cache: t.Mapping[t.Optional[T], t.Sequence[models.NestedFileMixin[T]]],
+    create_leading_directory: bool = True,
+    chunk_size: int = 1 << 16,
+) -> t.Iterator[bytes]:
+    """Create a zip archive of the given file tree without restoring it to
+    disk first.
+
+    The files are read directly from the upload directory and compressed into
+    an archive that is produced in chunks, so it can be streamed to a client
+    or a file while it is being built.
+
+    .. note::
+
+        The file tree is read from the database when this function is called,
+        after that the returned iterator only reads the files from disk. So it
+        is safe to consume it outside of the current request context.
+
+    :param code: The root of the tree to zip.
+    :param cache: A mapping from directory id to its children, see
+        :meth:`.models.Work.get_file_children_mapping`.
+    :param create_leading_directory: Should the root of the tree be present in
+        the archive, if ``False`` its children will be placed at the top level
+        of the archive.
+    :param chunk_size: The amount of bytes to read from disk at once.
+    :returns: An iterator producing the bytes of the zip archive.
+    """
+    return stream_zip_of_trees(
+        [('', code, cache)],
+        create_leading_directory=create_leading_directory,
+        chunk_size=chunk_size,
+    )
+
+
+def stream_zip_of_trees(
+    trees: t.Iterable[t.Tuple[str, models.NestedFileMixin[T], t.
+                              Mapping[t.Optional[T], t.
+                                      Sequence[models.NestedFileMixin[T]]]]],
+    create_leading_directory: bool = True,
+    chunk_size: int = 1 << 16,
+) -> t.Iterator[bytes]:
+    """Create a single zip archive of multiple file trees.
+
+    This works the same as :func:`stream_zip_of_tree`, only every tree is
+    placed in the archive in the directory given as the first item of its
+    tuple.
+
+    :param trees: The trees to zip, as tuples of the directory to place the
+        tree in (which should be empty or end with a ``/``), the root of the
+        tree, and the mapping from directory id to its children.
+    :param create_leading_directory: Should the root of every tree be present
+        in the archive.
+    :param chunk_size: The amount of bytes to read from disk at once.
+    :returns: An iterator producing the bytes of the zip archive.
+    """
+    members = [
+        member for prefix, code, cache in trees
+        for member in _get_tree_zip_members(
+            code, cache, prefix, create_leading_directory
+        )
+    ]
+    return _stream_zip(members, chunk_size)
+
+
 def rename_directory_structure(
     rootdir: str, disk_limit: t.Optional[archive.FileSize] = None
 ) -> ExtractFileTreeDirectory:
@@ -568,6 +806,28 @@ def rename_directory_structure(
     return result_lists[0]
 
 
+def _get_seekable_stream(file: FileStorage) -> t.Optional[t.IO[bytes]]:
+    """Get the stream of the given file if it can be read from the start.
+
+    >>> _get_seekable_stream(FileStorage(io.BytesIO(b'ab'))).read()
+    b'ab'
+    >>> class NoSeek(io.RawIOBase):
+    ...  def seekable(self): return False
+    >>> _get_seekable_stream(FileStorage(NoSeek())) is None
+    True
+
+    :param file: The file to get the stream for.
+    :returns: The stream of the file, positioned at its start, or ``None`` if
+        this stream is not seekable.
+    """
+    stream = file.stream
+    try:
+        stream.seek(0)
+    except (AttributeError, OSError):
+        return None
+    return stream
+
+
 def extract_to_temp(
     file: FileStorage,
     max_size: archive.FileSize,
@@ -594,9 +854,15 @@ def extract_to_temp(
             os.path.basename(secure_filename(file.filename))
         )
         tmpdir = tempfile.mkdtemp(dir=parent_result_dir)
-        file.save(tmparchive)
 
-        with archive.Archive.create_from_file(tmparchive) as arch:
+        # The uploaded file is already stored in a (spooled) temporary file by
+        # werkzeug, so we try to read the archive directly from that instead
+        # of copying it to disk first.
+        fileobj = _get_seekable_stream(file)
+        if fileobj is None:
+            file.save(tmparchive)
+
+        with archive.Archive.create_from_file(tmparchive, fileobj) as arch:
             size = arch.extract(to_path=tmpdir, max_size=max_size)
     except (
         tarfile.ReadError, zipfile.BadZipFile,
@@ -622,7 +888,8 @@ def extract_to_temp(
         remove_tmpdir = False
     finally:
         os.close(tmpfd)
-        os.remove(tmparchive)
+        if os.path.exists(tmparchive):
+            os.remove(tmparchive)
         if remove_tmpdir and tmpdir is not None:
             shutil.rmtree(tmpdir)
 
@@ -688,6 +955,158 @@ def random_file_path(use_mirror_dir: bool = False) -> t.Tuple[str, str]:
     return candidate, name
 
 
+# The name of the directory inside the ``UPLOAD_DIR`` where the content
+# addressed blobs are stored.
+_BLOB_DIR_NAME = '.blobs'
+
+# Errors that indicate that the file system does not support (more) hardlinks
+# for the given file, in these cases we simply do not deduplicate.
+_NO_LINK_ERRNOS = frozenset([errno.EMLINK, errno.EPERM, errno.EXDEV])
+
+
+def get_file_digest(path: str) -> str:
+    """Get the sha256 digest of the file at the given ``path``.
+
+    >>> import tempfile
+    >>> with tempfile.NamedTemporaryFile() as f:
+    ...     _ = f.write(b'hello')
+    ...     f.flush()
+    ...     get_file_digest(f.name)[:16]
+    '2cf24dba5fb0a30e'
+
+    :param path: The path of the file to hash.
+    :returns: The hex digest of the contents of the file.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _get_blob_path(digest: str) -> str:
+    return safe_join(
+        app.config['UPLOAD_DIR'], _BLOB_DIR_NAME, digest[:2], digest
+    )
+
+
+def deduplicate_file(path: str) -> None:
+    """Make the file at ``path`` share its storage with all other files in the
+    upload directory with the same content.
+
+    The blob store is content addressed: every unique content is stored once
+    in the ``.blobs`` directory of the upload directory, keyed by its sha256
+    hash. The given path is replaced by a hardlink to this blob, so the
+    reference count of a blob is simply its link count on disk. This means the
+    name of the file (and so :meth:`.models.FileMixin.get_diskname`) does not
+    change.
+
+    .. warning::
+
+        Files that are deduplicated should never be modified in place, as this
+        would also change every other file with the same content. Write the new
+        contents to a new path instead.
+
+    :param path: The path of the file to deduplicate, this should be inside
+        the upload directory.
+    :returns: Nothing.
+    """
+    blob_path = _get_blob_path(get_file_digest(path))
+    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+
+    # We retry a couple of times as the blob might be garbage collected by
+    # another process between our link and replace calls.
+    for _ in range(3):
+        try:
+            os.link(path, blob_path)
+        except FileExistsError:
+            pass
+        except OSError as e:  # pragma: no cover
+            if e.errno not in _NO_LINK_ERRNOS:
+                raise
+            return
+        else:
+            # We are the first file with this content.
+            return
+
+        tmp_path = f'{path}.{uuid.uuid4()}'
+        try:
+            os.link(blob_path, tmp_path)
+        except FileNotFoundError:  # pragma: no cover
+            continue
+        except OSError as e:  # pragma: no cover
+            if e.errno not in _NO_LINK_ERRNOS:
+                raise
+            return
+        os.replace(tmp_path, path)
+        return
+
+
+def delete_stored_file(path: str) -> None:
+    """Delete a file from the upload directory.
+
+    If the file was stored in the blob store (see :func:`deduplicate_file`)
+    and it was the last reference to this blob, the blob is also removed.
+
+    :param path: The path of the file to delete.
+    :returns: Nothing.
+    :raises FileNotFoundError: If the given path does not exist.
+    """
+    stat = os.stat(path, follow_symlinks=False)
+    # A link count of two means this file might be the last reference to a
+    # blob, in that case we also need to remove the blob itself.
+    blob_path = None
+    if stat.st_nlink == 2:
+        candidate = _get_blob_path(get_file_digest(path))
+        try:
+            if os.path.samestat(stat, os.stat(candidate)):
+                blob_path = candidate
+        except FileNotFoundError:  # pragma: no cover
+            pass
+
+    os.remove(path)
+    if blob_path is not None:
+        try:
+            # The blob can be shared again between our check and this removal,
+            # so only remove it if no other files refer to it.
+            if os.stat(blob_path).st_nlink == 1:
+                os.remove(blob_path)
+        except FileNotFoundError:  # pragma: no cover
+            pass
+
+
+def copy_stored_file(src: str, dst: str) -> None:
+    """Copy a file in the upload directory to a new path.
+
+    If possible the copy will share its storage with the source, so this is
+    cheap even for large files.
+
+    :param src: The file to copy.
+    :param dst: The new path, this should not exist yet.
+    :returns: Nothing.
+    """
+    try:
+        os.link(src, dst)
+    except OSError as e:  # pragma: no cover
+        if e.errno not in _NO_LINK_ERRNOS:
+            raise
+        shutil.copyfile(src, dst)
+
+
+def is_same_stored_file(path: str, other_path: str) -> bool:
+    """Check if two files in the upload directory share the same blob.
+
+    This is a cheap check, as it does not read the contents of the files.
+    However, it only detects files that are both deduplicated, so a ``False``
+    result does not mean the contents differ.
+
+    :param path: The first path to check.
+    :param other_path: The second path to check.
+    :returns: ``True`` if both paths refer to the same blob.
+    """
+    return os.path.samefile(path, other_path)
+
+
 def save_stream(stream: FileStorage) -> str:
     """Save the data from a stream to a new random filepath in the upload
     directory.
@@ -35,7 +35,8 @@ from sqlalchemy.sql.expression import or_
 
 import psef
 from cg_json import (
-    JSONResponse, ExtendedJSONResponse, jsonify, extended_jsonify
+    JSONResponse, StreamedJSONResponse, ExtendedJSONResponse, jsonify,
+    extended_jsonify
 )
 from cg_timers import timed_code
 from cg_helpers import handle_none
@@ -10,14 +10,24 @@ import os
 import abc
 import csv
 import json
+import time
 import uuid
+import shutil
 import typing as t
+import hashlib
+import datetime
 import tempfile
+import contextlib
 import subprocess
+import collections
+import dataclasses
 import xml.etree.ElementTree as ET
 from io import StringIO
+from concurrent.futures import Future, ThreadPoolExecutor
 
+import flask
 import structlog
+from sqlalchemy.orm import selectinload
 from defusedxml.ElementTree import fromstring as defused_xml_fromstring
 
 from . import app, files, models
@@ -32,6 +42,11 @@ _NICE_LEVEL = 10
 
 ProcessCompletedCallback = t.Callable[[subprocess.CompletedProcess], None]
 
+# The directory, inside the upload directory, where the feedback of linters is
+# cached. Bump the version when the format of the cache changes.
+_LINT_CACHE_DIR = '.linter_cache'
+_LINT_CACHE_VERSION = 1
+
 
 def init_app(_: t.Any) -> None:
     pass
@@ -93,7 +108,13 @@ class Linter(abc.ABC):
     method, and they may override the ``DEFAULT_OPTIONS`` variable. If
     ``RUN_LINTER`` is set to ``False`` we never actually run the linter, but
     only create a :py:class:`.models.AssignmentLinter` for this assignment and
-    a :py:class:`.models.LinterInstance` for each submission.
+    a :py:class:`.models.LinterInstance` for each submission. If
+    ``SUPPORTS_BATCHES`` is set to ``True`` the linter should also override the
+    ``run_batch`` method, which is used to lint many submissions using a single
+    linter process. If ``FEEDBACK_PER_FILE`` is set to ``True`` the feedback
+    for a file only depends on the file itself, so it is cached by the content
+    of the file. Only set this for linters of which no check can read other
+    files: cached files are not passed to the linter at all.
 
     .. note::
 
@@ -103,6 +124,8 @@ class Linter(abc.ABC):
     """
     DEFAULT_OPTIONS: t.ClassVar[t.Mapping[str, str]] = {}
     RUN_LINTER: t.ClassVar[bool] = True
+    SUPPORTS_BATCHES: t.ClassVar[bool] = False
+    FEEDBACK_PER_FILE: t.ClassVar[bool] = False
 
     def __init__(self, cfg: str) -> None:
         self.config = cfg
@@ -139,6 +162,26 @@ class Linter(abc.ABC):
         """
         raise NotImplementedError('A subclass should implement this function!')
 
+    def run_batch(
+        self,
+        basedir: str,
+        emit: t.Callable[[str, int, str, str], None],
+        process_completed: ProcessCompletedCallback,
+    ) -> None:  # pragma: no cover
+        """Run the linter on the code of multiple submissions at once.
+
+        This method is only called if ``SUPPORTS_BATCHES`` is ``True``.
+
+        :param basedir: A directory containing a directory for every
+            submission, which contains the restored code of that submission.
+        :param emit: The same as for :meth:`Linter.run`, the emitted filenames
+            should be relative to ``basedir`` or start with it.
+        :param process_completed: The same as for :meth:`Linter.run`.
+        """
+        raise NotImplementedError(
+            'Linters that support batches should implement this function!'
+        )
+
 
 @_linter_handlers.register('Pylint')
 class Pylint(Linter):
@@ -206,6 +249,20 @@ class Flake8(Linter):
     DEFAULT_OPTIONS: t.ClassVar[t.Mapping[str, str]] = {
         'Empty config file': ''
     }
+    SUPPORTS_BATCHES: t.ClassVar[bool] = True
+    FEEDBACK_PER_FILE: t.ClassVar[bool] = True
+
+    def run_batch(
+        self,
+        basedir: str,
+        emit: t.Callable[[str, int, str, str], None],
+        process_completed: ProcessCompletedCallback,
+    ) -> None:
+        """Run Flake8 on multiple submissions.
+
+        Arguments are the same as for :py:meth:`Linter.run_batch`.
+        """
+        self.run(basedir, emit, process_completed)
 
     def run(
         self,
@@ -273,6 +330,9 @@ class Checkstyle(Linter):
         'Google style': _read_config_file('checkstyle', 'google.xml'),
         'Sun style': _read_config_file('checkstyle', 'sun.xml'),
     }
+    SUPPORTS_BATCHES: t.ClassVar[bool] = True
+    # Checks like ``JavadocPackage`` and ``Translation`` read other files.
+    FEEDBACK_PER_FILE: t.ClassVar[bool] = False
 
     @classmethod
     def _validate_module(cls: t.Type['Checkstyle'], mod: ET.Element) -> None:
@@ -358,8 +418,18 @@ class Checkstyle(Linter):
 
         Arguments are the same as for :py:meth:`Linter.run`.
         """
-        tempdir = os.path.dirname(tempdir)
+        self.run_batch(os.path.dirname(tempdir), emit, process_completed)
 
+    def run_batch(
+        self,
+        basedir: str,
+        emit: t.Callable[[str, int, str, str], None],
+        process_completed: ProcessCompletedCallback,
+    ) -> None:
+        """Run checkstyle on multiple submissions.
+
+        Arguments are the same as for :py:meth:`Linter.run_batch`.
+        """
         with tempfile.NamedTemporaryFile('w') as cfg:
             module: ET.Element = defused_xml_fromstring(self.config)
             assert module is not None
@@ -385,7 +455,7 @@ class Checkstyle(Linter):
                 format_list(
                     app.config['CHECKSTYLE_PROGRAM'],
                     config=cfg.name,
-                    files=tempdir,
+                    files=basedir,
                 )
             )
             process_completed(out)
@@ -424,6 +494,9 @@ class PMD(Linter):
     DEFAULT_OPTIONS: t.ClassVar[t.Mapping[str, str]] = {
         'Maven': _read_config_file('pmd', 'maven.xml'),
     }
+    SUPPORTS_BATCHES: t.ClassVar[bool] = True
+    # Rules can use the type information of the other files.
+    FEEDBACK_PER_FILE: t.ClassVar[bool] = False
 
     @classmethod
     def validate_config(cls: t.Type['PMD'], config: str) -> None:
@@ -469,15 +542,25 @@ class PMD(Linter):
 
         Arguments are the same as for :py:meth:`Linter.run`.
         """
-        tempdir = os.path.dirname(tempdir)
+        self.run_batch(os.path.dirname(tempdir), emit, process_completed)
+
+    def run_batch(
+        self,
+        basedir: str,
+        emit: t.Callable[[str, int, str, str], None],
+        process_completed: ProcessCompletedCallback,
+    ) -> None:
+        """Run PMD on multiple submissions.
 
+        Arguments are the same as for :py:meth:`Linter.run_batch`.
+        """
         with tempfile.NamedTemporaryFile('w') as cfg:
             cfg.write(self.config)
             cfg.flush()
 
             out = _run_command(
                 [
-                    part.format(config=cfg.name, files=tempdir)
+                    part.format(config=cfg.name, files=basedir)
                     for part in app.config['PMD_PROGRAM']
                 ]
             )
@@ -502,6 +585,9 @@ class ESLint(Linter):
     DEFAULT_OPTIONS: t.ClassVar[t.Mapping[str, str]] = {
         'Standard': _read_config_file('eslint', 'standard.json')
     }
+    SUPPORTS_BATCHES: t.ClassVar[bool] = True
+    # Rules, like ``import/named``, can read other files.
+    FEEDBACK_PER_FILE: t.ClassVar[bool] = False
 
     @classmethod
     def validate_config(cls: t.Type['ESLint'], config: str) -> None:
@@ -560,7 +646,18 @@ class ESLint(Linter):
 
         Arguments are the same as for :py:meth:`Linter.run`.
         """
-        tempdir = os.path.dirname(tempdir)
+        self.run_batch(os.path.dirname(tempdir), emit, process_completed)
+
+    def run_batch(
+        self,
+        basedir: str,
+        emit: t.Callable[[str, int, str, str], None],
+        process_completed: ProcessCompletedCallback,
+    ) -> None:
+        """Run ESLint on multiple submissions.
+
+        Arguments are the same as for :py:meth:`Linter.run_batch`.
+        """
         config = json.loads(self.config)
 
         with tempfile.NamedTemporaryFile('w') as cfg:
@@ -570,7 +667,7 @@ class ESLint(Linter):
 
             out = _run_command(
                 [
-                    part.format(config=cfg.name, files=tempdir)
+                    part.format(config=cfg.name, files=basedir)
                     for part in app.config['ESLINT_PROGRAM']
                 ]
             )
@@ -601,10 +698,197 @@ class ESLint(Linter):
                     emit(filename, line_number, code, msg)
 
 
+_LinterFeedback = t.Dict[str, t.Dict[int, t.List[t.Tuple[str, str]]]]
+
+
+@dataclasses.dataclass
+class _LintResult:
+    """The result of running a linter on a single submission.
+
+    :ivar feedback: The feedback of the linter, as a mapping from filename
+        (relative to the directory of the submission) to line to a list of
+        tuples of linter code and message.
+    :ivar process: The linter process that produced this result.
+    :ivar exception: The exception that occurred while linting, if any.
+    """
+    feedback: _LinterFeedback = dataclasses.field(default_factory=dict)
+    process: t.Optional[subprocess.CompletedProcess] = None
+    exception: t.Optional[Exception] = None
+
+    def add_feedback(self, f: str, line: int, code: str, msg: str) -> None:
+        """Add a line of feedback, lines start at one.
+        """
+        self.feedback.setdefault(f, {}).setdefault(line - 1, []).append(
+            (code, msg)
+        )
+
+
+class _LintCache:
+    """A cache of the feedback of a linter per file.
+
+    The feedback is keyed on the linter, its config, and the path (relative to
+    the top directory of the submission) and content of the file. It is stored
+    in the upload directory, and entries that are not used for some time are
+    removed by :meth:`_LintCache.prune`.
+    """
+    MAX_AGE: t.ClassVar[datetime.timedelta] = datetime.timedelta(days=30)
+
+    def __init__(self, linter: Linter) -> None:
+        self.base_dir = files.safe_join(
+            app.config['UPLOAD_DIR'],
+            _LINT_CACHE_DIR,
+            hashlib.sha256(
+                json.dumps([
+                    _LINT_CACHE_VERSION,
+                    type(linter).__name__,
+                    linter.config,
+                ]).encode('utf8')
+            ).hexdigest(),
+        )
+
+    def _get_entry_path(self, relpath: str, path: str) -> str:
+        # The first part of the relative path is the top directory, which is
+        # named differently for every submission.
+        _, _, relpath = relpath.partition('/')
+        key = hashlib.sha256(
+            json.dumps([relpath, files.get_file_digest(path)]).encode('utf8')
+        ).hexdigest()
+        return files.safe_join(self.base_dir, key[:2], f'{key}.json')
+
+    def get(self, relpath: str,
+            path: str) -> t.Optional[t.Dict[int, t.List[t.Tuple[str, str]]]]:
+        """Get the cached feedback for a file.
+
+        :param relpath: The path of the file relative to the directory of its
+            submission.
+        :param path: The path of the file on disk.
+        :returns: The feedback for the file by line, or ``None`` if the file is
+            not in the cache.
+        """
+        entry_path = self._get_entry_path(relpath, path)
+        try:
+            with open(entry_path, 'r') as f:
+                feedback = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        os.utime(entry_path)
+        return {
+            int(line): [(code, msg) for code, msg in msgs]
+            for line, msgs in feedback.items()
+        }
+
+    def put(
+        self,
+        relpath: str,
+        path: str,
+        feedback: t.Mapping[int, t.Sequence[t.Tuple[str, str]]],
+    ) -> None:
+        """Store the feedback for a file.
+
+        :param relpath: The path of the file relative to the directory of its
+            submission.
+        :param path: The path of the file on disk.
+        :param feedback: The feedback for the file by line.
+        """
+        entry_path = self._get_entry_path(relpath, path)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f'{entry_path}.{uuid.uuid4()}'
+        with open(tmp_path, 'w') as f:
+            json.dump(feedback, f)
+        os.replace(tmp_path, entry_path)
+
+    @classmethod
+    def prune(cls) -> None:
+        """Remove all entries of all linters that have not been used
+        recently.
+
+        This looks at every entry in the cache, so it should not be done for
+        every lint run. It is done periodically by
+        :func:`psef.tasks.prune_lint_cache`.
+        """
+        cache_dir = files.safe_join(app.config['UPLOAD_DIR'], _LINT_CACHE_DIR)
+        min_mtime = time.time() - cls.MAX_AGE.total_seconds()
+        for root, _, filenames in os.walk(cache_dir):
+            for filename in filenames:
+                path = os.path.join(root, filename)
+                # Entries might be replaced or removed while we are pruning.
+                with contextlib.suppress(FileNotFoundError):
+                    if os.stat(path).st_mtime < min_mtime:
+                        os.unlink(path)
+
+
+def prune_lint_cache() -> None:
+    """Remove the cached linter feedback that has not been used recently.
+
+    :returns: Nothing.
+    """
+    _LintCache.prune()
+
+
+class _CachedFiles:
+    """The files of a submission for which feedback was found in a
+    :class:`_LintCache`.
+
+    These files are moved out of the directory of the submission when this
+    class is created, so they are not linted again.
+    """
+
+    def __init__(
+        self,
+        cache: t.Optional[_LintCache],
+        sub_dir: str,
+        stash_dir: str,
+    ) -> None:
+        self.feedback: _LinterFeedback = {}
+        self._sub_dir = sub_dir
+        self._stash_dir = stash_dir
+        if cache is None:
+            return
+
+        for relpath, path in _get_files(sub_dir):
+            found = cache.get(relpath, path)
+            if found is not None:
+                self.feedback[relpath] = found
+                stash_path = os.path.join(stash_dir, relpath)
+                os.makedirs(os.path.dirname(stash_path), exist_ok=True)
+                os.rename(path, stash_path)
+
+    def restore(self) -> None:
+        """Move the cached files back into the directory of the submission,
+        and forget their feedback.
+        """
+        for relpath in self.feedback:
+            os.rename(
+                os.path.join(self._stash_dir, relpath),
+                os.path.join(self._sub_dir, relpath),
+            )
+        self.feedback = {}
+
+
+def _get_files(directory: str) -> t.Iterator[t.Tuple[str, str]]:
+    """Get all files in the given directory.
+
+    :returns: Tuples of the path relative to ``directory`` and the full path
+        of every file.
+    """
+    for root, _, filenames in os.walk(directory):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            yield os.path.relpath(path, directory), path
+
+
 class LinterRunner:
     """This class is used to run a :class:`Linter` with a specific config on
     sets of :class:`.models.Work`.
 
+    Submissions are linted in batches, if the linter supports it a batch is
+    linted using a single linter process. Multiple batches are linted at the
+    same time in a pool of threads, while the main thread restores the next
+    batches and stores the results of the finished ones. If the feedback of
+    the linter only depends on the linted file, files that were linted before
+    with the same config are not linted again.
+
     .. py:attribute:: linter
         The attached :class:`Linter` that will be ran by this class.
     """
@@ -616,6 +900,7 @@ class LinterRunner:
         :param str cfg: The config as as `str` to pass to the linter.
         """
         self.linter = cls(cfg)
+        self._cache: t.Optional[_LintCache] = None
 
     def run(self, linter_instance_ids: t.Sequence[str]) -> None:
         """Run this linter runner on the given works.
@@ -629,118 +914,335 @@ class LinterRunner:
 
         :returns: Nothing
         """
-        for linter_instance_id in linter_instance_ids:
-            linter_inst = db.session.query(models.LinterInstance
-                                           ).get(linter_instance_id)
-
+        # We only keep the ids, as the instances are expired after the results
+        # of every batch are committed. The instances of a batch are loaded
+        # again, together with their works, when they are needed.
+        linter_inst_ids = [
+            linter_inst.id for linter_inst in self._load_instances(
+                linter_instance_ids
+            )
             # This should never happen however it is better to check here.
-            if linter_inst is None or linter_inst.work.deleted:  # pragma: no cover
-                continue
+            if not linter_inst.work.deleted
+        ]
+
+        if self.linter.SUPPORTS_BATCHES:
+            batch_size = app.config['LINTER_BATCH_SIZE']
+        else:
+            batch_size = 1
+        max_workers = app.config['LINTER_MAX_CONCURRENT_BATCHES']
+        if self.linter.FEEDBACK_PER_FILE:
+            self._cache = _LintCache(self.linter)
+        # The worker threads need the app for its config.
+        flask_app = app._get_current_object()  # pylint: disable=protected-access
+
+        pending: t.Deque[t.Tuple[
+            str,
+            t.Sequence[str],
+            t.Mapping[int, t.Union[files.FileTree[int], Exception]],
+            'Future[t.Mapping[str, _LintResult]]',
+        ]] = collections.deque()
+
+        def __store_oldest() -> None:
+            batch_dir, batch_ids, trees, future = pending.popleft()
+            self._store_results(batch_ids, trees, future)
+            shutil.rmtree(batch_dir)
+            shutil.rmtree(f'{batch_dir}.cached', ignore_errors=True)
+
+        pool = ThreadPoolExecutor(max_workers)
+        with tempfile.TemporaryDirectory() as tmpdir, pool:
+            for idx in range(0, len(linter_inst_ids), batch_size):
+                batch_ids = linter_inst_ids[idx:idx + batch_size]
+                batch = self._load_instances(batch_ids)
+                batch_dir = files.safe_join(tmpdir, str(idx))
+                trees = self._restore_batch(batch, batch_dir)
+                to_lint = [
+                    (linter_inst.id, tree.name)
+                    for linter_inst in batch
+                    for tree in [trees[linter_inst.work_id]]
+                    if isinstance(tree, files.FileTree)
+                ]
+                pending.append(
+                    (
+                        batch_dir,
+                        batch_ids,
+                        trees,
+                        pool.submit(
+                            self._lint_batch, flask_app, batch_dir, to_lint
+                        ),
+                    )
+                )
 
-            compl_proc: t.Optional[subprocess.CompletedProcess] = None
+                # Do not restore batches much faster than we can lint them, as
+                # they take up disk space.
+                while len(pending) > max_workers:
+                    __store_oldest()
 
-            def set_proc(proc: subprocess.CompletedProcess) -> None:
-                nonlocal compl_proc
-                compl_proc = proc
+            while pending:
+                __store_oldest()
 
-            try:
-                self.test(linter_inst, set_proc)
-            # We want to catch all exceptions here as need to set our linter to
-            # the crashed state.
-            except LinterCrash as e:
+    @staticmethod
+    def _load_instances(
+        linter_instance_ids: t.Sequence[str]
+    ) -> t.Sequence[models.LinterInstance]:
+        """Load the given linter instances, and their works, using a fixed
+            amount of queries.
+
+        :param linter_instance_ids: The ids of the instances to load.
+        :returns: The loaded linter instances ordered by id.
+        """
+        return db.session.query(models.LinterInstance).filter(
+            models.LinterInstance.id.in_(linter_instance_ids)
+        ).options(selectinload(models.LinterInstance.work)).order_by(
+            models.LinterInstance.id
+        ).all()
+
+    @staticmethod
+    def _restore_batch(
+        batch: t.Sequence[models.LinterInstance],
+        batch_dir: str,
+    ) -> t.Mapping[int, t.Union[files.FileTree[int], Exception]]:
+        os.mkdir(batch_dir)
+        inst_id_lookup = {
+            linter_inst.work_id: linter_inst.id
+            for linter_inst in batch
+        }
+
+        def get_parent(work: models.Work) -> str:
+            res = files.safe_join(batch_dir, inst_id_lookup[work.id])
+            os.mkdir(res)
+            return res
+
+        return files.restore_directory_structures(
+            [linter_inst.work for linter_inst in batch], get_parent
+        )
+
+    def _lint_batch(
+        self,
+        flask_app: flask.Flask,
+        batch_dir: str,
+        to_lint: t.Sequence[t.Tuple[str, str]],
+    ) -> t.Mapping[str, _LintResult]:
+        """Lint a batch of submissions.
+
+        If linting the entire batch at once fails we lint every submission
+        separately, so a single submission that makes the linter crash doesn't
+        crash the linter for the entire batch.
+
+        :param flask_app: The app, as this method is called in a different
+            thread.
+        :param batch_dir: The directory containing the restored submissions.
+        :param to_lint: Tuples of the id of the linter instance, which is also
+            the name of the directory of its submission in ``batch_dir``, and
+            the name of the top directory of its submission.
+        :returns: A mapping from linter instance id to its result.
+        """
+        with flask_app.app_context():
+            if len(to_lint) > 1:
+                cached = {
+                    inst_id: self._get_cached_files(batch_dir, inst_id)
+                    for inst_id, _ in to_lint
+                }
+                try:
+                    return self._lint_combined(batch_dir, to_lint, cached)
+                # We want to catch all exceptions here, as we will try the
+                # submissions separately.
+                except Exception:  # pylint: disable=broad-except
+                    logger.info(
+                        'Linting the batch failed, linting separately',
+                        exc_info=True,
+                    )
+                    for cached_files in cached.values():
+                        cached_files.restore()
+
+            return {
+                inst_id: self._lint_single(batch_dir, inst_id, top_dir)
+                for inst_id, top_dir in to_lint
+            }
+
+    def _get_cached_files(self, batch_dir: str, inst_id: str) -> _CachedFiles:
+        return _CachedFiles(
+            self._cache,
+            files.safe_join(batch_dir, inst_id),
+            files.safe_join(f'{batch_dir}.cached', inst_id),
+        )
+
+    def _cache_feedback(self, sub_dir: str, result: _LintResult) -> None:
+        """Store the feedback of all files that were linted in the cache.
+        """
+        if self._cache is not None:
+            for relpath, path in _get_files(sub_dir):
+                self._cache.put(
+                    relpath, path, result.feedback.get(relpath, {})
+                )
+
+    def _lint_combined(
+        self,
+        batch_dir: str,
+        to_lint: t.Sequence[t.Tuple[str, str]],
+        cached: t.Mapping[str, _CachedFiles],
+    ) -> t.Mapping[str, _LintResult]:
+        res = {inst_id: _LintResult() for inst_id, _ in to_lint}
+
+        def __emit(f: str, line: int, code: str, msg: str) -> None:
+            if f.startswith(batch_dir):
+                f = f[len(batch_dir) + 1:]
+            inst_id, _, f = f.partition('/')
+            if inst_id in res:
+                res[inst_id].add_feedback(f, line, code, msg)
+            else:  # pragma: no cover
+                logger.warning('Got feedback for unknown file', filename=f)
+
+        def __set_proc(proc: subprocess.CompletedProcess) -> None:
+            for result in res.values():
+                result.process = proc
+
+        if next(_get_files(batch_dir), None) is not None:
+            self.linter.run_batch(batch_dir, __emit, __set_proc)
+
+        for inst_id, result in res.items():
+            self._cache_feedback(files.safe_join(batch_dir, inst_id), result)
+            result.feedback.update(cached[inst_id].feedback)
+        return res
+
+    def _lint_single(
+        self, batch_dir: str, inst_id: str, top_dir: str
+    ) -> _LintResult:
+        sub_dir = files.safe_join(batch_dir, inst_id)
+        cached = self._get_cached_files(batch_dir, inst_id)
+        if cached.feedback and next(_get_files(sub_dir), None) is None:
+            return _LintResult(feedback=cached.feedback)
+
+        res = self._run_single(sub_dir, top_dir)
+        if res.exception is not None and cached.feedback:
+            # The linter might crash because of the files that were left out,
+            # for example when no files of its language are left.
+            cached.restore()
+            res = self._run_single(sub_dir, top_dir)
+
+        if res.exception is None:
+            self._cache_feedback(sub_dir, res)
+            res.feedback.update(cached.feedback)
+        return res
+
+    def _run_single(self, sub_dir: str, top_dir: str) -> _LintResult:
+        res = _LintResult()
+
+        def __emit(f: str, line: int, code: str, msg: str) -> None:
+            if f.startswith(sub_dir):
+                f = f[len(sub_dir) + 1:]
+            res.add_feedback(f, line, code, msg)
+
+        def __set_proc(proc: subprocess.CompletedProcess) -> None:
+            res.process = proc
+
+        try:
+            self.linter.run(
+                files.safe_join(sub_dir, top_dir), __emit, __set_proc
+            )
+        # We want to catch all exceptions here as need to set our linter to
+        # the crashed state.
+        except Exception as e:  # pylint: disable=broad-except
+            res.exception = e
+        return res
+
+    @classmethod
+    def _store_results(
+        cls,
+        batch_ids: t.Sequence[str],
+        trees: t.Mapping[int, t.Union[files.FileTree[int], Exception]],
+        future: 'Future[t.Mapping[str, _LintResult]]',
+    ) -> None:
+        """Store the results of the given batch, and commit them.
+
+        :param batch_ids: The ids of the linter instances in the batch.
+        :param trees: The restored trees of the submissions in the batch, or
+            the exception raised while restoring.
+        :param future: The future that resolves to the results of the batch.
+        :returns: Nothing.
+        """
+        results = future.result()
+        # The instances were expired by the commits of earlier batches, so we
+        # refresh them all at once instead of one by one.
+        batch = cls._load_instances(batch_ids)
+        done = []
+        comments: t.List[models.LinterComment] = []
+
+        for linter_inst in batch:
+            tree = trees[linter_inst.work_id]
+            if isinstance(tree, Exception):
+                result = _LintResult(exception=tree)
+            else:
+                result = results[linter_inst.id]
+
+            if result.process is not None:
+                linter_inst.stdout = result.process.stdout.replace('\0', '')
+                linter_inst.stderr = result.process.stderr.replace('\0', '')
+
+            if isinstance(result.exception, LinterCrash):
                 logger.warning(
                     'The linter crashed',
                     linter_instance_id=linter_inst.id,
-                    exc_info=True,
+                    exc_info=result.exception,
                 )
                 linter_inst.state = models.LinterState.crashed
                 linter_inst.error_summary = (
-                    e.error_summary or
+                    result.exception.error_summary or
                     'The linter program exited unsuccessfully.'
                 )
-            except Exception:  # pylint: disable=broad-except
+            elif result.exception is not None:
                 logger.warning(
                     'The linter crashed unexpectedly',
                     linter_instance_id=linter_inst.id,
-                    exc_info=True,
+                    exc_info=result.exception,
                 )
                 linter_inst.state = models.LinterState.crashed
-            finally:
-                if compl_proc is not None:
-                    linter_inst.stdout = compl_proc.stdout.replace('\0', '')
-                    linter_inst.stderr = compl_proc.stderr.replace('\0', '')
-                db.session.commit()
-
-    def test(
-        self,
-        linter_instance: models.LinterInstance,
-        process_completed: ProcessCompletedCallback,
-    ) -> None:
-        """Test the given code (:class:`.models.Work`) and add generated
-        comments.
-
-        :param linter_instance: The linter instance that will be run. This
-            linter instance is linked to a work from which all files will be
-            restored and the linter will be run on those files.
-        :param process_completed: The callback that should be called by the
-            linter instance after the process, like pylint or java, has been
-            completed.
-        :returns: Nothing
-        """
-        temp_res: t.Dict[str, t.Dict[int, t.List[t.Tuple[str, str]]]]
-        temp_res = {}
-        res: t.Dict[int, t.Mapping[int, t.Sequence[t.Tuple[str, str]]]]
-        res = {}
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-
-            def __emit(f: str, line: int, code: str, msg: str) -> None:
-                if f.startswith(tmpdir):
-                    f = f[len(tmpdir) + 1:]
-                if f not in temp_res:
-                    temp_res[f] = {}
-                line = line - 1
-                if line not in temp_res[f]:
-                    temp_res[f][line] = []
-                temp_res[f][line].append((code, msg))
-
-            tree_root = files.restore_directory_structure(
-                linter_instance.work,
-                tmpdir,
-            )
-
-            self.linter.run(
-                files.safe_join(tmpdir, tree_root.name), __emit,
-                process_completed
-            )
-
-        del tmpdir
+            else:
+                assert isinstance(tree, files.FileTree)
+                feedback = _get_feedback_per_file(tree, result.feedback)
+                comments.extend(linter_inst.add_comments(feedback))
+                linter_inst.state = models.LinterState.done
+                done.append(linter_inst.id)
+
+        if done:
+            models.LinterComment.query.filter(
+                models.LinterComment.linter_id.in_(done)
+            ).delete(synchronize_session=False)
+        db.session.bulk_save_objects(comments)
+        db.session.commit()
 
-        def __do(tree: files.FileTree[int], parent: str) -> None:
-            # We can safely use os.path.join here as the contents of this path
-            # will never be read.
-            parent = os.path.join(parent, tree.name)
-            if tree.entries is not None:  # this is dir:
-                for entry in tree.entries:
-                    __do(entry, parent)
-            elif parent in temp_res:
-                res[tree.id] = temp_res[parent]
-                del temp_res[parent]
 
-        __do(tree_root, '')
+def _get_feedback_per_file(
+    tree_root: files.FileTree[int],
+    feedback: _LinterFeedback,
+) -> t.Mapping[int, t.Mapping[int, t.Sequence[t.Tuple[str, str]]]]:
+    """Map the feedback of a linter to the files of a submission.
 
-        meth = logger.warning if temp_res else logger.info
-        meth('Finished adding linter comments', comments_left=temp_res)
+    :param tree_root: The tree of the restored submission.
+    :param feedback: The feedback by filename, where the filename is relative
+        to the directory the submission was restored in.
+    :returns: The feedback by file id, in the format expected by
+        :meth:`.models.LinterInstance.add_comments`.
+    """
+    temp_res = dict(feedback)
+    res: t.Dict[int, t.Mapping[int, t.Sequence[t.Tuple[str, str]]]] = {}
 
-        models.LinterComment.query.filter_by(linter_id=linter_instance.id
-                                             ).delete()
+    def __do(tree: files.FileTree[int], parent: str) -> None:
+        # We can safely use os.path.join here as the contents of this path
+        # will never be read.
+        parent = os.path.join(parent, tree.name)
+        if tree.entries is not None:  # this is dir:
+            for entry in tree.entries:
+                __do(entry, parent)
+        elif parent in temp_res:
+            res[tree.id] = temp_res[parent]
+            del temp_res[parent]
 
-        for comment in linter_instance.add_comments(res):
-            db.session.add(comment)
+    __do(tree_root, '')
 
-        linter_instance.state = models.LinterState.done
+    meth = logger.warning if temp_res else logger.info
+    meth('Finished adding linter comments', comments_left=temp_res)
 
-        db.session.commit()
+    return res
 
 
 def get_all_linters(
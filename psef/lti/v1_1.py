@@ -11,6 +11,7 @@ import abc
 import enum
 import typing as t
 import datetime
+import threading
 import xml.etree.ElementTree
 from dataclasses import dataclass
 from urllib.parse import urlparse
@@ -772,6 +773,7 @@ class LTI(AbstractLTIConnector):  # pylint: disable=too-many-public-methods
         lti_points_possible: t.Optional[float],
         submission: models.Work,
         host: str,
+        outcome_requests: t.Optional[t.List['OutcomeRequest']] = None,
     ) -> None:
         """Do a LTI grade passback.
 
@@ -786,7 +788,10 @@ class LTI(AbstractLTIConnector):  # pylint: disable=too-many-public-methods
             the assignment we are passing back as reported by the LMS during
             launch.
         :param host: The host of this CodeGrade instance.
-        :returns: The response of the LTI consumer.
+        :param outcome_requests: If given the outcome request is not send to
+            the LTI consumer, but appended to this list instead. Not every LMS
+            needs a request for every passback, so nothing might be appended.
+        :returns: Nothing.
         """
         raise NotImplementedError
 
@@ -804,6 +809,7 @@ class LTI(AbstractLTIConnector):  # pylint: disable=too-many-public-methods
         submission: models.Work,
         use_submission_details: bool,
         url: str,
+        outcome_requests: t.Optional[t.List['OutcomeRequest']],
     ) -> None:
         logger.info(
             'Doing LTI grade passback',
@@ -849,14 +855,18 @@ class LTI(AbstractLTIConnector):  # pylint: disable=too-many-public-methods
                 submission_details=submission_details,
             )
 
-        OutcomeRequest(
+        request = OutcomeRequest(
             consumer_key=key,
             consumer_secret=secret,
             lis_outcome_service_url=service_url,
             lis_result_sourcedid=sourcedid,
             lti_operation=lti_operation,
             message_identifier=str(submission.id),
-        ).post_outcome_request()
+        )
+        if outcome_requests is None:
+            request.post_outcome_request()
+        else:
+            outcome_requests.append(request)
 
 
 @lti_classes.register('Canvas')
@@ -1052,6 +1062,7 @@ class CanvasLTI(LTI):
         lti_points_possible: t.Optional[float],
         submission: models.Work,
         host: str,
+        outcome_requests: t.Optional[t.List['OutcomeRequest']] = None,
     ) -> None:
         redirect = (
             '/courses/{course_id}'
@@ -1078,6 +1089,7 @@ class CanvasLTI(LTI):
             submission=submission,
             use_submission_details=True,
             url=url,
+            outcome_requests=outcome_requests,
         )
 
 
@@ -1158,6 +1170,7 @@ class BareBonesLTIProvider(LTI):
         lti_points_possible: t.Optional[float],
         submission: models.Work,
         host: str,
+        outcome_requests: t.Optional[t.List['OutcomeRequest']] = None,
     ) -> None:
         if initial:
             # Bare bones lti providers (like Blackboard) don't support
@@ -1188,6 +1201,7 @@ class BareBonesLTIProvider(LTI):
             submission=submission,
             use_submission_details=False,
             url=url,
+            outcome_requests=outcome_requests,
         )
 
 
@@ -1245,6 +1259,7 @@ class MoodleLTI(BareBonesLTIProvider):
         lti_points_possible: t.Optional[float],
         submission: models.Work,
         host: str,
+        outcome_requests: t.Optional[t.List['OutcomeRequest']] = None,
     ) -> None:
         if initial:
             # Moodle registers a grade delete as setting the grade to zero.
@@ -1273,6 +1288,7 @@ class MoodleLTI(BareBonesLTIProvider):
             submission=submission,
             use_submission_details=False,
             url=url,
+            outcome_requests=outcome_requests,
         )
 
 
@@ -1416,6 +1432,45 @@ class LTIInitalReplaceResultOperation(LTIReplaceResultBaseOperation):
     """
 
 
+class _OAuthClient(oauth2.Client):
+    """An OAuth client that does not lower case the ``Authorization`` header.
+    """
+
+    def _normalize_headers(self, headers: t.Any) -> t.Any:  # pragma: no cover
+        ret = super()._normalize_headers(headers)
+        if 'authorization' in ret:
+            ret['Authorization'] = ret.pop('authorization')
+        return ret
+
+
+_POOLED_CLIENTS = threading.local()
+
+
+def pool_oauth_clients() -> None:
+    """Reuse the OAuth clients, and so their HTTP connections, for all outcome
+    requests done in the current thread.
+
+    The clients are not thread safe, so every thread gets its own clients.
+    This function can be used as ``initializer`` of a thread pool.
+
+    :returns: Nothing.
+    """
+    _POOLED_CLIENTS.clients = {}
+
+
+def _get_oauth_client(key: str, secret: str) -> oauth2.Client:
+    clients: t.Optional[t.Dict[t.Tuple[str, str], oauth2.Client]] = getattr(
+        _POOLED_CLIENTS, 'clients', None
+    )
+    if clients is not None and (key, secret) in clients:
+        return clients[(key, secret)]
+
+    client = _OAuthClient(oauth2.Consumer(key=key, secret=secret))
+    if clients is not None:
+        clients[(key, secret)] = client
+    return client
+
+
 class OutcomeRequest:
     """Class for generating LTI Outcome Requests.
 
@@ -1451,26 +1506,7 @@ class OutcomeRequest:
         )
         log.info('Posting outcome request')
 
-        consumer = oauth2.Consumer(
-            key=self.consumer_key, secret=self.consumer_secret
-        )
-
-        client = oauth2.Client(consumer)
-
-        # monkeypatch the _normalize function to ensures that the
-        # ``Authorization`` header is NOT lower cased
-        normalize = httplib2.Http._normalize_headers  # pylint: disable=protected-access
-
-        def __my_normalize(
-            self: t.Any, headers: t.Sequence
-        ) -> t.Sequence:  # pragma: no cover
-            ret = normalize(self, headers)
-            if 'authorization' in ret:
-                ret['Authorization'] = ret.pop('authorization')
-            return ret
-
-        httplib2.Http._normalize_headers = __my_normalize  # pylint: disable=protected-access
-        monkey_patch_function = normalize
+        client = _get_oauth_client(self.consumer_key, self.consumer_secret)
 
         response: httplib2.Response
         content: str
@@ -1483,9 +1519,6 @@ class OutcomeRequest:
             headers={'Content-Type': 'application/xml'},
         )
 
-        # Restore original function
-        httplib2.Http._normalize_headers = monkey_patch_function  # pylint: disable=protected-access
-
         log = log.bind(
             response=response,
             response_body=content,
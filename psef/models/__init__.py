@@ -181,7 +181,7 @@ if True:  # pylint: disable=using-constant-test
         File, FileOwner, AutoTestFixture, FileMixin, NestedFileMixin,
         AutoTestOutputFile
     )
-    from .work import Work, GradeHistory, GradeOrigin, WorkOrigin
+    from .work import Work, GradeHistory, GradeOrigin, WorkOrigin, LatestWork
     from .linter import LinterState, LinterComment, LinterInstance
     from .plagiarism import (
         PlagiarismState, PlagiarismRun, PlagiarismCase, PlagiarismMatch
@@ -196,7 +196,7 @@ if True:  # pylint: disable=using-constant-test
     from .link_tables import user_course
     from .auto_test import (
         AutoTest, AutoTestSet, AutoTestSuite, AutoTestResult, AutoTestRun,
-        AutoTestRunner
+        AutoTestRunner, AutoTestResultStateCount
     )
     from .auto_test_step import (
         AutoTestStepResultState, AutoTestStepResult, AutoTestStepBase
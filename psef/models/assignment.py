@@ -386,8 +386,9 @@ class AssignmentLinter(Base):
         assig = Assignment.query.get(assignment_id)
 
         if assig is not None:
-            for work in assig.get_all_latest_submissions():
-                self.tests.append(linter_models.LinterInstance(work, self))
+            self.tests = linter_models.LinterInstance.create_many(
+                assig.get_all_latest_submissions().all(), self
+            )
 
         return self
 
@@ -1409,40 +1410,42 @@ class Assignment(helpers.NotEqualMixin, Base):  # pylint: disable=too-many-publi
         if not self.is_visible:
             return base_query.filter(sqlalchemy.sql.false())
 
-        # TODO: Investigate this subquery here. We need to do that right now as
-        # other functions might use this method and might want to order in a
-        # different way or do other distincts. But I have no idea how slow this
-        # subquery makes the query, as postgres could optimize it out.
-        sql = db.session.query(
-            work_models.Work.id,
-        ).filter(
-            work_models.Work.assignment_id == self.id,
-        ).order_by(
-            work_models.Work.user_id,
-            work_models.Work.created_at.desc(),
-            # Sort by id too so that when the date is exactly the same we can
-            # still have well defined behavior (i.e. always get the same
-            # submissions for a user.)
-            work_models.Work.id.desc()
-        )
-        if not include_deleted:
-            sql = sql.filter_by(_deleted=False)
-
-        sub = sql.distinct(work_models.Work.user_id).subquery('ids')
+        if include_deleted:
+            # Deleted submissions are not in the ``LatestWork`` table, so we
+            # need to compute the latest submissions ourselves.
+            sub = db.session.query(
+                work_models.Work.id,
+            ).filter(
+                work_models.Work.assignment_id == self.id,
+            ).order_by(
+                work_models.Work.user_id,
+                work_models.Work.created_at.desc(),
+                # Sort by id too so that when the date is exactly the same we
+                # can still have well defined behavior (i.e. always get the
+                # same submissions for a user.)
+                work_models.Work.id.desc()
+            ).distinct(work_models.Work.user_id).subquery('ids')
+        else:
+            sub = db.session.query(
+                work_models.LatestWork.work_id,
+            ).filter(
+                work_models.LatestWork.assignment_id == self.id,
+            ).subquery('ids')
 
         res = base_query.filter(work_models.Work.id.in_(sub), )
         if self.group_set_id is not None and not include_old_user_submissions:
-            sub_query = db.session.query(work_models.Work).filter(
-                work_models.Work.assignment_id == self.id,
-                work_models.Work.user_id == psef.models.Group.virtual_user_id,
-            )
-            if not include_deleted:
-                # We don't need the intelligent `deleted` attribute here from
-                # the Work models, which also checks if the assignment is
-                # deleted, as we already check this at the start of the
-                # function.
-                # pylint: disable=protected-access
-                sub_query = sub_query.filter(~work_models.Work._deleted)
+            if include_deleted:
+                sub_query = db.session.query(work_models.Work).filter(
+                    work_models.Work.assignment_id == self.id,
+                    work_models.Work.user_id ==
+                    psef.models.Group.virtual_user_id,
+                )
+            else:
+                sub_query = db.session.query(work_models.LatestWork).filter(
+                    work_models.LatestWork.assignment_id == self.id,
+                    work_models.LatestWork.user_id ==
+                    psef.models.Group.virtual_user_id,
+                )
             groups_with_submission = db.session.query(
                 psef.models.Group.id
             ).filter(
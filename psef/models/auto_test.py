@@ -7,12 +7,15 @@ import math
 import uuid
 import typing as t
 import numbers
+import datetime
 import itertools
+import collections
 
 import structlog
+import sqlalchemy
 from sqlalchemy import orm
 from sqlalchemy import func as sql_func
-from sqlalchemy import distinct
+from sqlalchemy import event, distinct
 from sqlalchemy.sql.expression import or_, and_, case, nullsfirst
 
 import psef
@@ -35,6 +38,10 @@ from ..permissions import CoursePermission as CPerm
 
 logger = structlog.get_logger()
 
+# The minimum amount of finished results needed before we use their duration
+# to predict the amount of runners needed.
+_MIN_DURATION_SAMPLES = 5
+
 GradeCalculator = t.Callable[[t.Sequence['psef.models.RubricItem'], float],
                              'psef.models.RubricItem']
 
@@ -100,6 +107,14 @@ class AutoTestSuite(Base, TimestampMixin, IdMixin):
         'command_time_limit', db.Float, nullable=True, default=None
     )
 
+    cpu_cores = db.Column(
+        'cpu_cores',
+        db.Integer,
+        nullable=False,
+        default=1,
+        server_default='1',
+    )
+
     def get_instructions(
         self, run: 'AutoTestRun'
     ) -> auto_test_module.SuiteInstructions:
@@ -112,6 +127,7 @@ class AutoTestSuite(Base, TimestampMixin, IdMixin):
             'steps': [s.get_instructions() for s in steps],
             'network_disabled': self.network_disabled,
             'submission_info': self.submission_info,
+            'cpu_cores': self.cpu_cores,
         }
 
     def __to_json__(self) -> t.Mapping[str, object]:
@@ -122,6 +138,7 @@ class AutoTestSuite(Base, TimestampMixin, IdMixin):
             'network_disabled': self.network_disabled,
             'submission_info': self.submission_info,
             'command_time_limit': self.command_time_limit,
+            'cpu_cores': self.cpu_cores,
         }
 
     def set_steps(self, steps: t.List['psef.helpers.JSONType']) -> None:
@@ -181,6 +198,7 @@ class AutoTestSuite(Base, TimestampMixin, IdMixin):
             submission_info=self.submission_info,
             steps=[s.copy() for s in self.steps],
             command_time_limit=self.command_time_limit,
+            cpu_cores=self.cpu_cores,
         )
 
 
@@ -285,6 +303,24 @@ class AutoTestResult(Base, TimestampMixin, IdMixin, NotEqualMixin):
         'started_at', db.TIMESTAMP(timezone=True), default=None, nullable=True
     )
 
+    finished_at = db.Column(
+        'finished_at',
+        db.TIMESTAMP(timezone=True),
+        default=None,
+        nullable=True,
+    )
+
+    # This index is used to find the most recently finished results of a run,
+    # see :meth:`.AutoTest.get_average_result_duration`.
+    __table_args__ = (
+        db.Index(
+            'ix_AutoTestResult_auto_test_run_id_finished_at',
+            auto_test_run_id,
+            finished_at,
+            postgresql_where=finished_at.isnot(None),
+        ),
+    )
+
     setup_stderr = deferred(
         db.Column(
             'setup_stderr',
@@ -373,15 +409,18 @@ class AutoTestResult(Base, TimestampMixin, IdMixin, NotEqualMixin):
         self._state = new_state
         if new_state == auto_test_step_models.AutoTestStepResultState.running:
             self.started_at = DatetimeWithTimezone.utcnow()
+            self.finished_at = None
             psef.tasks.adjust_amount_runners(self.run.id)
         elif (
             new_state in
             auto_test_step_models.AutoTestStepResultState.get_finished_states()
         ):
+            self.finished_at = DatetimeWithTimezone.utcnow()
             if self.final_result:
                 self.update_rubric()
         else:
             self.started_at = None
+            self.finished_at = None
 
     state = hybrid_property(fget=_get_state, fset=_set_state)
 
@@ -645,6 +684,68 @@ class AutoTestRunner(Base, TimestampMixin, UUIDMixin, NotEqualMixin):
         return cls(_ipaddr=ipaddr, _job_id=run.get_job_id(), run=run)
 
 
+_ResultStateChanges = t.Counter[t.Tuple[
+    int, 'auto_test_step_models.AutoTestStepResultState']]
+
+
+class AutoTestResultStateCount(Base):
+    """The amount of :class:`.AutoTestResult` s of a run in a given state.
+
+    A row exists for every state of every run, and these counts are updated in
+    the same transaction as the results themselves. This makes it possible to
+    know how many results still need to be run without counting the results.
+    """
+    __tablename__ = 'AutoTestResultStateCount'
+
+    auto_test_run_id = db.Column(
+        'auto_test_run_id',
+        db.Integer,
+        db.ForeignKey('AutoTestRun.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+
+    state = db.Column(
+        'state',
+        db.Enum(auto_test_step_models.AutoTestStepResultState),
+        primary_key=True,
+    )
+
+    amount = db.Column(
+        'amount', db.Integer, nullable=False, default=0, server_default='0'
+    )
+
+    @classmethod
+    def apply_changes(
+        cls,
+        connection: sqlalchemy.engine.Connection,
+        changes: _ResultStateChanges,
+    ) -> None:
+        """Apply the given changes to the counts.
+
+        The counts are updated in a fixed order, so concurrent transactions
+        cannot deadlock on them.
+
+        :param connection: The connection to execute the updates on.
+        :param changes: A mapping from run id and state to the amount with
+            which the count for that state should change.
+        :returns: Nothing.
+        """
+        table = cls.__table__
+        for (run_id, state), delta in sorted(
+            changes.items(), key=lambda item: (item[0][0], item[0][1].value)
+        ):
+            if delta == 0:
+                continue
+            connection.execute(
+                table.update().where(
+                    and_(
+                        table.c.auto_test_run_id == run_id,
+                        table.c.state == state,
+                    )
+                ).values(amount=table.c.amount + delta)
+            )
+
+
 class AutoTestRun(Base, TimestampMixin, IdMixin):
     """This class represents a single run of an AutoTest configuration.
 
@@ -894,36 +995,141 @@ class AutoTestRun(Base, TimestampMixin, IdMixin):
 
         return any_cleared
 
+    def get_amount_results_in_state(
+        self, state: auto_test_step_models.AutoTestStepResultState
+    ) -> int:
+        """Get the amount of results of this run in the given state.
+
+        This uses the counts in :class:`.AutoTestResultStateCount`, so the
+        results themselves are not queried.
+
+        :param state: The state to get the amount of results for.
+        :returns: The amount of results in the given state.
+        """
+        ARSC = AutoTestResultStateCount
+        return db.session.query(ARSC.amount).filter(
+            ARSC.auto_test_run_id == self.id,
+            ARSC.state == state,
+        ).scalar() or 0
+
+    def _get_amount_upcoming_batch_results(self) -> int:
+        """Get the amount of results that will be cleared by an upcoming batch
+            run.
+
+        A batch run is upcoming if it has not been done yet and the deadline
+        is less than ``AUTO_TEST_RUNNER_PREWARM_TIME`` seconds away (or has
+        already passed).
+        """
+        deadline = self.auto_test.assignment.deadline
+        if (
+            self.batch_run_done or deadline is None or
+            not self.auto_test.has_hidden_steps
+        ):
+            return 0
+
+        prewarm_time = datetime.timedelta(
+            seconds=psef.app.config['AUTO_TEST_RUNNER_PREWARM_TIME']
+        )
+        if deadline > DatetimeWithTimezone.utcnow() + prewarm_time:
+            return 0
+
+        # Results that have not started yet are already counted, and skipped
+        # results are not cleared. This uses the counts, so the results are not
+        # queried. This overestimates the amount when older submissions have
+        # finished results, which only means runners are started a bit sooner.
+        ARSC = AutoTestResultStateCount
+        amount = db.session.query(sql_func.sum(ARSC.amount)).filter(
+            ARSC.auto_test_run_id == self.id,
+            ~ARSC.state.in_(
+                [
+                    auto_test_step_models.AutoTestStepResultState.not_started,
+                    auto_test_step_models.AutoTestStepResultState.skipped,
+                ]
+            ),
+        ).scalar()
+        return int(amount or 0)
+
     def get_amount_needed_runners(self) -> int:
         """Get the amount of runners this run needs.
+
+        The minimum amount is based on ``AUTO_TEST_MAX_JOBS_PER_RUNNER``. If
+        we know how long a result of this AutoTest takes, see
+        :meth:`.AutoTest.get_average_result_duration`, we request enough
+        runners to finish all outstanding results within
+        ``AUTO_TEST_TARGET_DRAIN_TIME`` seconds. Results that will be cleared
+        by an upcoming batch run are also counted, so runners are started
+        before the deadline passes. These results can only be run after the
+        deadline, so when the duration of a result is known they never
+        increase the amount above what is needed to drain the batch.
         """
-        amount_not_done = self.get_results_to_run().count()
-        return math.ceil(
-            amount_not_done / psef.app.config['AUTO_TEST_MAX_JOBS_PER_RUNNER']
+        # Results are skipped when a newer submission is handed in or when
+        # their submission is deleted, so the results that are not started
+        # are the results of :meth:`.AutoTestRun.get_results_to_run`.
+        if self.auto_test.assignment.is_visible:
+            amount_not_started = self.get_amount_results_in_state(
+                auto_test_step_models.AutoTestStepResultState.not_started
+            )
+            amount_not_done = (
+                amount_not_started + self._get_amount_upcoming_batch_results()
+            )
+        else:
+            amount_not_started = amount_not_done = 0
+
+        config = psef.app.config
+        max_jobs = config['AUTO_TEST_MAX_JOBS_PER_RUNNER']
+        needed = math.ceil(amount_not_started / max_jobs)
+
+        target_time = config['AUTO_TEST_TARGET_DRAIN_TIME']
+        duration = None
+        if amount_not_done > 0 and target_time > 0:
+            duration = self.auto_test.get_average_result_duration()
+        if duration is None:
+            return max(needed, math.ceil(amount_not_done / max_jobs))
+
+        # A runner never runs more than ``concurrency`` results at the same
+        # time, so more runners than this would simply be idle.
+        concurrency = config['AUTO_TEST_RUNNER_CONCURRENCY']
+        predicted = min(
+            math.ceil(amount_not_done / concurrency),
+            math.ceil(
+                amount_not_done * duration / (concurrency * target_time)
+            ),
         )
+        logger.info(
+            'Predicted amount of needed runners',
+            amount_not_done=amount_not_done,
+            average_duration=duration,
+            predicted_runners=predicted,
+            minimum_runners=needed,
+        )
+        return max(needed, predicted)
 
     @classmethod
-    def get_runs_that_need_runners(cls) -> t.List['AutoTestRun']:
+    def get_runs_that_need_runners(
+        cls, job_id: t.Optional[str] = None
+    ) -> t.List['AutoTestRun']:
         """Get all runs that need more runners.
 
         This function gets all runs that have fewer runners than they should,
         which is calculated using the amount of results that have not yet
         started.
+
+        :param job_id: If given only the run with this job id, see
+            :meth:`.AutoTestRun.get_job_id`, is considered.
         """
         ARR = AutoTestRunner
-        ARS = AutoTestResult
+        ARSC = AutoTestResultStateCount
 
-        amount_results = sql_func.count(distinct(ARS.id))
+        amount_results = ARSC.amount
         amount_runners = sql_func.count(distinct(ARR.id))
 
         runs = db.session.query(cls).join(
-            ARS,
+            ARSC,
             and_(
-                ARS.auto_test_run_id == cls.id,
-                (
-                    ARS._state ==  # pylint: disable=protected-access
-                    auto_test_step_models.AutoTestStepResultState.not_started
-                ),
+                ARSC.auto_test_run_id == cls.id,
+                ARSC.state ==
+                auto_test_step_models.AutoTestStepResultState.not_started,
+                ARSC.amount > 0,
             ),
         ).join(
             ARR,
@@ -931,10 +1137,12 @@ class AutoTestRun(Base, TimestampMixin, IdMixin):
             isouter=True,
         ).having(
             or_(
-                amount_runners == 0, amount_results / amount_runners >
-                psef.app.config['AUTO_TEST_MAX_JOBS_PER_RUNNER']
+                amount_runners == 0,
+                amount_runners < cls.runners_requested,
+                amount_results / amount_runners >
+                psef.app.config['AUTO_TEST_MAX_JOBS_PER_RUNNER'],
             )
-        ).group_by(cls.id).order_by(
+        ).group_by(cls.id, ARSC.amount).order_by(
             nullsfirst(
                 (
                     amount_results / case(
@@ -945,6 +1153,16 @@ class AutoTestRun(Base, TimestampMixin, IdMixin):
             )
         ).options(orm.noload(cls.auto_test))
 
+        if job_id is not None:
+            run_job_id, _, job_number = job_id.rpartition('-')
+            try:
+                runs = runs.filter(
+                    cls._job_id == uuid.UUID(run_job_id),
+                    sql_func.coalesce(cls._job_number, 0) == int(job_number),
+                )
+            except ValueError:
+                return []
+
         return runs.all()
 
     def get_results_latest_submissions(self) -> MyQuery[AutoTestResult]:
@@ -1018,7 +1236,7 @@ class AutoTestRun(Base, TimestampMixin, IdMixin):
             'auto_test_id': self.auto_test_id,
             'result_ids': [r.id for r in results],
             'student_ids': [r.work.user_id for r in results],
-            'student_infos': [self._get_student_info(r) for r in results],
+            'student_infos': [self.get_student_info(r) for r in results],
             'assignment_info': self._get_assignment_info(),
             'sets': [s.get_instructions(self) for s in self.auto_test.sets],
             'fixtures': [(f.name, f.id) for f in self.auto_test.fixtures],
@@ -1042,7 +1260,7 @@ class AutoTestRun(Base, TimestampMixin, IdMixin):
             return {'deadline': deadline.isoformat()}
 
     @staticmethod
-    def _get_student_info(
+    def get_student_info(
         result: AutoTestResult
     ) -> auto_test_module.StudentInformation:
         """Get information about the submission that should be available in the
@@ -1426,12 +1644,53 @@ class AutoTest(Base, TimestampMixin, IdMixin):
         )
         results = [run.make_result(work_id) for work_id, in work_ids]
         db.session.bulk_save_objects(results)
+        # Bulk saves are not seen by the flush listener that keeps the counts
+        # up to date, so we need to update them ourselves.
+        AutoTestResultStateCount.apply_changes(
+            db.session.connection(),
+            collections.Counter({
+                (
+                    run.id,
+                    auto_test_step_models.AutoTestStepResultState.not_started
+                ): len(results),
+            }),
+        )
         if results:
             psef.helpers.callback_after_this_request(
                 lambda: psef.tasks.notify_broker_of_new_job(run.id, None)
             )
         return run
 
+    def get_average_result_duration(self) -> t.Optional[float]:
+        """Get the average time it took to run a single result of this
+            AutoTest.
+
+        Only the ``AUTO_TEST_DURATION_HISTORY`` most recently finished results
+        are considered, so changes to the AutoTest are picked up quickly.
+
+        :returns: The average duration in seconds, or ``None`` if too few
+            results have finished to make an estimate.
+        """
+        history = psef.app.config['AUTO_TEST_DURATION_HISTORY']
+        times = db.session.query(
+            AutoTestResult.started_at,
+            AutoTestResult.finished_at,
+        ).join(
+            AutoTestRun,
+            AutoTestRun.id == AutoTestResult.auto_test_run_id,
+        ).filter(
+            AutoTestRun.auto_test_id == self.id,
+            AutoTestResult.started_at.isnot(None),
+            AutoTestResult.finished_at.isnot(None),
+        ).order_by(AutoTestResult.finished_at.desc()).limit(history).all()
+
+        if len(times) < min(history, _MIN_DURATION_SAMPLES):
+            return None
+        return sum(
+            (finished - started).total_seconds()
+            for started, finished in times
+        ) / len(times)
+
     @property
     def has_hidden_steps(self) -> bool:
         """Are there hidden steps in this AutoTest.
@@ -1471,18 +1730,42 @@ class AutoTest(Base, TimestampMixin, IdMixin):
         run = self.run
 
         run_id = run.id
-        AutoTestResult.get_results_by_user(work.user_id).filter(
+        skipped = auto_test_step_models.AutoTestStepResultState.skipped
+        author_ids = [work.user_id]
+        if work.user.group is not None:
+            # The submissions of the members are hidden by the submission of
+            # their group, so their results will never be run.
+            author_ids.extend(member.id for member in work.user.group.members)
+        author_works = db.session.query(
+            t.cast(DbColumn[int], work_models.Work.id)
+        ).filter(
+            t.cast(DbColumn[int], work_models.Work.user_id).in_(author_ids)
+        )
+        to_skip = AutoTestResult.query.filter(
+            t.cast(DbColumn[int], AutoTestResult.work_id).in_(author_works),
             AutoTestResult.auto_test_run_id == run.id,
             t.cast(DbColumn[object], AutoTestResult.state).in_(
                 auto_test_step_models.AutoTestStepResultState.
                 get_not_finished_states()
             ),
-        ).update(
+        )
+        # The update below is not seen by the flush listener that keeps the
+        # counts up to date, so we need to update them ourselves.
+        changes: _ResultStateChanges = collections.Counter()
+        for state, amount in to_skip.with_entities(
+            AutoTestResult.state, sql_func.count()
+        ).group_by(AutoTestResult.state):
+            changes[(run_id, state)] -= amount
+            changes[(run_id, skipped)] += amount
+
+        to_skip.update(
             {
-                t.cast(DbColumn, AutoTestResult.state):
-                    auto_test_step_models.AutoTestStepResultState.skipped,
+                t.cast(DbColumn, AutoTestResult.state): skipped,
             }, False
         )
+        AutoTestResultStateCount.apply_changes(
+            db.session.connection(), changes
+        )
 
         def callbacks() -> None:
             psef.tasks.adjust_amount_runners(
@@ -1506,8 +1789,43 @@ class AutoTest(Base, TimestampMixin, IdMixin):
         if self is None or self.run is None:
             return
 
+        # The results of deleted submissions will never be run, so mark them
+        # as skipped to keep the amount of results to run correct.
+        for result in AutoTestResult.query.filter(
+            AutoTestResult.auto_test_run_id == self.run.id,
+            AutoTestResult.work_id == work_deletion.deleted_work.id,
+            t.cast(DbColumn[object], AutoTestResult.state).in_(
+                auto_test_step_models.AutoTestStepResultState.
+                get_not_finished_states()
+            ),
+        ):
+            # We use the private attribute here, as skipping a result should
+            # not update the rubric.
+            result._state = (  # pylint: disable=protected-access
+                auto_test_step_models.AutoTestStepResultState.skipped
+            )
+
+        deleted_user = work_deletion.deleted_work.user
         if work_deletion.new_latest:
             self.reset_work(work_deletion.new_latest)
+        elif deleted_user.group is not None:
+            # The group has no submission anymore, so the submissions of its
+            # members are the latest again. Their results were skipped when
+            # the group handed in, so they should be run again.
+            LW = work_models.LatestWork
+            member_ids = [member.id for member in deleted_user.group.members]
+            for result in AutoTestResult.query.filter(
+                AutoTestResult.auto_test_run_id == self.run.id,
+                AutoTestResult.state ==
+                auto_test_step_models.AutoTestStepResultState.skipped,
+                t.cast(DbColumn[int], AutoTestResult.work_id).in_(
+                    db.session.query(LW.work_id).filter(
+                        LW.assignment_id == self.assignment.id,
+                        t.cast(DbColumn[int], LW.user_id).in_(member_ids),
+                    )
+                ),
+            ):
+                self.reset_work(result.work)
 
         callback_after_this_request(
             lambda: psef.tasks.update_latest_results_in_broker(self.run.id)
@@ -1596,3 +1914,49 @@ class AutoTest(Base, TimestampMixin, IdMixin):
         for suite in res.all_suites:
             suite.rubric_row = rubric_mapping[suite.rubric_row]
         return res
+
+
+@event.listens_for(AutoTestRun, 'after_insert')
+def _create_result_state_counts(
+    _: object, connection: sqlalchemy.engine.Connection, target: AutoTestRun
+) -> None:
+    """Create the counts of results for a new run, see
+    :class:`.AutoTestResultStateCount`.
+    """
+    connection.execute(
+        AutoTestResultStateCount.__table__.insert(), [
+            {'auto_test_run_id': target.id, 'state': state, 'amount': 0}
+            for state in auto_test_step_models.AutoTestStepResultState
+        ]
+    )
+
+
+@event.listens_for(orm.Session, 'after_flush')
+def _update_result_state_counts(session: orm.Session, _: object) -> None:
+    """Update the counts of results for all results that were created, deleted
+    or changed state in this flush.
+    """
+    not_started = auto_test_step_models.AutoTestStepResultState.not_started
+    changes: _ResultStateChanges = collections.Counter()
+
+    for obj in session.new:
+        if isinstance(obj, AutoTestResult):
+            # pylint: disable=protected-access
+            changes[(obj.auto_test_run_id, obj._state or not_started)] += 1
+
+    for obj in session.dirty:
+        if isinstance(obj, AutoTestResult):
+            history = sqlalchemy.inspect(obj).attrs._state.history
+            if history.added and history.deleted:
+                changes[(obj.auto_test_run_id, history.deleted[0])] -= 1
+                changes[(obj.auto_test_run_id, history.added[0])] += 1
+
+    for obj in session.deleted:
+        if isinstance(obj, AutoTestResult):
+            history = sqlalchemy.inspect(obj).attrs._state.history
+            old_state = (history.deleted or history.unchanged or [None])[0]
+            if old_state is not None:
+                changes[(obj.auto_test_run_id, old_state)] -= 1
+
+    if changes:
+        AutoTestResultStateCount.apply_changes(session.connection(), changes)
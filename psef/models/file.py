@@ -5,7 +5,6 @@ SPDX-License-Identifier: AGPL-3.0-only
 import os
 import enum
 import uuid
-import shutil
 import typing as t
 from abc import abstractmethod
 from collections import defaultdict
@@ -118,10 +117,13 @@ class FileMixin(t.Generic[T]):
         >>> os.path.isfile(f.filename)
         False
 
+        If the file is stored in the blob store the underlying blob is only
+        removed when no other file refers to it anymore.
+
         :returns: Nothing.
         """
         try:
-            os.remove(self.get_diskname())
+            psef.files.delete_stored_file(self.get_diskname())
         except (AssertionError, FileNotFoundError):
             pass
 
@@ -212,7 +214,10 @@ class NestedFileMixin(FileMixin[T]):
         :param tree: The file tree as described by
                           :py:func:`psef.files.rename_directory_structure`
         :param top: The parent file
-        :returns: Nothing
+        :param creation_opts: Extra options passed to the constructor of every
+            created file.
+        :returns: The newly created top directory. All files are stored
+            deduplicated, see :func:`psef.files.deduplicate_file`.
         """
         new_top = cls(
             is_directory=True,
@@ -227,6 +232,11 @@ class NestedFileMixin(FileMixin[T]):
                     child, new_top, creation_opts
                 )
             elif isinstance(child, psef.files.ExtractFileTreeFile):
+                psef.files.deduplicate_file(
+                    psef.files.safe_join(
+                        current_app.config['UPLOAD_DIR'], child.disk_name
+                    )
+                )
                 cls(
                     name=child.name,
                     filename=child.disk_name,
@@ -512,7 +522,7 @@ class AutoTestFixture(Base, FileMixin[int], TimestampMixin):
         path, filename = psef.files.random_file_path()
         old_path = self.get_diskname()
         helpers.callback_after_this_request(
-            lambda: shutil.copy(old_path, path)
+            lambda: psef.files.copy_stored_file(old_path, path)
         )
 
         return AutoTestFixture(
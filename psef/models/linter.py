@@ -140,18 +140,54 @@ class LinterInstance(Base):
         self._error_summary = new_value
 
     def __init__(
-        self, work: 'work_models.Work', tester: 'assignment.AssignmentLinter'
+        self,
+        work: 'work_models.Work',
+        tester: 'assignment.AssignmentLinter',
+        instance_id: t.Optional[str] = None,
     ) -> None:
         super().__init__(work=work, tester=tester)
 
-        # Find a unique id
-        new_id = str(uuid.uuid4())
-        while db.session.query(
-            LinterInstance.query.filter(LinterInstance.id == new_id).exists()
-        ).scalar():  # pragma: no cover
-            new_id = str(uuid.uuid4())
+        if instance_id is None:
+            instance_id, = self._find_unique_ids(1)
+        self.id = instance_id
+
+    @classmethod
+    def _find_unique_ids(cls, amount: int) -> t.List[str]:
+        """Find ids that are not used by any linter instance yet.
 
-        self.id = new_id
+        :param amount: The amount of ids to find.
+        :returns: A list of ``amount`` unique ids.
+        """
+        res: t.Set[str] = set()
+        while len(res) < amount:
+            new_ids = {str(uuid.uuid4()) for _ in range(amount - len(res))}
+            taken = set(
+                instance_id for instance_id, in
+                db.session.query(cls.id).filter(cls.id.in_(new_ids))
+            )
+            res.update(new_ids - taken)
+        return list(res)
+
+    @classmethod
+    def create_many(
+        cls,
+        works: t.Sequence['work_models.Work'],
+        tester: 'assignment.AssignmentLinter',
+    ) -> t.List['LinterInstance']:
+        """Create linter instances for the given works.
+
+        This is the same as creating the instances separately, but it checks
+        that their ids are unique using a single query.
+
+        :param works: The works to create linter instances for.
+        :param tester: The linter of the created instances.
+        :returns: A linter instance for every given work.
+        """
+        ids = cls._find_unique_ids(len(works))
+        return [
+            cls(work, tester, instance_id)
+            for work, instance_id in zip(works, ids)
+        ]
 
     def __extended_to_json__(self) -> t.Mapping[str, object]:
         """Creates an extended JSON serializable representation of this linter
@@ -9,6 +9,8 @@ import copy
 import json
 import uuid
 import typing as t
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
 
 import furl
 import structlog
@@ -19,6 +21,7 @@ import flask_jwt_extended as flask_jwt
 import pylti1p3.exception
 import pylti1p3.names_roles
 import pylti1p3.service_connector
+from celery import current_task
 from sqlalchemy.types import JSON
 from sqlalchemy_utils import UUIDType
 from typing_extensions import Final
@@ -67,6 +70,30 @@ if t.TYPE_CHECKING:  # pragma: no cover
     from .work import Work
     from pylti1p3.names_roles import _NamesAndRolesData, _Member
 
+
+def _passback_with_retries(send: t.Callable[[], None], tries: int) -> None:
+    """Do a single passback, retrying it with an exponential backoff when it
+        fails.
+
+    :param send: The function that does the passback.
+    :param tries: The maximum amount of times the passback is tried.
+    :returns: Nothing.
+    :raises Exception: The error of the last try, if all tries failed.
+    """
+    errors: t.List[Exception] = []
+    for _ in psef.helpers.retry_loop(
+        tries,
+        sleep_time=lambda i: 2 ** i,
+        make_exception=lambda: errors[-1],
+    ):
+        try:
+            send()
+        except Exception as exc:  # pylint: disable=broad-except
+            errors.append(exc)
+        else:
+            break
+
+
 _ALL_LTI_PROVIDERS = sorted(['lti1.1', 'lti1.3'])
 lti_provider_handlers.set_possible_options(_ALL_LTI_PROVIDERS)
 
@@ -387,12 +414,65 @@ class LTI1p1Provider(LTIProviderBase):
             difference=set(s.id for s in subs) ^ set(submission_ids),
         )
 
-        # pylint: disable=protected-access
-        for sub in subs:
-            self._passback_grade(sub, initial=False)
-            self._update_history_sub(sub)
+        config = current_app.config
+        tries = config['LTI_PASSBACK_MAX_TRIES']
+        # The requests to the LMS are done in threads, so a single slow
+        # response doesn't block all other passbacks. These threads only do
+        # the HTTP requests, all database access is done in this thread.
+        pool = ThreadPoolExecutor(
+            config['LTI_PASSBACK_CONCURRENCY'],
+            initializer=psef.lti.v1_1.pool_oauth_clients,
+        )
+        failed: t.List[t.Tuple[int, BaseException]] = []
 
-        db.session.commit()
+        with pool:
+            pending = []
+            for sub in subs:
+                futures: t.List['Future[None]'] = []
+                # pylint: disable=protected-access
+                self._passback_grade(
+                    sub,
+                    initial=False,
+                    run=lambda send, futs=futures: futs.append(
+                        pool.submit(_passback_with_retries, send, tries)
+                    ),
+                )
+                pending.append((sub, futures))
+
+            # Store the progress in chunks, so that we do not have to wait for
+            # all passbacks before anything is committed.
+            for chunk in psef.helpers.chunkify(
+                pending, config['LTI_PASSBACK_CHUNK_SIZE']
+            ):
+                for sub, futures in chunk:
+                    errors = [
+                        err for err in (fut.exception() for fut in futures)
+                        if err is not None
+                    ]
+                    if errors:
+                        logger.warning(
+                            'Passing back grade failed',
+                            submission_id=sub.id,
+                            exc_info=errors[0],
+                        )
+                        failed.append((sub.id, errors[0]))
+                    else:
+                        self._update_history_sub(sub)
+                db.session.commit()
+
+        if failed:
+            failed_ids = [sub_id for sub_id, _ in failed]
+            logger.error(
+                'Passing back some grades failed',
+                failed_submissions=failed_ids,
+            )
+            if not current_task:
+                raise failed[0][1]
+            # Only retry the failed submissions, the others have already been
+            # passed back and their history has been updated.
+            raise current_task.retry(
+                args=((failed_ids, assignment_id), ), exc=failed[0][1]
+            )
 
     @classmethod
     def _delete_submission(cls, work_assignment_id: t.Tuple[int, int]) -> None:
@@ -427,13 +507,23 @@ class LTI1p1Provider(LTIProviderBase):
 
     # End of all signal handlers.
 
-    def _passback_grade(self, sub: 'Work', *, initial: bool) -> None:
+    def _passback_grade(
+        self,
+        sub: 'Work',
+        *,
+        initial: bool,
+        run: t.Optional[t.Callable[[t.Callable[[], None]], object]] = None,
+    ) -> None:
         """Passback the grade for a given submission to this lti provider.
 
         :param sub: The submission to passback.
         :param initial: If true no grade will be send, this is to make sure the
             ``created_at`` date is correct in the LMS. Not all providers
             actually do a passback when this is set to ``True``.
+        :param run: Function that is called with a function that does the
+            passback for a single author. If not given the passbacks are done
+            directly. The passback functions do not use the database, so they
+            can safely be called in another thread.
         :returns: Nothing.
         """
         service_url = sub.assignment.lti_grade_service_data
@@ -451,41 +541,31 @@ class LTI1p1Provider(LTIProviderBase):
             if sourcedid is None:  # pragma: no cover
                 continue
 
-            # Work around for https://github.com/python/mypy/issues/2608
-            _sourcedid = sourcedid
-            _service_url = service_url
-
-            # We bind these values as kwargs so pylint doesn't complain about
-            # using names bound in a loop in a closure (as python ) will reuse
-            # the same name for every iteration, so:
-            #
-            # ```
-            # cbs = []
-            # for i in range(9): cbs.append(lambda: print(i))
-            # [cb() for cb in cbs()]
-            # ```
-            #
-            # Will print '9' nine times.
-            def try_passback(
-                secret: str,
-                *,
-                _sid: str = _sourcedid,
-                _surl: str = _service_url
-            ) -> None:
+            requests: t.List[psef.lti.v1_1.OutcomeRequest] = []
+            # The newest secret should be placed last in this list
+            for secret in reversed(self.secrets):
                 self.lti_class.passback_grade(
                     key=self.key,
                     secret=secret,
                     grade=None if sub.deleted else sub.grade,
                     initial=initial,
-                    service_url=_surl,
-                    sourcedid=_sid,
+                    service_url=service_url,
+                    sourcedid=sourcedid,
                     lti_points_possible=sub.assignment.lti_points_possible,
                     submission=sub,
                     host=current_app.config['EXTERNAL_URL'],
+                    outcome_requests=requests,
                 )
 
-            # The newest secret should be placed last in this list
-            psef.helpers.try_for_every(reversed(self.secrets), try_passback)
+            send = partial(
+                psef.helpers.try_for_every,
+                requests,
+                psef.lti.v1_1.OutcomeRequest.post_outcome_request,
+            )
+            if run is None:
+                send()
+            else:
+                run(send)
 
     @property
     def _lms_and_secrets(self) -> t.Tuple[str, t.List[str]]:
@@ -2,20 +2,20 @@
 
 SPDX-License-Identifier: AGPL-3.0-only
 """
-import os
 import enum
+import json
 import typing as t
-import zipfile
-import tempfile
+import hashlib
 from collections import defaultdict
 
 import structlog
 import sqlalchemy
 import sqlalchemy.sql as sql
-from sqlalchemy import orm, select
+from sqlalchemy import orm, event, select
 from sqlalchemy.orm import undefer, selectinload
 from sqlalchemy.types import JSON
 from typing_extensions import Literal
+from sqlalchemy.dialects import postgresql
 
 import psef
 import cg_timers
@@ -32,7 +32,7 @@ from . import assignment as assignment_models
 from .. import auth, helpers, signals, features
 from .linter import LinterState, LinterComment, LinterInstance
 from .rubric import RubricItem, WorkRubricItem
-from .comment import CommentBase
+from .comment import CommentBase, CommentReply
 from ..helpers import JSONType
 from ..exceptions import PermissionException
 from ..permissions import CoursePermission
@@ -225,6 +225,15 @@ class Work(Base):
         nullable=True,
         default=None,
     )
+    # This version is increased every time the files of this submission
+    # change, it is part of the key of the cached file trees.
+    files_version = db.Column(
+        'files_version',
+        db.Integer,
+        default=0,
+        server_default='0',
+        nullable=False,
+    )
 
     def _get_deleted(self) -> bool:
         """Is this submission deleted.
@@ -729,6 +738,127 @@ class Work(Base):
                 f' {line_comm.linter_code}) {line_comm.comment}'
             )
 
+    @staticmethod
+    def _get_file_paths(work_ids: t.Collection[int]) -> t.Mapping[int, str]:
+        """Get the paths of all files in the given works.
+
+        This does the same as :meth:`.file_models.File.get_path` but for all
+        files at once, using a single query.
+
+        :param work_ids: The ids of the works of which you want the paths.
+        :returns: A mapping between file id and the path of the file.
+        """
+        File = file_models.File
+        files = {
+            file_id: (parent_id, name)
+            for file_id, parent_id, name in db.session.query(
+                File.id, File.parent_id, File.name
+            ).filter(t.cast(DbColumn[int], File.work_id).in_(work_ids))
+        }
+        paths: t.Dict[int, str] = {}
+
+        def get_path(file_id: int) -> str:
+            if file_id not in paths:
+                parent_id, name = files[file_id]
+                if parent_id is None:
+                    paths[file_id] = ''
+                else:
+                    upper = get_path(parent_id)
+                    paths[file_id] = f'{upper}/{name}' if upper else name
+            return paths[file_id]
+
+        for file_id in files:
+            get_path(file_id)
+        return paths
+
+    @classmethod
+    def get_feedback_of_works(
+        cls,
+        works: t.Sequence['Work'],
+        may_see_reply: t.Callable[['Work', CommentReply], bool],
+        may_see_linter_feedback: t.Callable[['Work'], bool],
+    ) -> t.Tuple[t.Mapping[int, t.List[str]], t.Mapping[int, t.List[str]]]:
+        """Get the user and linter feedback of all the given works.
+
+        This produces the same feedback as :meth:`.Work.get_user_feedback` and
+        :meth:`.Work.get_linter_feedback`, but it uses a fixed amount of
+        queries for all the given works instead of a couple of queries per
+        work.
+
+        :param works: The works to get the feedback of.
+        :param may_see_reply: Function that is called to check if a reply
+            should be included in the user feedback.
+        :param may_see_linter_feedback: Function that is called to check if
+            the linter feedback of a work should be retrieved.
+        :returns: A tuple of two mappings from work id to feedback, the first
+            contains the user feedback, the second the linter feedback. Works
+            without (visible) feedback may be missing from these mappings.
+        """
+        File = file_models.File
+        works_by_id = {work.id: work for work in works}
+        if not works_by_id:
+            return {}, {}
+
+        paths = cls._get_file_paths(works_by_id.keys())
+        user_feedback: t.Dict[int, t.List[str]] = defaultdict(list)
+        linter_feedback: t.Dict[int, t.List[str]] = defaultdict(list)
+
+        comments = db.session.query(CommentBase, File.work_id).join(
+            CommentBase.file
+        ).filter(
+            t.cast(DbColumn[int], File.work_id).in_(works_by_id.keys()),
+        ).options(
+            orm.lazyload(CommentBase.file),
+        ).order_by(
+            CommentBase.file_id.asc(),
+            CommentBase.line.asc(),
+        )
+        for com, work_id in comments:
+            work = works_by_id[work_id]
+            prefix = f'{paths[com.file_id]}:{com.line + 1}'
+            visible_replies = (
+                reply for reply in com.replies if may_see_reply(work, reply)
+            )
+            user_feedback[work_id].extend(
+                f'{prefix}:{idx + 1}: {reply.comment}'
+                for idx, reply in enumerate(visible_replies)
+            )
+
+        linter_work_ids = [
+            work.id for work in works_by_id.values()
+            if may_see_linter_feedback(work)
+        ]
+        if linter_work_ids:
+            AssignmentLinter = assignment_models.AssignmentLinter
+            linter_comments = db.session.query(
+                LinterComment.file_id,
+                LinterComment.line,
+                LinterComment.linter_code,
+                LinterComment.comment,
+                AssignmentLinter.name,
+                File.work_id,
+            ).join(
+                File, File.id == LinterComment.file_id
+            ).join(
+                LinterInstance, LinterInstance.id == LinterComment.linter_id
+            ).join(
+                AssignmentLinter,
+                AssignmentLinter.id == LinterInstance.tester_id,
+            ).filter(
+                t.cast(DbColumn[int], File.work_id).in_(linter_work_ids),
+            ).order_by(
+                LinterComment.file_id.asc(),
+                LinterComment.line.asc(),
+            )
+            for (
+                file_id, line, code, comment, name, work_id
+            ) in linter_comments:
+                linter_feedback[work_id].append(
+                    f'{paths[file_id]}:{line + 1}:1: ({name} {code}) {comment}'
+                )
+
+        return user_feedback, linter_feedback
+
     def remove_selected_rubric_item(self, row_id: int) -> None:
         """Deselect selected :class:`.RubricItem` on row.
 
@@ -826,10 +956,33 @@ class Work(Base):
         :returns: A mapping from file id to list of all its children for this
             submission.
         """
-        cache: t.Mapping[t.Optional[int], t.
-                         List['file_models.File']] = defaultdict(list)
+        return self.get_file_children_mappings([self], exclude)[self.id]
+
+    @staticmethod
+    def get_file_children_mappings(
+        works: t.Sequence['Work'],
+        exclude: 'file_models.FileOwner',
+    ) -> t.Mapping[int, t.Mapping[t.Optional[int], t.
+                                  Sequence['file_models.File']]]:
+        """Get the children mapping (see :meth:`.get_file_children_mapping`)
+        of multiple submissions at once.
+
+        This does a single query to the database for all the given works.
+
+        :param works: The submissions to get the mappings for.
+        :param exclude: The file owners to exclude
+        :returns: A mapping from work id to the children mapping of that work.
+        """
+        caches: t.Dict[int, t.Mapping[t.Optional[int], t.
+                                      List['file_models.File']]] = {
+                                          work.id: defaultdict(list)
+                                          for work in works
+                                      }
+        if not caches:
+            return caches
+
         files = file_models.File.query.filter(
-            file_models.File.work == self,
+            file_models.File.work_id.in_(list(caches.keys())),
             file_models.File.fileowner != exclude,
             ~file_models.File.self_deleted,
         ).all()
@@ -840,9 +993,71 @@ class Work(Base):
         # overal and sorting an already sorted list in Python is really fast.
         files.sort(key=lambda el: el.name.lower())
         for f in files:
-            cache[f.parent_id].append(f)
+            caches[f.work_id][f.parent_id].append(f)
+
+        return caches
+
+    def _get_file_tree_cache_key(
+        self, exclude: 'file_models.FileOwner'
+    ) -> str:
+        # The creation date is part of the key so a cache entry can never be
+        # used for a different submission that happens to reuse this id.
+        return '/'.join([
+            str(self.id),
+            self.created_at.isoformat(),
+            str(self.files_version),
+            exclude.name,
+        ])
+
+    def get_cached_file_tree(
+        self, exclude: 'file_models.FileOwner'
+    ) -> t.Mapping[str, t.Any]:
+        """Get the serialized file tree of this submission, starting at its
+        root directory.
+
+        The tree is cached between requests, see
+        :meth:`.Work.bump_files_version` to invalidate it.
+
+        :param exclude: The file owner to exclude from the tree.
+        :returns: A mapping with two keys: ``tree``, the JSON serialized
+            :class:`psef.files.FileTree`, and ``etag``, a strong ETag of this
+            tree.
+        """
+
+        def get_tree() -> t.Dict[str, t.Any]:
+            root = psef.helpers.filter_single_or_404(
+                file_models.File,
+                file_models.File.work_id == self.id,
+                file_models.File.parent_id.is_(None),
+                file_models.File.fileowner != exclude,
+                ~file_models.File.self_deleted,
+            )
+            tree = psef.helpers.JSONResponse.dump_to_object(
+                root.list_contents(exclude)
+            )
+            etag = hashlib.sha256(
+                json.dumps(tree, sort_keys=True).encode('utf8')
+            ).hexdigest()
+            return {'etag': etag, 'tree': tree}
+
+        return psef.app.inter_request_cache.file_trees.get_or_set(
+            self._get_file_tree_cache_key(exclude), get_tree
+        )
+
+    def bump_files_version(self) -> None:
+        """Increase the version of the files of this submission, which
+            invalidates its cached file trees.
 
-        return cache
+        This should be called for every change to the files of this
+        submission, in the same transaction as the change. This way a tree
+        that was built before the change was committed can only be stored
+        under the key of the old version.
+
+        :returns: Nothing.
+        """
+        # Increase the version in the database, so concurrent changes cannot
+        # end up with the same version.
+        self.files_version = t.cast(int, Work.files_version + 1)
 
     @staticmethod
     def limit_to_user_submissions(
@@ -901,37 +1116,46 @@ class Work(Base):
         """Create zip in `MIRROR_UPLOADS` directory.
 
         :param exclude_owner: Which files to exclude.
+        :param create_leading_directory: Should the top directory of the
+            submission be present in the zip.
         :returns: The name of the zip file in the `MIRROR_UPLOADS` dir.
         """
         path, name = psef.files.random_file_path(True)
 
-        with open(
-            path,
-            'w+b',
-        ) as f, tempfile.TemporaryDirectory(
-            suffix='dir',
-        ) as tmpdir, zipfile.ZipFile(
-            f,
-            'w',
-            compression=zipfile.ZIP_DEFLATED,
-        ) as zipf:
-            # Restore the files to tmpdir
-            tree_root = psef.files.restore_directory_structure(
-                self, tmpdir, exclude_owner
-            )
+        with open(path, 'wb') as f:
+            for chunk in self.stream_zip(
+                exclude_owner, create_leading_directory
+            ):
+                f.write(chunk)
 
-            if create_leading_directory:
-                zipf.write(tmpdir, tree_root.name)
-                leading_len = len(tmpdir)
-            else:
-                leading_len = len(tmpdir) + len('/') + len(tree_root.name)
+        return name
 
-            for root, _dirs, files in os.walk(tmpdir):
-                for file in files:
-                    path = psef.files.safe_join(root, file)
-                    zipf.write(path, path[leading_len:])
+    def stream_zip(
+        self,
+        exclude_owner: 'file_models.FileOwner',
+        create_leading_directory: bool = True
+    ) -> t.Iterator[bytes]:
+        """Create a zip of this submission as a stream of bytes.
 
-        return name
+        The zip is build directly from the stored files, see
+        :func:`psef.files.stream_zip_of_tree`.
+
+        :param exclude_owner: Which files to exclude.
+        :param create_leading_directory: Should the top directory of the
+            submission be present in the zip.
+        :returns: An iterator producing the zip archive.
+        """
+        root = helpers.filter_single_or_404(
+            file_models.File,
+            file_models.File.work_id == self.id,
+            file_models.File.parent_id.is_(None),
+            file_models.File.fileowner != exclude_owner,
+            ~file_models.File.self_deleted,
+        )
+        cache = self.get_file_children_mapping(exclude_owner)
+        return psef.files.stream_zip_of_tree(
+            root, cache, create_leading_directory
+        )
 
     @classmethod
     def create_from_tree(
@@ -1009,3 +1233,275 @@ class Work(Base):
             undefer(cls.comment),
             selectinload(cls.comment_author),
         )
+
+
+class LatestWork(Base):
+    """The latest non deleted :class:`.Work` of every author of an assignment.
+
+    This table is kept up to date in the same transaction as the submissions
+    themselves, see :func:`_update_latest_works`. This makes it possible to
+    find the latest submissions of an assignment using an index, instead of
+    sorting all submissions of the assignment.
+
+    .. note::
+
+        Submissions that are deleted (i.e. ``Work._deleted`` is set) never
+        occur in this table, but the visibility of the assignment is not taken
+        into account.
+    """
+    __tablename__ = 'LatestWork'
+
+    assignment_id = db.Column(
+        'assignment_id',
+        db.Integer,
+        db.ForeignKey('Assignment.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    user_id = db.Column(
+        'user_id',
+        db.Integer,
+        db.ForeignKey('User.id', ondelete='CASCADE'),
+        primary_key=True,
+    )
+    work_id = db.Column(
+        'work_id',
+        db.Integer,
+        db.ForeignKey('Work.id', ondelete='CASCADE'),
+        nullable=False,
+        unique=True,
+    )
+
+    @staticmethod
+    def _get_expected_query(
+        assignment_id: t.Optional[int] = None
+    ) -> _MyQuery[t.Tuple[int, int, int]]:
+        """Get a query that computes the latest submissions without using this
+            table.
+
+        A submission is the latest of its author if there is no newer non
+        deleted submission of the same author. When two submissions are
+        created at the exact same moment the one with the highest id is the
+        newest, just like in
+        :meth:`.assignment_models.Assignment.get_from_latest_submissions`.
+
+        :param assignment_id: Only get the latest submissions of this
+            assignment, if not given the latest submissions of all assignments
+            are retrieved.
+        :returns: A query producing tuples of assignment id, user id and work
+            id.
+        """
+        newer = orm.aliased(Work)
+        res = db.session.query(
+            Work.assignment_id, Work.user_id, Work.id
+        ).filter(
+            ~Work._deleted,  # pylint: disable=protected-access
+            ~db.session.query(newer.id).filter(
+                newer.assignment_id == Work.assignment_id,
+                newer.user_id == Work.user_id,
+                ~newer._deleted,  # pylint: disable=protected-access
+                sql.or_(
+                    newer.created_at > Work.created_at,
+                    sql.and_(
+                        newer.created_at == Work.created_at,
+                        newer.id > Work.id,
+                    ),
+                ),
+            ).exists(),
+        )
+        if assignment_id is not None:
+            res = res.filter(Work.assignment_id == assignment_id)
+        return res
+
+    @classmethod
+    def update_authors(
+        cls,
+        connection: sqlalchemy.engine.Connection,
+        authors: t.Iterable[t.Tuple[int, int]],
+    ) -> None:
+        """Recompute the latest submission of the given authors.
+
+        The row of every author is locked before its latest submission is
+        determined, so concurrent transactions that change the submissions of
+        the same author update the row one after the other, and the last one
+        sees the submissions committed by the others. The authors are updated
+        in a fixed order, so concurrent transactions cannot deadlock on them.
+
+        :param connection: The connection to execute the queries on.
+        :param authors: Tuples of assignment id and user id for which the
+            latest submission should be recomputed.
+        :returns: Nothing.
+        """
+        table = cls.__table__
+        for assignment_id, user_id in sorted(set(authors)):
+            latest_query = select([Work.id]).where(
+                sql.and_(
+                    Work.assignment_id == assignment_id,
+                    Work.user_id == user_id,
+                    ~Work._deleted,  # pylint: disable=protected-access
+                )
+            ).order_by(
+                Work.created_at.desc(),
+                Work.id.desc(),
+            ).limit(1)
+            is_author = sql.and_(
+                table.c.assignment_id == assignment_id,
+                table.c.user_id == user_id,
+            )
+
+            latest_id = connection.execute(latest_query).scalar()
+            if latest_id is not None:
+                # Make sure the row exists so that we can lock it. If another
+                # transaction is inserting the same row this waits until that
+                # transaction has finished.
+                connection.execute(
+                    cls._insert_ignoring_conflicts(
+                        connection,
+                        assignment_id=assignment_id,
+                        user_id=user_id,
+                        work_id=latest_id,
+                    )
+                )
+            connection.execute(
+                select([table.c.work_id]).where(is_author).with_for_update()
+            )
+            # Now that we have the lock, all other transactions changing the
+            # submissions of this author have either committed or will wait
+            # for us, so this query sees their submissions.
+            latest_id = connection.execute(latest_query).scalar()
+
+            if latest_id is None:
+                connection.execute(table.delete().where(is_author))
+                continue
+
+            # The work might have been the latest of another author before its
+            # author was changed.
+            connection.execute(
+                table.delete().where(
+                    sql.and_(table.c.work_id == latest_id, ~is_author)
+                )
+            )
+            if connection.execute(
+                table.update().where(is_author).values(work_id=latest_id)
+            ).rowcount == 0:
+                connection.execute(
+                    table.insert().values(
+                        assignment_id=assignment_id,
+                        user_id=user_id,
+                        work_id=latest_id,
+                    )
+                )
+
+    @classmethod
+    def _insert_ignoring_conflicts(
+        cls, connection: sqlalchemy.engine.Connection, **values: int
+    ) -> sqlalchemy.sql.expression.Insert:
+        """Get an insert statement for this table that does nothing if the
+            row conflicts with an existing row.
+
+        :param connection: The connection the statement will be executed on.
+        :param values: The values of the row to insert.
+        :returns: The insert statement.
+        """
+        if connection.dialect.name == 'postgresql':
+            insert = postgresql.insert(cls.__table__).values(**values)
+            return insert.on_conflict_do_nothing()
+        # SQLite doesn't support ``ON CONFLICT`` in our version of sqlalchemy.
+        return cls.__table__.insert().values(**values).prefix_with('OR IGNORE')
+
+    @classmethod
+    def backfill(cls, assignment_id: t.Optional[int] = None) -> None:
+        """Fill this table from scratch using the submissions in the database.
+
+        :param assignment_id: Only fill the table for this assignment, if not
+            given the rows for all assignments are replaced.
+        :returns: Nothing.
+        """
+        table = cls.__table__
+        delete = table.delete()
+        if assignment_id is not None:
+            delete = delete.where(table.c.assignment_id == assignment_id)
+        db.session.execute(delete)
+        db.session.execute(
+            table.insert().from_select(
+                ['assignment_id', 'user_id', 'work_id'],
+                cls._get_expected_query(assignment_id).statement,
+            )
+        )
+
+    @classmethod
+    def find_inconsistencies(
+        cls, assignment_id: t.Optional[int] = None
+    ) -> t.List[t.Tuple[int, int, t.Optional[int], t.Optional[int]]]:
+        """Find all authors for which this table contains the wrong latest
+            submission.
+
+        :param assignment_id: Only check this assignment, if not given all
+            assignments are checked.
+        :returns: A list of tuples, each containing the assignment id, the user
+            id, the work id found in this table and the work id that should be
+            in this table. The work ids are ``None`` if there is no (expected)
+            row.
+        """
+        stored_query = db.session.query(
+            cls.assignment_id, cls.user_id, cls.work_id
+        )
+        if assignment_id is not None:
+            stored_query = stored_query.filter(
+                cls.assignment_id == assignment_id
+            )
+        stored = {(a, u): w for a, u, w in stored_query}
+        expected = {
+            (a, u): w
+            for a, u, w in cls._get_expected_query(assignment_id)
+        }
+
+        res = []
+        for author in sorted(stored.keys() | expected.keys()):
+            stored_id = stored.get(author)
+            expected_id = expected.get(author)
+            if stored_id != expected_id:
+                res.append((*author, stored_id, expected_id))
+        return res
+
+
+@event.listens_for(orm.Session, 'after_flush')
+def _update_latest_works(session: orm.Session, _: object) -> None:
+    """Update the :class:`.LatestWork` table for all authors of which a
+    submission was created, deleted or changed in this flush.
+    """
+    authors: t.Set[t.Tuple[int, int]] = set()
+
+    for obj in session.new:
+        if isinstance(obj, Work):
+            authors.add((obj.assignment_id, obj.user_id))
+
+    changed_ids = []
+
+    for obj in session.dirty:
+        if isinstance(obj, Work) and any(
+            getattr(sqlalchemy.inspect(obj).attrs, attr).history.has_changes()
+            for attr in ['_deleted', 'created_at', 'assignment_id', 'user_id']
+        ):
+            authors.add((obj.assignment_id, obj.user_id))
+            changed_ids.append(obj.id)
+
+    for obj in session.deleted:
+        if isinstance(obj, Work):
+            authors.add((obj.assignment_id, obj.user_id))
+            changed_ids.append(obj.id)
+
+    if changed_ids:
+        # If the author of a work changed the previous author might have a
+        # different latest work now. We cannot use the attribute history for
+        # this, as the old value is not loaded when it is simply overwritten.
+        old_authors = session.connection().execute(
+            select([LatestWork.assignment_id, LatestWork.user_id]).where(
+                t.cast(DbColumn[int], LatestWork.work_id).in_(changed_ids)
+            )
+        )
+        authors.update(
+            (assig_id, user_id) for assig_id, user_id in old_authors
+        )
+
+    if authors:
+        LatestWork.update_authors(session.connection(), authors)
@@ -7,10 +7,15 @@ module.
 
 SPDX-License-Identifier: AGPL-3.0-only
 """
+import os
 import abc
 import csv
 import enum
+import time
+import uuid
+import hashlib
 import typing as t
+import datetime
 import dataclasses
 
 import structlog
@@ -84,12 +89,14 @@ class Option:
 
 
 def process_output_csv(
+    plagiarism_run: models.PlagiarismRun,
     lookup_map: t.Dict[str, int],
     old_submissions: t.Container[int],
     file_tree_lookup: t.Dict[int, files.FileTree[int]],
     csvfile: str,
     delimiter: str = ';',
-) -> t.List[models.PlagiarismCase]:
+    batch_size: int = 10000,
+) -> None:
     """Process the outputted csv file into plagiarism cases with matches.
 
     Each line of the csvfile should have the following items separated by
@@ -107,7 +114,16 @@ def process_output_csv(
     10. The end position were the match for the second file ends;
 
     Fields 5-10 can occur any number of times, but have to occur at least once.
+    Matches of which a file cannot be found are skipped, and the matches of a
+    row for a pair of submissions that was already found are added to the
+    existing case.
 
+    The csv file is streamed, and the cases and matches are inserted in the
+    database in batches, so this function uses a constant amount of memory
+    (apart from the found cases) for large files. The session is flushed but
+    not committed.
+
+    :param plagiarism_run: The run to which the found cases should be added.
     :param lookup_map: A dictionary that should map the name of each toplevel
         directory to a submission id.
     :param old_submissions: Some sort of set that contains the ids of all
@@ -117,12 +133,30 @@ def process_output_csv(
         trees.
     :param csvfile: The location of the csv file that follow the above format.
     :param delimiter: The delimiter used for this csv file.
+    :param batch_size: The amount of matches to insert at once.
+    :returns: Nothing.
     """
-    res = []
-    seen: t.Dict[t.Tuple[int, int], models.PlagiarismCase] = {}
+    case_ids: t.Dict[t.Tuple[int, int], int] = {}
+    new_cases: t.Dict[t.Tuple[int, int], models.PlagiarismCase] = {}
+    matches: t.List[t.Tuple[t.Tuple[int, int], t.Dict[str, int]]] = []
+
+    def insert_batch() -> None:
+        models.db.session.flush()
+        for key, case in new_cases.items():
+            case_ids[key] = case.id
+        new_cases.clear()
+
+        models.db.session.bulk_insert_mappings(
+            models.PlagiarismMatch,
+            [{
+                **match,
+                'plagiarism_case_id': case_ids[key],
+            } for key, match in matches],
+        )
+        matches.clear()
 
     with open(csvfile, newline='') as f:
-        for dir1, dir2, match1, match2, *matches in csv.reader(
+        for dir1, dir2, match1, match2, *row_matches in csv.reader(
             f,
             delimiter=delimiter,
         ):
@@ -140,13 +174,12 @@ def process_output_csv(
                 continue
 
             tup = t.cast(t.Tuple[int, int], tuple(sorted((sub1_id, sub2_id))))
-            if tup in seen:
+            if tup in case_ids or tup in new_cases:
                 logger.warning(
                     'Duplicate plagiarism case in csv file',
                     submission1_id=sub1_id,
                     submission2_id=sub2_id,
                 )
-                new_case = seen[tup]
             else:
                 match_max = max(float(match1), float(match2))
                 match_avg = (float(match1) + float(match2)) / 2
@@ -155,32 +188,173 @@ def process_output_csv(
                     work2_id=sub2_id,
                     match_avg=match_avg,
                     match_max=match_max,
+                    plagiarism_run_id=plagiarism_run.id,
                 )
-                seen[tup] = new_case
+                models.db.session.add(new_case)
+                new_cases[tup] = new_case
 
-            for match in zip(*[iter(matches)] * 6):
+            for match in zip(*[iter(row_matches)] * 6):
                 fname1, fstart1, fend1, fname2, fstart2, fend2 = match
-                f_id1 = files.search_path_in_filetree(
-                    file_tree_lookup[sub1_id],
-                    fname1,
-                )
-                f_id2 = files.search_path_in_filetree(
-                    file_tree_lookup[sub2_id],
-                    fname2,
-                )
-                new_case.matches.append(
-                    models.PlagiarismMatch(
-                        file1_id=f_id1,
-                        file2_id=f_id2,
-                        file1_start=fstart1,
-                        file1_end=fend1,
-                        file2_start=fstart2,
-                        file2_end=fend2,
+                try:
+                    f_id1 = files.search_path_in_filetree(
+                        file_tree_lookup[sub1_id],
+                        fname1,
+                    )
+                    f_id2 = files.search_path_in_filetree(
+                        file_tree_lookup[sub2_id],
+                        fname2,
+                    )
+                except KeyError:
+                    logger.warning(
+                        'Could not find file of plagiarism match',
+                        submission1_id=sub1_id,
+                        submission2_id=sub2_id,
+                        file1=fname1,
+                        file2=fname2,
+                        exc_info=True,
                     )
+                    continue
+                matches.append((
+                    tup, {
+                        'file1_id': f_id1,
+                        'file2_id': f_id2,
+                        'file1_start': int(fstart1),
+                        'file1_end': int(fend1),
+                        'file2_start': int(fstart2),
+                        'file2_end': int(fend2),
+                    }
+                ))
+
+            if len(matches) >= batch_size:
+                insert_batch()
+
+    insert_batch()
+
+
+class CorpusCache:
+    """A persistent cache of restored submissions that can be used as input
+    for plagiarism runs.
+
+    Every submission is materialized once in a directory keyed by the id of
+    the submission and a fingerprint of its files, so a changed submission
+    gets a new directory. The files are hardlinked from the upload directory
+    where possible, so the cache barely uses any disk space.
+
+    :param base_dir: The directory where the cache is stored, this should be
+        on the same file system as the upload directory.
+    """
+
+    def __init__(self, base_dir: str) -> None:
+        self.base_dir = base_dir
+
+    @staticmethod
+    def _get_fingerprint(
+        cache: t.Mapping[t.Optional[int], t.Sequence[models.File]]
+    ) -> str:
+        digest = hashlib.sha256()
+        for children in cache.values():
+            for child in children:
+                digest.update(
+                    repr((
+                        child.id,
+                        child.parent_id,
+                        child.name,
+                        child.filename,
+                    )).encode('utf8')
                 )
-            res.append(new_case)
+        return digest.hexdigest()
+
+    @classmethod
+    def _materialize(
+        cls,
+        code: models.File,
+        out_dir: t.Optional[str],
+        cache: t.Mapping[t.Optional[int], t.Sequence[models.File]],
+    ) -> files.FileTree[int]:
+        out = None if out_dir is None else files.safe_join(out_dir, code.name)
+        if code.is_directory:
+            if out is not None:
+                os.mkdir(out)
+            return files.FileTree(
+                name=code.name,
+                id=code.id,
+                entries=[
+                    cls._materialize(child, out, cache)
+                    for child in cache[code.id]
+                ],
+            )
+        else:
+            if out is not None:
+                files.copy_stored_file(code.get_diskname(), out)
+            return files.FileTree(name=code.name, id=code.id, entries=None)
+
+    @staticmethod
+    def _remove_tree(path: str) -> None:
+        for root, dirs, filenames in os.walk(path, topdown=False):
+            for filename in filenames:
+                files.delete_stored_file(os.path.join(root, filename))
+            for dirname in dirs:
+                os.rmdir(os.path.join(root, dirname))
+        os.rmdir(path)
+
+    def get_submission_dir(
+        self,
+        work: models.Work,
+        cache: t.Mapping[t.Optional[int], t.Sequence[models.File]],
+    ) -> t.Tuple[str, files.FileTree[int]]:
+        """Get the directory containing the restored files of the given
+        submission, restoring it if it is not in the cache yet.
+
+        The returned directory should not be modified.
+
+        :param work: The submission to get.
+        :param cache: The children mapping of the submission, see
+            :meth:`.models.Work.get_file_children_mapping`.
+        :returns: The path of the directory that contains the top level
+            directory of the submission, and the tree of the submission as
+            returned by :func:`.files.restore_directory_structure`.
+        """
+        root, = cache[None]
+        work_dir = files.safe_join(self.base_dir, str(work.id))
+        path = files.safe_join(work_dir, self._get_fingerprint(cache))
+
+        if os.path.isdir(path):
+            # Mark the entry as used, so it will not be pruned.
+            os.utime(path)
+            return path, self._materialize(root, None, cache)
+
+        os.makedirs(work_dir, exist_ok=True)
+        tmp_path = files.safe_join(work_dir, f'.tmp-{uuid.uuid4()}')
+        os.mkdir(tmp_path)
+        try:
+            tree = self._materialize(root, tmp_path, cache)
+            os.rename(tmp_path, path)
+        except OSError:
+            # Another process might have restored this submission at the same
+            # time, in that case we use their version.
+            if not os.path.isdir(path):
+                raise
+            self._remove_tree(tmp_path)
+        return path, tree
+
+    def prune(self, max_age: datetime.timedelta) -> None:
+        """Remove all entries from the cache that have not been used for the
+        given amount of time.
+
+        :param max_age: Entries not used for longer than this are removed.
+        :returns: Nothing.
+        """
+        if not os.path.isdir(self.base_dir):
+            return
 
-    return res
+        min_mtime = time.time() - max_age.total_seconds()
+        for work_dir in os.scandir(self.base_dir):
+            for entry in os.scandir(work_dir.path):
+                if entry.stat().st_mtime < min_mtime:
+                    logger.info('Pruning plagiarism cache', path=entry.path)
+                    self._remove_tree(entry.path)
+            if not os.listdir(work_dir.path):
+                os.rmdir(work_dir.path)
 
 
 class PlagiarismProvider(metaclass=abc.ABCMeta):
@@ -204,6 +378,26 @@ class PlagiarismProvider(metaclass=abc.ABCMeta):
         """
         return True
 
+    @staticmethod
+    def run_program(
+        call_args: t.List[str],
+        output_callback: t.Callable[[str], bool],
+    ) -> t.Tuple[bool, str]:
+        """Run the plagiarism checker with the given call.
+
+        By default the call is executed as an external program, providers
+        implemented in Python can override this method to do the checking in
+        process.
+
+        :param call_args: The call as returned by :meth:`get_program_call`, with
+            all placeholders replaced.
+        :param output_callback: The function to call with every line of output,
+            see :func:`.helpers.call_external`.
+        :returns: A tuple indicating if the checker finished successfully and
+            its output.
+        """
+        return helpers.call_external(call_args, output_callback, nice_level=10)
+
     @staticmethod
     def transform_csv(csvfile: str) -> str:
         """Transform the csv file outputed by the plagiarism checker to
@@ -405,7 +599,7 @@ class PlagiarismProvider(metaclass=abc.ABCMeta):
 
         This list is used as the first argument to
         :func:`subprocess.check_output`, with ``shell=False``. It can contain
-        two special entries:
+        these special entries:
 
         1. ``'{ restored_dir }'``: This will be replaced with the location of
         the files that need to be checked.
@@ -413,6 +607,9 @@ class PlagiarismProvider(metaclass=abc.ABCMeta):
         2. ``'{ result_dir }'``: This will be replaced with the directory where
         the result csv needs to be placed.
 
+        3. ``'{ main_assignment_id }'``: This will be replaced with the id of
+        the assignment that is checked.
+
         This function needs to be implemented by the provider.
 
         :returns: A list as that can be used with
@@ -0,0 +1,680 @@
+"""This module implements a plagiarism provider that runs in process.
+
+The provider tokenizes the files of every submission using the lexers of
+Pygments, and selects fingerprints from the hashed k-grams of these tokens
+using winnowing (see "Winnowing: Local Algorithms for Document Fingerprinting"
+by Schleimer, Wilkerson and Aiken). Submissions are compared using an inverted
+index of these fingerprints.
+
+The fingerprints of a submission are stored in the upload directory, keyed by
+the (content addressed) directory of the plagiarism corpus cache the
+submission was restored in. The index of an assignment, together with the
+fingerprints every pair of submissions share, is stored as well. So running a
+checker again only tokenizes and compares the submissions that are new or
+changed since the previous run.
+
+SPDX-License-Identifier: AGPL-3.0-only
+"""
+import os
+import csv
+import json
+import time
+import typing as t
+import hashlib
+import argparse
+import datetime
+import itertools
+
+import structlog
+import pygments.lexers
+import pygments.token
+import pygments.util
+
+import psef.helpers
+
+from .. import app
+from .. import plagiarism as plag
+
+logger = structlog.get_logger()
+
+# Bump this version when the way fingerprints are computed changes, so old
+# stored fingerprints are not used anymore.
+_FINGERPRINT_VERSION = 1
+
+# The directory, inside the upload directory, where fingerprints are stored,
+# and the time after which unused fingerprints are removed.
+_FINGERPRINT_DIR = '.plagiarism_fingerprints'
+_FINGERPRINT_MAX_AGE = datetime.timedelta(days=30)
+
+# The amount of tokens in a single k-gram, and the amount of k-grams in a
+# window. Any match of at least ``_K + _W - 1`` tokens is guaranteed to be
+# detected.
+_K = 12
+_W = 8
+
+# Fingerprints found in more submissions than this are boilerplate, and are
+# not used to compare submissions.
+_MAX_DOCUMENTS_PER_FINGERPRINT = 50
+
+
+class _Fingerprint(t.NamedTuple):
+    hash: int
+    path: str
+    start: int
+    end: int
+
+
+def _tokenize(path: str,
+              name: str) -> t.Optional[t.List[t.Tuple[str, int]]]:
+    """Get the normalized tokens of the given file.
+
+    Identifiers and literals are replaced by their token type, so renaming
+    variables does not hide plagiarism, and comments and whitespace are
+    removed.
+
+    :param path: The path of the file on disk.
+    :param name: The name of the file, used to determine its language.
+    :returns: A list of tuples of a token and the line (starting at zero) it
+        is on, or ``None`` if the language of the file is not supported.
+    """
+    try:
+        lexer = pygments.lexers.get_lexer_for_filename(name, stripnl=False)
+    except pygments.util.ClassNotFound:
+        return None
+
+    with open(path, 'rb') as f:
+        content = f.read().decode('utf8', 'replace')
+
+    res = []
+    line = 0
+    for token_type, value in lexer.get_tokens(content):
+        if token_type in pygments.token.Comment or not value.strip():
+            pass
+        elif token_type in pygments.token.Name:
+            res.append(('N', line))
+        elif token_type in pygments.token.Literal:
+            res.append(('L', line))
+        else:
+            res.append((value.strip(), line))
+        line += value.count('\n')
+    return res
+
+
+def _winnow(tokens: t.Sequence[t.Tuple[str, int]],
+            path: str) -> t.List[_Fingerprint]:
+    """Select the fingerprints of a sequence of tokens using winnowing.
+
+    >>> toks = [(str(i % 20), i) for i in range(40)]
+    >>> prints = _winnow(toks, 'a')
+    >>> len(prints) > 0
+    True
+    >>> all(p.end - p.start == _K - 1 for p in prints)
+    True
+    >>> _winnow(toks[:_K - 1], 'a')
+    []
+
+    :param tokens: The tokens of a file, as returned by :func:`_tokenize`.
+    :param path: The path of the file, relative to the submission.
+    :returns: The selected fingerprints.
+    """
+    hashes = []
+    for i in range(len(tokens) - _K + 1):
+        gram = '\0'.join(tok for tok, _ in tokens[i:i + _K])
+        hashes.append(
+            int.from_bytes(
+                hashlib.blake2b(gram.encode('utf8'), digest_size=8).digest(),
+                'little',
+            )
+        )
+
+    res: t.List[_Fingerprint] = []
+    last_selected = -1
+    for start in range(max(len(hashes) - _W + 1, min(len(hashes), 1))):
+        window = hashes[start:start + _W]
+        # Select the rightmost minimal hash in the window.
+        idx = start + max(
+            range(len(window)), key=lambda i: (-window[i], i)
+        )
+        if idx != last_selected:
+            last_selected = idx
+            res.append(
+                _Fingerprint(
+                    hash=hashes[idx],
+                    path=path,
+                    start=tokens[idx][1],
+                    end=tokens[idx + _K - 1][1],
+                )
+            )
+    return res
+
+
+def _fingerprint_dir(
+    sub_dir: str,
+    suffixes: t.Optional[t.Sequence[str]],
+) -> t.List[_Fingerprint]:
+    res = []
+    for root, _, filenames in os.walk(sub_dir, followlinks=True):
+        for filename in sorted(filenames):
+            if suffixes and not filename.endswith(tuple(suffixes)):
+                continue
+            path = os.path.join(root, filename)
+            tokens = _tokenize(path, filename)
+            if tokens is not None:
+                res.extend(_winnow(tokens, os.path.relpath(path, sub_dir)))
+    return res
+
+
+def _get_fingerprints(
+    sub_dir: str,
+    suffixes: t.Optional[t.Sequence[str]],
+) -> t.List[_Fingerprint]:
+    """Get the fingerprints of a submission, from the store if possible.
+
+    Only submissions that are linked from the plagiarism corpus cache are
+    stored, as the path of these submissions changes when their content
+    changes.
+
+    :param sub_dir: The directory of the submission.
+    :param suffixes: Only files ending with one of these suffixes are checked.
+    :returns: The fingerprints of the submission.
+    """
+    if not os.path.islink(sub_dir):
+        return _fingerprint_dir(sub_dir, suffixes)
+
+    key = hashlib.sha256(
+        json.dumps([
+            _FINGERPRINT_VERSION,
+            _K,
+            _W,
+            os.path.realpath(sub_dir),
+            suffixes,
+        ]).encode('utf8')
+    ).hexdigest()
+    store_path = psef.files.safe_join(
+        app.config['UPLOAD_DIR'], _FINGERPRINT_DIR, f'{key}.json'
+    )
+
+    try:
+        with open(store_path, 'r') as f:
+            res = [_Fingerprint(*item) for item in json.load(f)]
+    except (FileNotFoundError, ValueError):
+        pass
+    else:
+        os.utime(store_path)
+        return res
+
+    res = _fingerprint_dir(sub_dir, suffixes)
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    tmp_path = f'{store_path}.{os.getpid()}'
+    with open(tmp_path, 'w') as f:
+        json.dump(res, f)
+    os.replace(tmp_path, store_path)
+    return res
+
+
+def _get_index_path(
+    index_name: str,
+    suffixes: t.Optional[t.Sequence[str]],
+    ignored: t.AbstractSet[int],
+) -> str:
+    key = hashlib.sha256(
+        json.dumps([
+            _FINGERPRINT_VERSION,
+            _K,
+            _W,
+            _MAX_DOCUMENTS_PER_FINGERPRINT,
+            index_name,
+            suffixes,
+            sorted(ignored),
+        ]).encode('utf8')
+    ).hexdigest()
+    return psef.files.safe_join(
+        app.config['UPLOAD_DIR'], _FINGERPRINT_DIR, f'index-{key}.json'
+    )
+
+
+def _prune_fingerprints() -> None:
+    store_dir = psef.files.safe_join(
+        app.config['UPLOAD_DIR'], _FINGERPRINT_DIR
+    )
+    if not os.path.isdir(store_dir):
+        return
+
+    min_mtime = time.time() - _FINGERPRINT_MAX_AGE.total_seconds()
+    for entry in os.scandir(store_dir):
+        if entry.stat().st_mtime < min_mtime:
+            os.unlink(entry.path)
+
+
+class _Index:
+    """An inverted index of the fingerprints of submissions, that also keeps
+    track of the fingerprints every pair of submissions share.
+
+    Submissions are identified by a string key. Changes made with :meth:`add`
+    and :meth:`remove` are only applied to the shared fingerprints by
+    :meth:`commit`, which only looks at the fingerprints of the changed
+    submissions. Fingerprints found in more than
+    ``_MAX_DOCUMENTS_PER_FINGERPRINT`` submissions are not shared by any pair.
+
+    >>> index = _Index()
+    >>> index.add('a', {1, 2, 3})
+    >>> index.add('b', {2, 3, 4})
+    >>> index.commit()
+    >>> index.shared
+    {('a', 'b'): {2, 3}}
+    >>> index.remove({'a'})
+    >>> index.add('c', {1, 4})
+    >>> index.commit()
+    >>> index.shared
+    {('b', 'c'): {4}}
+    >>> index.get_amounts()
+    {'b': 3, 'c': 2}
+    """
+
+    def __init__(self) -> None:
+        self.docs: t.Dict[str, int] = {}
+        self.index: t.Dict[int, t.Set[str]] = {}
+        self.shared: t.Dict[t.Tuple[str, str], t.Set[int]] = {}
+        self._changed: t.Dict[int, t.FrozenSet[str]] = {}
+
+    def _mark_changed(self, fhash: int) -> None:
+        if fhash not in self._changed:
+            self._changed[fhash] = frozenset(self.index.get(fhash, ()))
+
+    def add(self, key: str, hashes: t.Set[int]) -> None:
+        """Add a submission to the index.
+
+        :param key: The key of the submission.
+        :param hashes: The hashes of the fingerprints of the submission.
+        :returns: Nothing.
+        """
+        self.docs[key] = len(hashes)
+        for fhash in hashes:
+            self._mark_changed(fhash)
+            self.index.setdefault(fhash, set()).add(key)
+
+    def remove(self, keys: t.Set[str]) -> None:
+        """Remove the given submissions from the index.
+
+        :param keys: The keys of the submissions to remove.
+        :returns: Nothing.
+        """
+        if not keys:
+            return
+        for key in keys:
+            del self.docs[key]
+        for fhash, found in self.index.items():
+            if not found.isdisjoint(keys):
+                self._mark_changed(fhash)
+                found -= keys
+
+    @staticmethod
+    def _get_pairs(keys: t.AbstractSet[str]) -> t.Set[t.Tuple[str, str]]:
+        if len(keys) > _MAX_DOCUMENTS_PER_FINGERPRINT:
+            return set()
+        return set(itertools.combinations(sorted(keys), 2))
+
+    def commit(self) -> None:
+        """Update the shared fingerprints of all pairs for the changes done
+        since the last commit.
+
+        :returns: Nothing.
+        """
+        for fhash, old in self._changed.items():
+            new = self.index.get(fhash, set())
+            old_pairs = self._get_pairs(old)
+            new_pairs = self._get_pairs(new)
+            for pair in old_pairs - new_pairs:
+                found = self.shared[pair]
+                found.discard(fhash)
+                if not found:
+                    del self.shared[pair]
+            for pair in new_pairs - old_pairs:
+                self.shared.setdefault(pair, set()).add(fhash)
+            if not new:
+                self.index.pop(fhash, None)
+        self._changed.clear()
+
+    def get_amounts(self) -> t.Dict[str, int]:
+        """Get the amount of fingerprints of every submission that are not
+        boilerplate.
+
+        :returns: A mapping from submission key to amount of fingerprints.
+        """
+        res = dict(self.docs)
+        for found in self.index.values():
+            if len(found) > _MAX_DOCUMENTS_PER_FINGERPRINT:
+                for key in found:
+                    res[key] -= 1
+        return res
+
+    @classmethod
+    def load(cls, path: str) -> '_Index':
+        """Load an index stored with :meth:`store`.
+
+        :param path: The path of the stored index.
+        :returns: The stored index, or an empty index if it could not be read.
+        """
+        res = cls()
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return res
+
+        keys = [key for key, _ in data['docs']]
+        res.docs = {key: amount for key, amount in data['docs']}
+        res.index = {
+            fhash: set(keys[i] for i in found)
+            for fhash, found in data['index']
+        }
+        res.shared = {
+            (keys[i], keys[j]): set(hashes)
+            for i, j, hashes in data['shared']
+        }
+        return res
+
+    def store(self, path: str) -> None:
+        """Store this index, after committing it.
+
+        :param path: The path to store the index at.
+        :returns: Nothing.
+        """
+        self.commit()
+        keys = {key: i for i, key in enumerate(self.docs)}
+        data = {
+            'docs': list(self.docs.items()),
+            'index': [
+                (fhash, [keys[key] for key in found])
+                for fhash, found in self.index.items()
+            ],
+            'shared': [
+                (keys[key1], keys[key2], list(hashes))
+                for (key1, key2), hashes in self.shared.items()
+            ],
+        }
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}'
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+
+def _merge_matches(
+    pairs: t.Iterable[t.Tuple[_Fingerprint, _Fingerprint]]
+) -> t.List[t.Tuple[str, int, int, str, int, int]]:
+    """Merge matching fingerprints into matching regions of files.
+
+    >>> F = _Fingerprint
+    >>> _merge_matches([
+    ...     (F(1, 'a', 0, 3), F(1, 'b', 5, 8)),
+    ...     (F(2, 'a', 2, 6), F(2, 'b', 7, 11)),
+    ...     (F(3, 'a', 20, 22), F(3, 'b', 0, 2)),
+    ... ])
+    [('a', 0, 6, 'b', 5, 11), ('a', 20, 22, 'b', 0, 2)]
+    """
+    res: t.List[t.List[t.Any]] = []
+    for f1, f2 in sorted(
+        pairs, key=lambda p: (p[0].path, p[1].path, p[0].start, p[1].start)
+    ):
+        if res:
+            last = res[-1]
+            if (
+                last[0] == f1.path and last[3] == f2.path and
+                f1.start <= last[2] + 1 and f2.start <= last[5] + 1 and
+                f2.end >= last[4] - 1
+            ):
+                last[2] = max(last[2], f1.end)
+                last[4] = min(last[4], f2.start)
+                last[5] = max(last[5], f2.end)
+                continue
+        res.append([f1.path, f1.start, f1.end, f2.path, f2.start, f2.end])
+    return [(r[0], r[1], r[2], r[3], r[4], r[5]) for r in res]
+
+
+class Winnow(plag.PlagiarismProvider):
+    """This class implements the in process winnowing plagiarism provider.
+    """
+
+    def __init__(self) -> None:
+        self.suffixes: t.Optional[str] = None
+        self.simil: int = 50
+        self.has_base_code: bool = False
+
+    @property
+    def matches_output(self) -> str:
+        """The path were the result csv is placed.
+
+        :returns: The specified path
+        """
+        return 'matches.csv'
+
+    @staticmethod
+    def supports_progress() -> bool:
+        return True
+
+    @staticmethod
+    def get_progress_from_line(prefix: str,
+                               line: str) -> t.Optional[t.Tuple[int, int]]:
+        line = line.rstrip()
+        if not line.startswith(prefix):
+            return None
+        current, total = line[len(prefix) + 1:].split('/')
+        return int(current.strip()), int(total.strip())
+
+    @staticmethod
+    def get_options() -> t.Sequence[plag.Option]:
+        """Get all possible options for this provider.
+
+        :returns: The possible options.
+        """
+        return [
+            plag.Option(
+                "suffixes",
+                "Suffixes to include",
+                (
+                    "A comma separated list of suffixes. A file is only parsed"
+                    " if it ends with one of the given suffixes exactly, no"
+                    " regex is supported. If this value is left empty all"
+                    " files in a known programming language are parsed."
+                ),
+                plag.OptionTypes.strvalue,
+                False,
+                None,
+                placeholder='.xxx, .yyy',
+            ),
+            plag.Option(
+                "simil",
+                "Minimal similarity",
+                (
+                    "The minimal average similarity needed before a pair is "
+                    "considered plagiarism. If this is set to 100 both "
+                    "assignments need to be completely the same, when set to"
+                    " 50 both submissions need to be 50% the same, or one 25%"
+                    " and the other 75%. The default is 50."
+                ),
+                plag.OptionTypes.numbervalue,
+                False,
+                None,
+                placeholder='default: 50',
+            ),
+        ]
+
+    def _set_provider_values(
+        self, values: t.Dict[str, psef.helpers.JSONType]
+    ) -> None:
+        """Set the options for this provider.
+
+        :param values: The values to be set.
+        :returns: Nothing.
+        """
+        self.has_base_code = bool(values['has_base_code'])
+
+        if 'suffixes' in values:
+            self.suffixes = str(values['suffixes'])
+        if 'simil' in values:
+            assert isinstance(values['simil'], (int, float))
+            self.simil = int(values['simil'])
+
+    def get_program_call(self) -> t.List[str]:
+        """Get the arguments for :meth:`run_program`.
+
+        :returns: A list of arguments that can be passed to
+            :meth:`run_program` after the placeholders are replaced.
+        """
+        res = [
+            '{ restored_dir }',
+            '--result-dir', '{ result_dir }',
+            '--archive-dir', '{ archive_dir }',
+            '--progress', '{ progress_prefix }',
+            '--simil', str(self.simil),
+            '--index-name', '{ main_assignment_id }',
+        ]  # yapf: disable
+        if self.has_base_code:
+            res.extend(['--base-code-dir', '{ base_code_dir }'])
+        if self.suffixes:
+            res.extend(['--suffixes', self.suffixes])
+        return res
+
+    @classmethod
+    def run_program(
+        cls,
+        call_args: t.List[str],
+        output_callback: t.Callable[[str], bool],
+    ) -> t.Tuple[bool, str]:
+        output: t.List[str] = []
+
+        def emit(line: str) -> None:
+            if not output_callback(line):
+                output.append(line)
+
+        try:
+            cls._run(call_args, emit)
+        # pylint: disable=broad-except
+        except Exception:  # pragma: no cover
+            logger.error('Plagiarism check crashed', exc_info=True)
+            emit('The plagiarism check crashed.')
+            return False, '\n'.join(output)
+        return True, '\n'.join(output)
+
+    @staticmethod
+    def _run(call_args: t.List[str], emit: t.Callable[[str], None]) -> None:
+        parser = argparse.ArgumentParser()
+        parser.add_argument('restored_dir')
+        parser.add_argument('--result-dir', required=True)
+        parser.add_argument('--archive-dir', required=True)
+        parser.add_argument('--progress', required=True)
+        parser.add_argument('--simil', type=float, required=True)
+        parser.add_argument('--base-code-dir', default=None)
+        parser.add_argument('--suffixes', default=None)
+        parser.add_argument('--index-name', default=None)
+        args = parser.parse_args(call_args)
+
+        suffixes = None
+        if args.suffixes:
+            suffixes = [s.strip() for s in args.suffixes.split(',')]
+            suffixes = [s for s in suffixes if s]
+
+        main_subs = sorted(os.listdir(args.restored_dir))
+        old_subs = sorted(os.listdir(args.archive_dir))
+        subs = [
+            *((s, os.path.join(args.restored_dir, s)) for s in main_subs),
+            *((s, os.path.join(args.archive_dir, s)) for s in old_subs),
+        ]
+
+        ignored: t.Set[int] = set()
+        if args.base_code_dir:
+            ignored.update(
+                f.hash
+                for f in _fingerprint_dir(args.base_code_dir, suffixes)
+            )
+
+        # The index is stored per assignment, and only contains the
+        # submissions of the last run. Submissions that are not in the corpus
+        # cache might change without changing their path, so they are removed
+        # from the index before it is stored.
+        index_path = None
+        index = _Index()
+        if args.index_name is not None:
+            index_path = _get_index_path(args.index_name, suffixes, ignored)
+            index = _Index.load(index_path)
+
+        keys: t.List[str] = []
+        key_to_idx: t.Dict[str, int] = {}
+        volatile_keys: t.Set[str] = set()
+        for _, sub_dir in subs:
+            key = os.path.realpath(sub_dir)
+            if not os.path.islink(sub_dir) or key in key_to_idx:
+                key = f'{sub_dir}\0volatile'
+                volatile_keys.add(key)
+            key_to_idx[key] = len(keys)
+            keys.append(key)
+        index.remove(set(index.docs) - set(keys))
+
+        # The first fingerprint of every hash of the submissions we needed to
+        # fingerprint.
+        firsts: t.Dict[str, t.Dict[int, _Fingerprint]] = {}
+
+        def get_firsts(idx: int) -> t.Dict[int, _Fingerprint]:
+            key = keys[idx]
+            if key not in firsts:
+                res: t.Dict[int, _Fingerprint] = {}
+                for fprint in _get_fingerprints(subs[idx][1], suffixes):
+                    if fprint.hash not in ignored:
+                        res.setdefault(fprint.hash, fprint)
+                firsts[key] = res
+            return firsts[key]
+
+        for idx, key in enumerate(keys):
+            if key not in index.docs:
+                index.add(key, set(get_firsts(idx)))
+            emit(f'{args.progress} {idx + 1} / {len(subs)}')
+        index.commit()
+        emit(f'Parsed {len(subs)} submissions.')
+
+        # Only pairs with a submission of the main assignment are interesting.
+        shared = sorted(
+            (min(idx1, idx2), max(idx1, idx2), hashes)
+            for idx1, idx2, hashes in (
+                (key_to_idx[key1], key_to_idx[key2], hashes)
+                for (key1, key2), hashes in index.shared.items()
+            ) if min(idx1, idx2) < len(main_subs)
+        )
+        amounts = index.get_amounts()
+        amount_prints = [amounts[key] for key in keys]
+
+        amount_cases = 0
+        csv_path = os.path.join(args.result_dir, 'matches.csv')
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f, delimiter=';')
+            last_idx1 = -1
+            for idx1, idx2, hashes in shared:
+                if idx1 != last_idx1:
+                    last_idx1 = idx1
+                    emit(f'{args.progress} {idx1} / {len(main_subs)}')
+                match1 = 100 * len(hashes) / amount_prints[idx1]
+                match2 = 100 * len(hashes) / amount_prints[idx2]
+                if (match1 + match2) / 2 < args.simil:
+                    continue
+
+                amount_cases += 1
+                firsts1 = get_firsts(idx1)
+                firsts2 = get_firsts(idx2)
+                matches = _merge_matches(
+                    (firsts1[h], firsts2[h]) for h in hashes
+                )
+                writer.writerow([
+                    subs[idx1][0],
+                    subs[idx2][0],
+                    round(match1, 2),
+                    round(match2, 2),
+                    *(item for match in matches for item in match),
+                ])
+        emit(f'{args.progress} {len(main_subs)} / {len(main_subs)}')
+
+        emit(f'Found {amount_cases} cases of possible plagiarism.')
+
+        if index_path is not None:
+            index.remove(volatile_keys)
+            index.store(index_path)
+        _prune_fingerprints()
@@ -37,6 +37,16 @@ logger = structlog.get_logger()
 
 celery = cg_celery.CGCelery('psef', signals)  # pylint: disable=invalid-name
 
+# The directory, inside the upload directory, where restored submissions are
+# cached for plagiarism runs, and the time after which unused entries of this
+# cache are removed.
+_PLAGIARISM_CORPUS_DIR = '.plagiarism_corpus'
+_PLAGIARISM_CORPUS_MAX_AGE = datetime.timedelta(days=30)
+
+
+# The interval in which the periodic task that does batch runs is executed.
+_BATCH_RUN_INTERVAL_MINUTES = 15
+
 
 def init_app(app: Flask) -> None:
     """Setup the tasks for psef.
@@ -50,7 +60,7 @@ def init_app(app: Flask) -> None:
         # We cannot really test that we setup these periodic tasks yet.
         logger.info('Setting up periodic tasks')
         celery.add_periodic_task(
-            crontab(minute='*/15'),
+            crontab(minute=f'*/{_BATCH_RUN_INTERVAL_MINUTES}'),
             _run_autotest_batch_runs_1.si(),
         )
         # These times are in UTC
@@ -62,6 +72,10 @@ def init_app(app: Flask) -> None:
             crontab(minute='0', hour='18', day_of_month='5'),
             _send_weekly_notifications.si(),
         )
+        celery.add_periodic_task(
+            crontab(minute='30', hour='3'),
+            _prune_lint_cache_1.si(),
+        )
 
 
 @celery.task
@@ -76,6 +90,11 @@ def _lint_instances_1(
     ).run(linter_instance_ids)
 
 
+@celery.task
+def _prune_lint_cache_1() -> None:
+    p.linters.prune_lint_cache()
+
+
 @celery.task
 def _send_reminder_mails_1(assignment_id: int) -> None:
     assig = p.models.Assignment.query.get(assignment_id)
@@ -185,6 +204,9 @@ def _run_plagiarism_control_1(  # pylint: disable=too-many-branches,too-many-sta
             call_args[call_args.index('{ base_code_dir }')] = base_code_dir
         if supports_progress:
             call_args[call_args.index('{ progress_prefix }')] = progress_prefix
+        if '{ main_assignment_id }' in call_args:
+            call_args[call_args.index('{ main_assignment_id }')
+                      ] = str(main_assignment_id)
 
         file_lookup_tree: t.Dict[int, p.files.FileTree[int]] = {}
         submission_lookup: t.Dict[str, int] = {}
@@ -204,7 +226,17 @@ def _run_plagiarism_control_1(  # pylint: disable=too-many-branches,too-many-sta
                 plagiarism_run.submissions_total = len(chained[-1])
                 p.models.db.session.commit()
 
-        for sub in itertools.chain.from_iterable(chained):
+        all_subs = list(itertools.chain.from_iterable(chained))
+        children_mappings = p.models.Work.get_file_children_mappings(
+            all_subs, p.models.FileOwner.teacher
+        )
+        corpus = p.plagiarism.CorpusCache(
+            p.files.safe_join(
+                p.app.config['UPLOAD_DIR'], _PLAGIARISM_CORPUS_DIR
+            )
+        )
+
+        for sub in all_subs:
             main_assig = sub.assignment_id == main_assignment_id
 
             dir_name = (
@@ -219,8 +251,12 @@ def _run_plagiarism_control_1(  # pylint: disable=too-many-branches,too-many-sta
                 if archival_arg_present:
                     parent = os.path.join(archive_dir, dir_name)
 
-            os.mkdir(parent)
-            part_tree = p.files.restore_directory_structure(sub, parent)
+            # Only the submissions that are new or changed since the last run
+            # are restored, the others are linked from the cache.
+            cached_dir, part_tree = corpus.get_submission_dir(
+                sub, children_mappings[sub.id]
+            )
+            os.symlink(cached_dir, parent, target_is_directory=True)
             file_lookup_tree[sub.id] = p.files.FileTree(
                 name=dir_name,
                 id=-1,
@@ -257,8 +293,8 @@ def _run_plagiarism_control_1(  # pylint: disable=too-many-branches,too-many-sta
             return False
 
         try:
-            ok, stdout = p.helpers.call_external(
-                call_args, got_output, nice_level=10
+            ok, stdout = plagiarism_run.plagiarism_cls.run_program(
+                call_args, got_output
             )
         # pylint: disable=broad-except
         except Exception:  # pragma: no cover
@@ -277,15 +313,20 @@ def _run_plagiarism_control_1(  # pylint: disable=too-many-branches,too-many-sta
             csv_file = os.path.join(result_dir, csv_location)
             csv_file = plagiarism_run.plagiarism_cls.transform_csv(csv_file)
 
-            for case in p.plagiarism.process_output_csv(
-                submission_lookup, old_subs, file_lookup_tree, csv_file
-            ):
-                plagiarism_run.cases.append(case)
+            p.plagiarism.process_output_csv(
+                plagiarism_run,
+                submission_lookup,
+                old_subs,
+                file_lookup_tree,
+                csv_file,
+            )
             set_state(p.models.PlagiarismState.done)
         else:
             set_state(p.models.PlagiarismState.crashed)
         p.models.db.session.commit()
 
+        corpus.prune(_PLAGIARISM_CORPUS_MAX_AGE)
+
 
 @celery.task
 def _run_autotest_batch_runs_1() -> None:
@@ -310,6 +351,29 @@ def _run_autotest_batch_runs_1() -> None:
 
     p.models.db.session.commit()
 
+    # Start runners for batch runs that will happen soon, so they are ready
+    # when the deadline passes instead of being started after it. The runners
+    # should be started ``AUTO_TEST_RUNNER_PREWARM_TIME`` before the deadline,
+    # which might be before the next time this task is executed.
+    prewarm_time = datetime.timedelta(
+        seconds=p.app.config['AUTO_TEST_RUNNER_PREWARM_TIME']
+    )
+    next_execution = now + datetime.timedelta(
+        minutes=_BATCH_RUN_INTERVAL_MINUTES
+    )
+    upcoming_runs = p.models.AutoTestRun.query.join(
+        p.models.AutoTestRun.auto_test
+    ).join(p.models.Assignment).filter(
+        t.cast(DbColumn[bool], p.models.AutoTestRun.batch_run_done).is_(False),
+        p.models.Assignment.deadline >= now,
+        p.models.Assignment.deadline < next_execution + prewarm_time,
+    ).with_entities(p.models.AutoTestRun.id, p.models.Assignment.deadline)
+
+    for run_id, deadline in upcoming_runs:
+        prewarm_at = max(now, deadline - prewarm_time)
+        logger.info('Prewarming runners', run_id=run_id, at=prewarm_at)
+        adjust_amount_runners_at((run_id, ), eta=prewarm_at)
+
 
 @celery.task(
     autoretry_for=(RequestException, ),
@@ -792,6 +856,7 @@ def _send_email_as_user_1(
 
 
 lint_instances = _lint_instances_1.delay  # pylint: disable=invalid-name
+prune_lint_cache = _prune_lint_cache_1.delay  # pylint: disable=invalid-name
 add = _add_1.delay  # pylint: disable=invalid-name
 send_done_mail = _send_done_mail_1.delay  # pylint: disable=invalid-name
 send_grader_status_mail = _send_grader_status_mail_1.delay  # pylint: disable=invalid-name
@@ -812,6 +877,11 @@ send_reminder_mails: t.Callable[
      NamedArg(t.Optional[DatetimeWithTimezone], 'eta')], t.
     Any] = _send_reminder_mails_1.apply_async  # pylint: disable=invalid-name
 
+adjust_amount_runners_at: t.Callable[
+    [t.Tuple[int],
+     DefaultNamedArg(t.Optional[DatetimeWithTimezone], 'eta')], t.
+    Any] = _adjust_amount_runners_1.apply_async  # pylint: disable=invalid-name
+
 check_heartbeat_auto_test_run: t.Callable[
     [t.Tuple[str],
      DefaultNamedArg(t.Optional[DatetimeWithTimezone], 'eta')], t.
@@ -15,7 +15,7 @@ from collections import defaultdict
 import werkzeug
 import structlog
 import sqlalchemy.sql as sql
-from flask import request
+from flask import Response, request
 from sqlalchemy.orm import joinedload, selectinload
 
 import psef
@@ -25,9 +25,10 @@ from psef import current_user
 from cg_dt_utils import DatetimeWithTimezone
 from psef.models import db
 from psef.helpers import (
-    MISSING, JSONType, JSONResponse, EmptyResponse, ExtendedJSONResponse,
-    jsonify, add_warning, ensure_json_dict, extended_jsonify,
-    ensure_keys_in_dict, make_empty_response, get_from_map_transaction
+    MISSING, JSONType, JSONResponse, EmptyResponse, StreamedJSONResponse,
+    ExtendedJSONResponse, jsonify, add_warning, ensure_json_dict,
+    extended_jsonify, ensure_keys_in_dict, make_empty_response,
+    get_from_map_transaction
 )
 from psef.exceptions import APICodes, APIWarnings, APIException
 
@@ -40,6 +41,37 @@ from ..permissions import CoursePermission as CPerm
 
 logger = structlog.get_logger()
 
+# The amount of rows loaded at once for responses that are streamed.
+_STREAM_BATCH_SIZE = 250
+
+
+def _get_works_in_batches(
+    query: models.MyQuery[models.Work],
+    update_query: t.Callable[[models.MyQuery[models.Work]], models.
+                             MyQuery[models.Work]] = lambda query: query,
+) -> t.Iterator[t.List[models.Work]]:
+    """Load the works of the given query in batches.
+
+    The ids of the works are loaded first, after which the works themselves
+    are loaded per batch of ids. Unlike ``yield_per`` this doesn't keep a
+    cursor open between the batches.
+
+    :param query: The query of the works to load, its ordering is preserved.
+    :param update_query: Function to add options to the query for a batch,
+        for example to load relations eagerly.
+    :returns: An iterator producing batches of at most
+        ``_STREAM_BATCH_SIZE`` works.
+    """
+    work_ids = [work_id for work_id, in query.with_entities(models.Work.id)]
+    for batch_ids in helpers.chunkify(work_ids, _STREAM_BATCH_SIZE):
+        works = update_query(
+            models.Work.query.filter(
+                t.cast(models.DbColumn[int], models.Work.id).in_(batch_ids)
+            )
+        )
+        works_by_id = {work.id: work for work in works}
+        yield [works_by_id[work_id] for work_id in batch_ids]
+
 
 @api.route('/assignments/', methods=['GET'])
 @auth.login_required
@@ -184,24 +216,30 @@ def get_assignments_feedback(assignment_id: int) -> JSONResponse[
             latest_subs, current_user
         )
 
-    res = {}
-    for sub in latest_subs:
-        perms = auth.WorkPermissions(sub)
-        item: t.MutableMapping[str, t.Union[str, t.Sequence[str]]] = {
-            'general': '',
-            'linter': [],
-            'user': list(sub.get_user_feedback()),
-        }
-
-        if perms.ensure_may_see_general_feedback.as_bool():
-            item['general'] = sub.comment or ''
-
-        if perms.ensure_may_see_linter_feedback.as_bool():
-            item['linter'] = list(sub.get_linter_feedback())
+    perms = auth.AssignmentFeedbackPermissions(assignment)
 
-        res[str(sub.id)] = item
-
-    return jsonify(res)
+    def get_feedback(subs: t.List[models.Work]
+                     ) -> t.Iterable[t.Tuple[str, t.Mapping[str, t.Any]]]:
+        user_feedback, linter_feedback = models.Work.get_feedback_of_works(
+            subs,
+            may_see_reply=perms.may_see_reply,
+            may_see_linter_feedback=perms.may_see_linter_feedback,
+        )
+        for sub in subs:
+            item: t.Mapping[str, t.Union[str, t.Sequence[str]]] = {
+                'general': (
+                    (sub.comment or '')
+                    if perms.may_see_general_feedback(sub) else ''
+                ),
+                'linter': linter_feedback.get(sub.id, []),
+                'user': user_feedback.get(sub.id, []),
+            }
+            yield str(sub.id), item
+
+    return StreamedJSONResponse.make_object(
+        item for subs in _get_works_in_batches(latest_subs)
+        for item in get_feedback(subs)
+    )
 
 
 def set_reminder(
@@ -1245,7 +1283,7 @@ def get_all_works_by_user_for_assignment(
 @api.route('/assignments/<int:assignment_id>/submissions/', methods=['GET'])
 def get_all_works_for_assignment(
     assignment_id: int
-) -> t.Union[JSONResponse[WorkList], ExtendedJSONResponse[WorkList]]:
+) -> StreamedJSONResponse[WorkList]:
     """Return all :class:`.models.Work` objects for the given
     :class:`.models.Assignment`.
 
@@ -1288,22 +1326,91 @@ def get_all_works_for_assignment(
             assignment_id=assignment_id, deleted=False
         )
 
-    obj = models.Work.update_query_for_extended_jsonify(obj).order_by(
-        t.cast(t.Any, models.Work.created_at).desc()
-    )
+    obj = obj.order_by(t.cast(t.Any, models.Work.created_at).desc())
 
     if not current_user.has_permission(
         CPerm.can_see_others_work, course_id=assignment.course_id
     ):
         obj = models.Work.limit_to_user_submissions(obj, current_user)
 
-    if helpers.extended_requested():
-        return extended_jsonify(
-            obj.all(),
-            use_extended=models.Work,
+    # Load and serialize the submissions in batches, so we never have all of
+    # them in memory at the same time.
+    return StreamedJSONResponse.make_array(
+        (
+            work for works in _get_works_in_batches(
+                obj, models.Work.update_query_for_extended_jsonify
+            ) for work in works
+        ),
+        use_extended=models.Work if helpers.extended_requested() else None,
+    )
+
+
+@api.route(
+    '/assignments/<int:assignment_id>/submissions/zip', methods=['GET']
+)
+@auth.login_required
+def export_latest_submissions(
+    assignment_id: int
+) -> werkzeug.wrappers.Response:
+    """Download the latest submissions of all students as a single zip file.
+
+    .. :quickref: Assignment; Download all latest submissions as a zip.
+
+    The archive is streamed directly to the client while it is being built.
+    Every submission is placed in its own directory, named after its author
+    and the id of the submission.
+
+    :param int assignment_id: The id of the assignment.
+    :query str owner: The type of files to include, see
+        :meth:`.models.File.get_exclude_owner`.
+    :returns: A response with the zip archive as content.
+
+    :raises PermissionException: If there is no logged in user. (NOT_LOGGED_IN)
+    :raises PermissionException: If the user cannot see the work of others or
+        the teacher revision was requested and the user cannot edit the work
+        of others. (INCORRECT_PERMISSION)
+    """
+    assignment = helpers.get_or_404(
+        models.Assignment,
+        assignment_id,
+        also_error=lambda a: not a.is_visible
+    )
+
+    auth.ensure_permission(CPerm.can_see_others_work, assignment.course_id)
+    if assignment.is_hidden:
+        auth.ensure_permission(
+            CPerm.can_see_hidden_assignments, assignment.course_id
         )
-    else:
-        return jsonify(obj.all())
+
+    exclude_owner = models.File.get_exclude_owner(
+        request.args.get('owner'), assignment.course_id
+    )
+    if exclude_owner == models.FileOwner.student:
+        auth.ensure_permission(
+            CPerm.can_edit_others_work, assignment.course_id
+        )
+
+    works = assignment.get_all_latest_submissions().options(
+        joinedload(models.Work.user)
+    ).order_by(models.Work.id).all()
+    caches = models.Work.get_file_children_mappings(works, exclude_owner)
+
+    trees = []
+    for work in works:
+        cache = caches[work.id]
+        for root in cache[None]:
+            dirname = f'{work.user.get_readable_name()} - {work.id}'
+            trees.append((f'{dirname.replace("/", "_")}/', root, cache))
+
+    output_name = f'{assignment.name}-submissions.zip'.replace('/', '_')
+    res = Response(
+        psef.files.stream_zip_of_trees(trees), mimetype='application/zip'
+    )
+    res.headers['Content-Disposition'] = (
+        "attachment; filename*=UTF-8''" +
+        werkzeug.urls.url_quote(output_name, safe='')
+    )
+    return res
 
 
 @api.route("/assignments/<int:assignment_id>/submissions/", methods=['POST'])
@@ -1581,12 +1688,22 @@ def start_linting(assignment_id: int) -> JSONResponse[models.AssignmentLinter]:
 
     if linter_cls.RUN_LINTER:
 
+        # Every task lints its instances in batches concurrently, so give each
+        # task enough instances to fill all its batches.
+        chunk_size = 10
+        if linter_cls.SUPPORTS_BATCHES:
+            chunk_size = max(
+                chunk_size,
+                current_app.config['LINTER_BATCH_SIZE'] *
+                current_app.config['LINTER_MAX_CONCURRENT_BATCHES'],
+            )
+
         def start_running_linter() -> None:
-            for i in range(0, len(res.tests), 10):
+            for i in range(0, len(res.tests), chunk_size):
                 tasks.lint_instances(
                     name,
                     cfg,
-                    [t.id for t in res.tests[i:i + 10]],
+                    [t.id for t in res.tests[i:i + chunk_size]],
                 )
 
         helpers.callback_after_this_request(start_running_linter)
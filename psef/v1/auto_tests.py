@@ -96,6 +96,7 @@ def _update_auto_test(
             new_file_name, filename = files.random_file_path()
             assert new_fixture.filename is not None
             new_fixture.save(new_file_name)
+            files.deduplicate_file(new_file_name)
             auto_test.fixtures.append(
                 models.AutoTestFixture(
                     name=files.escape_logical_filename(new_fixture.filename),
@@ -457,6 +458,8 @@ def update_or_create_auto_test_suite(auto_test_id: int, auto_test_set_id: int
     :>json command_time_limit: The maximum amount of time a single command may
         take in this suite. If not given the site default will be used
         (OPTIONAL).
+    :>json cpu_cores: The amount of cpu cores that should be reserved while
+        running this suite (OPTIONAL).
 
     :param auto_test_id: The id of the :class:`.models.AutoTest` in which this
         suite should be created.
@@ -478,6 +481,7 @@ def update_or_create_auto_test_suite(auto_test_id: int, auto_test_set_id: int
         submission_info = opt('submission_info', bool, False)
         suite_id = opt('id', int, None)
         time_limit = opt('command_time_limit', (float, int), None)
+        cpu_cores = opt('cpu_cores', int, None)
 
     if suite_id is None:
         # Make sure the time_limit is always set when creating a new suite
@@ -497,6 +501,18 @@ def update_or_create_auto_test_suite(auto_test_id: int, auto_test_set_id: int
             )
         suite.command_time_limit = time_limit
 
+    if cpu_cores is not None:
+        max_cores = app.config['AUTO_TEST_MAX_CORES_PER_SUITE']
+        if not 1 <= cpu_cores <= max_cores:
+            raise APIException(
+                (
+                    'The amount of cpu cores should be between 1 and'
+                    f' {max_cores}'
+                ), f'The given amount of cpu cores ({cpu_cores}) is invalid',
+                APICodes.INVALID_PARAM, 400
+            )
+        suite.cpu_cores = cpu_cores
+
     suite.network_disabled = network_disabled
 
     suite.submission_info = submission_info
@@ -300,8 +300,9 @@ def delete_code(file_id: int) -> EmptyResponse:
     code: models.File = helpers.get_or_404(
         models.File, file_id, also_error=lambda f: f.deleted
     )
+    work = code.work
 
-    auth.ensure_can_edit_work(code.work)
+    auth.ensure_can_edit_work(work)
 
     def _raise_invalid() -> None:
         raise APIException(
@@ -371,6 +372,7 @@ def delete_code(file_id: int) -> EmptyResponse:
     elif code.fileowner == models.FileOwner.both:
         code.fileowner = other
 
+    work.bump_files_version()
     db.session.commit()
 
     return make_empty_response()
@@ -411,7 +413,7 @@ def split_code(
     if not code.is_directory:
         assert old_diskname is not None
         _, code.filename = files.random_file_path()
-        shutil.copyfile(old_diskname, code.get_diskname())
+        files.copy_stored_file(old_diskname, code.get_diskname())
     else:
         redistribute_directory(
             code, t.cast(models.File, models.File.query.get(old_id))
@@ -518,8 +520,16 @@ def update_code(file_id: int) -> JSONResponse[models.File]:
             db.session.flush()
             code.parent = new_parent
         else:
-            with open(code.get_diskname(), 'wb') as f:
+            # The file might share its storage with other files, so we never
+            # overwrite it in place.
+            old_diskname = code.get_diskname()
+            new_diskname, code.filename = files.random_file_path()
+            with open(new_diskname, 'wb') as f:
                 f.write(request.get_data())
+            files.deduplicate_file(new_diskname)
+            helpers.callback_after_this_request(
+                lambda: files.delete_stored_file(old_diskname)
+            )
 
     if code.work.assignment.is_open and current_user.id == code.work.user_id:
         current, other = models.FileOwner.both, models.FileOwner.teacher
@@ -550,6 +560,7 @@ def update_code(file_id: int) -> JSONResponse[models.File]:
             code = split_code(code, current, other)
             _update_file(code, other)
 
+    code.work.bump_files_version()
     db.session.commit()
 
     return jsonify(code)
@@ -21,9 +21,9 @@ from psef import limiter, current_user
 from psef.errors import APICodes, APIWarnings, APIException
 from psef.models import db
 from psef.helpers import (
-    JSONResponse, EmptyResponse, ExtendedJSONResponse, jsonify,
-    ensure_keys_in_dict, make_empty_response, get_from_map_transaction,
-    get_json_dict_from_request
+    JSONResponse, EmptyResponse, StreamedJSONResponse, ExtendedJSONResponse,
+    jsonify, ensure_keys_in_dict, make_empty_response,
+    get_from_map_transaction, get_json_dict_from_request
 )
 
 from . import api
@@ -406,7 +406,12 @@ def get_all_course_users(
             'CourseRole': crole
         } for user, crole in users
     ]
-    return jsonify(sorted(user_course, key=lambda item: item['User'].name))
+    # We sort in Python, as the ordering of the database depends on its
+    # collation. The serialization is streamed, as it can be large for big
+    # courses.
+    return StreamedJSONResponse.make_array(
+        sorted(user_course, key=lambda item: item['User'].name)
+    )
 
 
 @api.route('/courses/<int:course_id>/assignments/', methods=['GET'])
@@ -11,8 +11,9 @@ import itertools
 from collections import Counter, defaultdict
 
 import structlog
+import werkzeug
 import sqlalchemy.sql as sql
-from flask import request
+from flask import Response, request
 from sqlalchemy.orm import selectinload, contains_eager
 from mypy_extensions import TypedDict
 from typing_extensions import Protocol
@@ -218,6 +219,51 @@ def get_zip(work: models.Work,
     }
 
 
+@api.route('/submissions/<int:submission_id>/zip', methods=['GET'])
+@auth.login_required
+def stream_zip(submission_id: int) -> werkzeug.wrappers.Response:
+    """Download the given submission as a zip file.
+
+    .. :quickref: Submission; Download a submission as a zip file.
+
+    Unlike :py:func:`.get_zip` the archive is not saved first, but streamed
+    directly to the client while it is being built.
+
+    :param int submission_id: The id of the submission.
+    :query str owner: The type of files to include, see
+        :meth:`.models.File.get_exclude_owner`.
+    :returns: A response with the zip archive as content.
+
+    :raises APIException: If the submission with given id does not exist.
+                          (OBJECT_ID_NOT_FOUND)
+    :raises PermissionException: If there is no logged in user. (NOT_LOGGED_IN)
+    :raises PermissionException: If submission does not belong to the current
+                                 user and the user can not view files in the
+                                 attached course. (INCORRECT_PERMISSION)
+    """
+    work = helpers.filter_single_or_404(
+        models.Work, models.Work.id == submission_id, ~models.Work.deleted
+    )
+    if not work.has_as_author(current_user):
+        auth.ensure_permission(
+            CPerm.can_see_others_work, work.assignment.course_id
+        )
+
+    exclude_owner = models.File.get_exclude_owner(
+        request.args.get('owner'),
+        work.assignment.course_id,
+    )
+    auth.ensure_can_view_files(work, exclude_owner == FileOwner.student)
+
+    output_name = f'{work.assignment.name}-{work.user.name}-archive.zip'
+    res = Response(work.stream_zip(exclude_owner), mimetype='application/zip')
+    res.headers['Content-Disposition'] = (
+        "attachment; filename*=UTF-8''" +
+        werkzeug.urls.url_quote(output_name.replace('/', '_'), safe='')
+    )
+    return res
+
+
 @api.route('/submissions/<int:submission_id>', methods=['DELETE'])
 def delete_submission(submission_id: int) -> EmptyResponse:
     """Delete a submission and all its files.
@@ -996,6 +1042,7 @@ def create_new_file(submission_id: int) -> JSONResponse[t.Mapping[str, t.Any]]:
         )
         db.session.add(code)
         parent = code
+    work.bump_files_version()
     db.session.commit()
 
     assert code is not None
@@ -1021,6 +1068,8 @@ def get_dir_contents(
         content and return code 200. For the exact structure see
         :py:meth:`.File.list_contents`. If path is given the return value will
         be stat datastructure, see :py:func:`.files.get_stat_information`.
+        Directory listings have a strong ``ETag``, if it matches the
+        ``If-None-Match`` header an empty response with code 304 is returned.
 
     :query int file_id: The file id of the directory to get. If this is not
         given the parent directory for the specified submission is used.
@@ -1057,33 +1106,59 @@ def get_dir_contents(
 
     auth.ensure_can_view_files(work, exclude_owner == FileOwner.student)
 
+    if file_id is None and path:
+        found_file = work.search_file(path, exclude_owner)
+        return jsonify(psef.files.get_stat_information(found_file))
+
+    cached = work.get_cached_file_tree(exclude_owner)
+    tree: t.Optional[t.Mapping[str, t.Any]] = cached['tree']
+    etag: str = cached['etag']
+
     if file_id is not None:
+        tree = _find_directory_in_tree(cached['tree'], str(file_id))
+        etag = f'{etag}-{file_id}'
+
+    if tree is None:
+        # The requested file is not a directory in the cached tree, do the
+        # full lookup so we raise the correct error.
         file = helpers.filter_single_or_404(
             models.File,
             models.File.id == file_id,
             models.File.work_id == work.id,
             ~models.File.self_deleted,
         )
-    elif path:
-        found_file = work.search_file(path, exclude_owner)
-        return jsonify(psef.files.get_stat_information(found_file))
-    else:
-        file = helpers.filter_single_or_404(
-            models.File,
-            models.File.work_id == submission_id,
-            models.File.parent_id.is_(None),
-            models.File.fileowner != exclude_owner,
-            ~models.File.self_deleted,
-        )
+        if not file.is_directory:
+            raise APIException(
+                'File is not a directory',
+                f'The file with code {file.id} is not a directory',
+                APICodes.OBJECT_WRONG_TYPE, 400
+            )
+        tree = JSONResponse.dump_to_object(file.list_contents(exclude_owner))
 
-    if not file.is_directory:
-        raise APIException(
-            'File is not a directory',
-            f'The file with code {file.id} is not a directory',
-            APICodes.OBJECT_WRONG_TYPE, 400
-        )
+    res = jsonify(tree)
+    res.set_etag(etag)
+    res.make_conditional(request)
+    return res
 
-    return jsonify(file.list_contents(exclude_owner))
+
+def _find_directory_in_tree(
+    tree: t.Mapping[str, t.Any], file_id: str
+) -> t.Optional[t.Mapping[str, t.Any]]:
+    """Find the directory with the given id in a serialized file tree.
+
+    :param tree: The serialized :class:`psef.files.FileTree` to search.
+    :param file_id: The id of the directory to search for.
+    :returns: The serialized subtree of the found directory, or ``None`` if
+        no directory with the given id is in the tree.
+    """
+    todo = [tree]
+    while todo:
+        cur = todo.pop()
+        if 'entries' in cur:
+            if cur['id'] == file_id:
+                return cur
+            todo.extend(cur['entries'])
+    return None
 
 
 @api.route('/submissions/<int:submission_id>/proxy', methods=['POST'])
@@ -104,12 +104,17 @@ def get_auto_test_status(
     This route only does something when the get parameter ``get`` is equal to
     ``tests_to_run``. This route may also be slow as it asks the broker if the
     requesting runner is allowed to be used.
+
+    :qparam job_id: Only consider the run with this job id (OPTIONAL). The
+        broker gives this id to runners that it assigned to a job.
     """
     _verify_global_header_password()
     to_get = request.args.get('get', object())
 
     if to_get == 'tests_to_run':
-        runs = models.AutoTestRun.get_runs_that_need_runners()
+        runs = models.AutoTestRun.get_runs_that_need_runners(
+            job_id=request.args.get('job_id')
+        )
 
         with helpers.BrokerSession() as ses:
             for run in runs:
@@ -368,31 +373,10 @@ def update_result(auto_test_id: int,
     return jsonify({'taken': False})
 
 
-@api.route(
-    '/auto_tests/<int:auto_test_id>/results/<int:result_id>/step_results/',
-    methods=['PUT']
-)
-@feature_required(Feature.AUTO_TEST)
-def update_step_result(auto_test_id: int, result_id: int
-                       ) -> JSONResponse[models.AutoTestStepResult]:
-    """Update the result of a single step.
-
-    :param auto_test_id: The AutoTest configuration in which to update the
-        result.
-    :param result_id: The id of the result in which to update the step.
-    :>json state: The state in which the step is in right now.
-    :>json log: The current log of the step.
-    :>json auto_test_step_id: The step of which this is a result.
-    :>json res_id: The step result you want to update (OPTIONAL). If you do not
-        pass this option a step result is created.
-    """
-    password = _verify_global_header_password()
-
-    content = ensure_json_dict(
-        ('json' in request.files and json.load(request.files['json'])) or
-        request.get_json()
-    )
-
+def _update_step_result(
+    result: models.AutoTestResult,
+    content: t.Mapping[str, helpers.JSONType],
+) -> t.Tuple[models.AutoTestStepResult, bool]:
     with get_from_map_transaction(content) as [get, opt_get]:
         state = get('state', str)
         log = get('log', dict)
@@ -400,14 +384,6 @@ def update_step_result(auto_test_id: int, result_id: int
         res_id = opt_get('id', int, None)
         has_attachment = opt_get('has_attachment', bool, False)
 
-    result = get_or_404(
-        models.AutoTestResult,
-        result_id,
-        also_error=lambda res: res.run.auto_test_id != auto_test_id,
-    )
-    _ensure_from_latest_work(result)
-    _verify_and_get_runner(result.run, password)
-
     if res_id is None:
         step_result = models.AutoTestStepResult(
             step=get_or_404(
@@ -428,6 +404,49 @@ def update_step_result(auto_test_id: int, result_id: int
 
     step_result.log = log
 
+    return step_result, has_attachment
+
+
+def _get_result_for_step_results(
+    auto_test_id: int, result_id: int, password: LocalRunner
+) -> models.AutoTestResult:
+    result = get_or_404(
+        models.AutoTestResult,
+        result_id,
+        also_error=lambda res: res.run.auto_test_id != auto_test_id,
+    )
+    _ensure_from_latest_work(result)
+    _verify_and_get_runner(result.run, password)
+    return result
+
+
+@api.route(
+    '/auto_tests/<int:auto_test_id>/results/<int:result_id>/step_results/',
+    methods=['PUT']
+)
+@feature_required(Feature.AUTO_TEST)
+def update_step_result(auto_test_id: int, result_id: int
+                       ) -> JSONResponse[models.AutoTestStepResult]:
+    """Update the result of a single step.
+
+    :param auto_test_id: The AutoTest configuration in which to update the
+        result.
+    :param result_id: The id of the result in which to update the step.
+    :>json state: The state in which the step is in right now.
+    :>json log: The current log of the step.
+    :>json auto_test_step_id: The step of which this is a result.
+    :>json res_id: The step result you want to update (OPTIONAL). If you do not
+        pass this option a step result is created.
+    """
+    password = _verify_global_header_password()
+
+    content = ensure_json_dict(
+        ('json' in request.files and json.load(request.files['json'])) or
+        request.get_json()
+    )
+    result = _get_result_for_step_results(auto_test_id, result_id, password)
+
+    step_result, has_attachment = _update_step_result(result, content)
     if has_attachment:
         step_result.update_attachment(request.files['attachment'])
 
@@ -436,19 +455,70 @@ def update_step_result(auto_test_id: int, result_id: int
     return jsonify(step_result)
 
 
+@api.route(
+    '/auto_tests/<int:auto_test_id>/results/<int:result_id>/step_results/'
+    'batch/',
+    methods=['PUT']
+)
+@feature_required(Feature.AUTO_TEST)
+def update_step_results(auto_test_id: int, result_id: int
+                        ) -> JSONResponse[t.List[models.AutoTestStepResult]]:
+    """Update the results of multiple steps at once.
+
+    All updates are applied in a single transaction, in the given order.
+
+    :param auto_test_id: The AutoTest configuration in which to update the
+        results.
+    :param result_id: The id of the result in which to update the steps.
+    :>json step_results: A list of updates, every item has the same format as
+        the body of :func:`.update_step_result`. Attachments cannot be
+        uploaded using this route.
+    :returns: The updated step results, in the same order as the given
+        updates.
+    """
+    password = _verify_global_header_password()
+
+    content = get_json_dict_from_request(log_object=False)
+    with get_from_map_transaction(content) as [get, _]:
+        updates = get('step_results', list)
+
+    result = _get_result_for_step_results(auto_test_id, result_id, password)
+
+    step_results = []
+    for update in updates:
+        step_result, has_attachment = _update_step_result(
+            result, ensure_json_dict(update)
+        )
+        if has_attachment:
+            raise APIException(
+                'Attachments cannot be uploaded in a batch',
+                'A step result with an attachment was given',
+                APICodes.INVALID_PARAM, 400
+            )
+        step_results.append(step_result)
+
+    db.session.commit()
+
+    return jsonify(step_results)
+
+
 @api.route(
     '/auto_tests/<int:auto_test_id>/runs/<int:run_id>/results/',
     methods=['GET'],
 )
 def get_extra_results_to_process(
     auto_test_id: int, run_id: int
-) -> JSONResponse[t.List[t.Mapping[str, int]]]:
+) -> JSONResponse[t.List[t.Mapping[str, t.Any]]]:
     """Get extra results to run the tests for.
 
     :qparam last_call: If there are no extra results mark the requesting runner
         as done.
+    :qparam with_student_info: Also return the information about the
+        submission of each result, see
+        :meth:`.models.AutoTestRun.get_student_info`.
     """
     is_last_call = request_arg_true('last_call')
+    with_student_info = request_arg_true('with_student_info')
     password = _verify_global_header_password()
 
     run = filter_single_or_404(
@@ -468,14 +538,16 @@ def get_extra_results_to_process(
         run.stop_runners([runner])
         db.session.commit()
 
-    return jsonify(
-        [
-            {
-                'result_id': res.id,
-                'student_id': res.work.user_id,
-            } for res in results
-        ]
-    )
+    def to_json(res: models.AutoTestResult) -> t.Mapping[str, t.Any]:
+        data: t.Dict[str, t.Any] = {
+            'result_id': res.id,
+            'student_id': res.work.user_id,
+        }
+        if with_student_info:
+            data['student_info'] = run.get_student_info(res)
+        return data
+
+    return jsonify([to_json(res) for res in results])
 
 
 @api.route(
@@ -492,7 +564,9 @@ def upload_output_files(
     """Upload output files for the given AutoTest in the given suite.
 
     The uploaded file may be any file that can normally be used as a
-    submission, but a compressed archive is preferred.
+    submission, but an archive is preferred. Small archives do not need to be
+    compressed, and the archive is extracted directly from the uploaded data
+    without storing a copy of it first.
     """
     password = _verify_global_header_password()
     result = filter_single_or_404(
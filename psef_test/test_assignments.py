@@ -6,6 +6,7 @@ import json
 import uuid
 import random
 import tarfile
+import zipfile
 import datetime
 import tempfile
 import dataclasses
@@ -5236,3 +5237,33 @@ def test_get_assigned_grader_ids(
         assert sorted(grader_ids) == sorted(
             ta.id for ta in tas[:len(subs_to_assign)]
         )
+
+
+@pytest.mark.parametrize(
+    'filename', ['../test_submissions/multiple_dir_archive.zip'],
+    indirect=True
+)
+def test_export_latest_submissions(
+    test_client, logged_in, assignment_real_works, ta_user, student_user,
+    describe
+):
+    assignment, _ = assignment_real_works
+    url = f'/api/v1/assignments/{assignment.id}/submissions/zip'
+
+    with describe('teachers get all latest submissions'), logged_in(ta_user):
+        res = test_client.get(url, query_string={'owner': 'student'})
+        assert res.status_code == 200
+        assert res.mimetype == 'application/zip'
+
+        zfile = zipfile.ZipFile(io.BytesIO(res.get_data()))
+        names = zfile.namelist()
+        works = assignment.get_all_latest_submissions().all()
+        assert len(works) == 3
+        for work in works:
+            prefix = f'{work.user.name} - {work.id}/multiple_dir_archive.zip/'
+            assert f'{prefix}dir/single_file_work' in names
+            assert f'{prefix}dir2/single_file_work_copy' in names
+
+    with describe('students cannot export'), logged_in(student_user):
+        res = test_client.get(url)
+        assert res.status_code == 403
@@ -36,7 +36,7 @@ from psef.exceptions import APICodes, APIException
 
 
 @pytest.fixture(params=[False])
-def fail_wget_attach(request):
+def fail_download_attach(request):
     yield request.param
 
 
@@ -79,7 +79,7 @@ def make_failer(app, session):
 
 @pytest.fixture
 def monkeypatch_for_run(
-    monkeypatch, lxc_stub, stub_function_class, fail_wget_attach
+    monkeypatch, lxc_stub, stub_function_class, fail_download_attach
 ):
     old_run_command = psef.auto_test.StartedContainer._run_command
     psef.auto_test._STOP_RUNNING.clear()
@@ -121,7 +121,7 @@ def monkeypatch_for_run(
         elif '/etc/sudoers' in cmd:
             signal_start()
             return 0
-        elif 'wget' == cmd[0] and fail_wget_attach:
+        elif fail_download_attach and 'unzip' in cmd[-1]:
             os.execvp('sleep', ['sleep', 'inf'])
 
         return old_run_command(self, cmd_user)
@@ -405,6 +405,7 @@ def test_create_auto_test_suite(basic, test_client, logged_in, describe):
                         'steps': [],
                         # This is set in the conftest.py
                         'command_time_limit': 3,
+                        'cpu_cores': 1,
                     }],
                 }]
             }
@@ -755,13 +756,18 @@ def test_update_auto_test(
 
 
 @pytest.mark.parametrize('use_transaction', [False], indirect=True)
+@pytest.mark.parametrize('container_pool_size', [0, 2])
 def test_run_auto_test(
     monkeypatch_celery, monkeypatch_broker, basic, test_client, logged_in,
     describe, live_server, lxc_stub, monkeypatch, app, session, assert_similar,
-    monkeypatch_for_run, make_function_spy, stub_function_class
+    monkeypatch_for_run, make_function_spy, stub_function_class,
+    container_pool_size
 ):
     with describe('setup'):
         course, assig_id, teacher, student1 = basic
+        monkeypatch.setitem(
+            app.config, 'AUTO_TEST_CONTAINER_POOL_SIZE', container_pool_size
+        )
         student2 = helpers.create_user_with_role(session, 'Student', [course])
         adjust_spy = make_function_spy(psef.tasks, 'adjust_amount_runners')
 
@@ -1107,7 +1113,9 @@ def test_run_auto_test(
             )
 
 
-def test_update_auto_test_set(basic, test_client, logged_in, describe):
+def test_update_auto_test_set(
+    basic, test_client, logged_in, describe, app
+):
     test = set_id = suite_url = suite = url = None
 
     def update_test():
@@ -1210,6 +1218,17 @@ def test_update_auto_test_set(basic, test_client, logged_in, describe):
         update_suite(command_time_limit=20, error=200)
         assert suite['command_time_limit'] == 20
 
+    with describe('Amount of cpu cores should be within limits'
+                  ), logged_in(teacher):
+        assert suite['cpu_cores'] == 1
+        update_suite(cpu_cores=2, error=200)
+        assert suite['cpu_cores'] == 2
+        update_suite(cpu_cores=0, error=400)
+        assert suite['cpu_cores'] == 2
+        max_cores = app.config['AUTO_TEST_MAX_CORES_PER_SUITE']
+        update_suite(cpu_cores=max_cores + 1, error=400)
+        assert suite['cpu_cores'] == 2
+
     with describe('delete suite'), logged_in(teacher):
         test_client.req('delete', f'{suite_url}{suite["id"]}', 204)
         test_client.req(
@@ -1519,6 +1538,232 @@ def test_get_runs_internal_api(
         )
 
 
+def test_get_runs_that_need_runners_for_job(
+    describe, basic, logged_in, test_client, session, monkeypatch_celery
+):
+    with describe('setup'):
+        course, assig_id, teacher, student = basic
+        with logged_in(teacher):
+            test = m.AutoTest.query.get(
+                helpers.create_auto_test(test_client, assig_id)['id']
+            )
+
+        run = m.AutoTestRun(auto_test=test, batch_run_done=True)
+        run.runners_requested = 1
+        session.add(run)
+        session.commit()
+
+        with logged_in(teacher):
+            helpers.create_submission(test_client, assig_id)
+
+        get_runs = m.AutoTestRun.get_runs_that_need_runners
+
+    with describe('without job id all runs are considered'):
+        assert get_runs() == [run]
+
+    with describe('a job id only returns the run of that job'):
+        assert get_runs(job_id=run.get_job_id()) == [run]
+        assert get_runs(job_id=f'{uuid.uuid4().hex}-0') == []
+
+        run.increment_job_id()
+        session.commit()
+        assert get_runs(job_id=run.get_job_id()) == [run]
+
+    with describe('invalid job ids never match'):
+        assert get_runs(job_id='not a job id') == []
+        assert get_runs(job_id=f'{uuid.uuid4().hex}-a') == []
+
+
+def test_result_state_counts(
+    describe, basic, logged_in, test_client, session, monkeypatch_celery
+):
+    with describe('setup'):
+        course, assig_id, teacher, student = basic
+        with logged_in(teacher):
+            test = helpers.create_auto_test(test_client, assig_id)
+            helpers.create_submission(test_client, assig_id, for_user=student)
+            helpers.create_submission(test_client, assig_id)
+
+        states = m.AutoTestStepResultState
+        run = LocalProxy(lambda: m.AutoTest.query.get(test['id']).run)
+
+        def get_counts():
+            return {
+                state: run.get_amount_results_in_state(state)
+                for state in states
+                if run.get_amount_results_in_state(state)
+            }
+
+        def get_result():
+            return m.AutoTestResult.query.filter(
+                m.AutoTestResult.work_id.in_(
+                    m.Work.query.filter_by(user=student).with_entities(
+                        m.Work.id
+                    )
+                ),
+                m.AutoTestResult._state == states.not_started,
+            ).one()
+
+    with describe('starting a run counts all its results'):
+        with logged_in(teacher):
+            test_client.req(
+                'post',
+                f'/api/v1/auto_tests/{test["id"]}/runs/',
+                200,
+                data={'continuous_feedback_run': False},
+            )
+        session.commit()
+        assert get_counts() == {states.not_started: 2}
+        assert run.get_amount_needed_runners() == 1
+
+    with describe('state changes move results between counts'):
+        get_result().state = states.running
+        session.commit()
+        assert get_counts() == {states.not_started: 1, states.running: 1}
+
+    with describe('new submissions skip the old result'):
+        with logged_in(teacher):
+            helpers.create_submission(test_client, assig_id, for_user=student)
+        session.commit()
+        assert get_counts() == {states.not_started: 2, states.skipped: 1}
+
+    with describe('counts match the amount of results to run'):
+        assert run.get_amount_results_in_state(
+            states.not_started
+        ) == run.get_results_to_run().count()
+
+
+def test_result_state_counts_groups(
+    describe, basic, logged_in, test_client, session, monkeypatch_celery
+):
+    with describe('setup'):
+        course, assig_id, teacher, student = basic
+        states = m.AutoTestStepResultState
+        with logged_in(teacher):
+            group_set = helpers.create_group_set(
+                test_client, course, 1, 2, [assig_id]
+            )
+            test = helpers.create_auto_test(test_client, assig_id)
+            test_client.req(
+                'post',
+                f'/api/v1/auto_tests/{test["id"]}/runs/',
+                200,
+                data={'continuous_feedback_run': False},
+            )
+        run = LocalProxy(lambda: m.AutoTest.query.get(test['id']).run)
+
+        def get_counts():
+            session.expire_all()
+            return {
+                state: run.get_amount_results_in_state(state)
+                for state in states
+                if run.get_amount_results_in_state(state)
+            }
+
+        with logged_in(student):
+            helpers.create_submission(test_client, assig_id)
+        assert get_counts() == {states.not_started: 1}
+
+    with describe('group submissions skip the results of the members'):
+        with logged_in(teacher):
+            helpers.create_group(test_client, group_set, [student])
+        with logged_in(student):
+            group_sub = helpers.create_submission(test_client, assig_id)
+        assert get_counts() == {states.not_started: 1, states.skipped: 1}
+        assert run.get_results_to_run().count() == 1
+
+    with describe('deleting the group submission runs the members again'):
+        with logged_in(teacher):
+            test_client.req(
+                'delete', f'/api/v1/submissions/{group_sub["id"]}', 204
+            )
+        assert get_counts() == {states.not_started: 1, states.skipped: 1}
+        assert run.get_results_to_run().count() == 1
+        assert run.get_results_to_run().one().work.user_id == student.id
+
+
+def test_predict_amount_needed_runners(
+    describe, basic, logged_in, test_client, session, monkeypatch_celery,
+    monkeypatch, app
+):
+    with describe('setup'):
+        course, assig_id, teacher, student = basic
+        with logged_in(teacher):
+            test = helpers.create_auto_test(test_client, assig_id)
+            sub = helpers.create_submission(
+                test_client, assig_id, for_user=student
+            )
+            helpers.create_submission(test_client, assig_id)
+            test_client.req(
+                'post',
+                f'/api/v1/auto_tests/{test["id"]}/runs/',
+                200,
+                data={'continuous_feedback_run': False},
+            )
+        session.commit()
+
+        monkeypatch.setitem(app.config, 'AUTO_TEST_MAX_JOBS_PER_RUNNER', 100)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_RUNNER_CONCURRENCY', 1)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_TARGET_DRAIN_TIME', 60)
+
+        auto_test = m.AutoTest.query.get(test['id'])
+        run = auto_test.run
+
+        def add_finished_results(amount, duration):
+            now = DatetimeWithTimezone.utcnow()
+            for _ in range(amount):
+                result = m.AutoTestResult(
+                    final_result=False,
+                    work_id=sub['id'],
+                    auto_test_run_id=run.id,
+                )
+                session.add(result)
+                result.state = m.AutoTestStepResultState.passed
+                result.started_at = now - timedelta(seconds=duration)
+                result.finished_at = now
+                now += timedelta(seconds=1)
+            session.commit()
+
+    with describe('without history only the jobs per runner are used'):
+        assert auto_test.get_average_result_duration() is None
+        assert run.get_amount_needed_runners() == 1
+
+    with describe('slow results need more runners'):
+        add_finished_results(5, 120)
+        assert auto_test.get_average_result_duration() == 120
+        # Never more runners than results that can be run concurrently
+        assert run.get_amount_needed_runners() == 2
+
+    with describe('only recent results are used for the duration'):
+        add_finished_results(5, 10)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_DURATION_HISTORY', 5)
+        assert auto_test.get_average_result_duration() == 10
+        assert run.get_amount_needed_runners() == 1
+
+    with describe('prediction can be disabled'):
+        monkeypatch.setitem(app.config, 'AUTO_TEST_DURATION_HISTORY', 50)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_TARGET_DRAIN_TIME', 0)
+        assert run.get_amount_needed_runners() == 1
+
+    with describe('results cleared by an upcoming batch run are counted'):
+        assert run._get_amount_upcoming_batch_results() == 0
+
+        monkeypatch.setattr(m.AutoTest, 'has_hidden_steps', True)
+        run.batch_run_done = False
+        auto_test.assignment.deadline = DatetimeWithTimezone.utcnow()
+        # The results that have not started yet are not counted.
+        assert run._get_amount_upcoming_batch_results() == 10
+        assert run.get_amount_needed_runners() == 1
+
+    with describe('upcoming results only need runners to drain the batch'):
+        monkeypatch.setitem(app.config, 'AUTO_TEST_MAX_JOBS_PER_RUNNER', 1)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_TARGET_DRAIN_TIME', 60)
+        monkeypatch.setitem(app.config, 'AUTO_TEST_DURATION_HISTORY', 5)
+        # Twelve results of 10 seconds can be done by two runners within a
+        # minute, instead of one runner per result.
+        assert run.get_amount_needed_runners() == 2
+
+
 def test_getting_fixture_no_permission(
     describe, basic, logged_in, test_client, session, app
 ):
@@ -1711,6 +1956,99 @@ def test_clearing_already_started_result(
         assert result.setup_stdout is None
 
 
+def test_update_step_results_in_batch(
+    describe, basic, logged_in, test_client, session, app, monkeypatch_celery
+):
+    with describe('setup'):
+        course, assig_id, teacher, student = basic
+        with logged_in(teacher):
+            test = m.AutoTest.query.get(
+                helpers.create_auto_test(
+                    test_client,
+                    assig_id,
+                    amount_sets=1,
+                    amount_suites=1,
+                    amount_fixtures=1,
+                )['id']
+            )
+
+        run = m.AutoTestRun(auto_test=test, batch_run_done=True)
+        run.runners_requested = 1
+        session.add(run)
+        session.commit()
+
+        with logged_in(teacher):
+            sub_id = helpers.create_submission(test_client, assig_id)['id']
+
+        result = m.AutoTestResult.query.filter_by(work_id=sub_id).one()
+        runner = m.AutoTestRunner(_ipaddr='localhost', run=run)
+        session.commit()
+
+        step1, step2 = test.sets[0].suites[0].steps[:2]
+        url = (
+            f'/api/v-internal/auto_tests/{test.id}/results/{result.id}/'
+            'step_results/batch/'
+        )
+
+        def do_batch(status, step_results):
+            return test_client.req(
+                'put',
+                url,
+                status,
+                data={'step_results': step_results},
+                headers={
+                    'CG-Internal-Api-Password':
+                        app.config['AUTO_TEST_PASSWORD'],
+                    'CG-Internal-Api-Runner-Password': str(runner.id),
+                },
+                environ_base={'REMOTE_ADDR': 'localhost'},
+            )
+
+    with describe('new step results are created in the given order'):
+        res1, res2 = do_batch(
+            200, [
+                {
+                    'state': 'passed',
+                    'log': {},
+                    'auto_test_step_id': step1.id,
+                },
+                {
+                    'state': 'running',
+                    'log': {},
+                    'auto_test_step_id': step2.id,
+                },
+            ]
+        )
+        assert res1['auto_test_step']['id'] == step1.id
+        assert res1['state'] == 'passed'
+        assert res2['auto_test_step']['id'] == step2.id
+        assert res2['state'] == 'running'
+        assert len(result.step_results) == 2
+
+    with describe('existing step results can be updated'):
+        res, = do_batch(
+            200, [{
+                'id': res2['id'],
+                'state': 'failed',
+                'log': {'steps': []},
+                'auto_test_step_id': step2.id,
+            }]
+        )
+        assert res['id'] == res2['id']
+        assert res['state'] == 'failed'
+        assert len(result.step_results) == 2
+
+    with describe('attachments cannot be given in a batch'):
+        do_batch(
+            400, [{
+                'state': 'passed',
+                'log': {},
+                'auto_test_step_id': step1.id,
+                'has_attachment': True,
+            }]
+        )
+
+
 def test_update_result_dates_in_broker(
     describe, basic, logged_in, test_client, session, app, monkeypatch,
     stub_function_class, monkeypatch_celery, monkeypatch_broker, assert_similar
@@ -2158,7 +2496,7 @@ def test_copy_auto_test(
 
 
 @pytest.mark.parametrize(
-    'use_transaction,fail_wget_attach', [(False, True)], indirect=True
+    'use_transaction,fail_download_attach', [(False, True)], indirect=True
 )
 def test_failing_attach(
     monkeypatch_celery, basic, test_client, logged_in, describe, live_server,
@@ -1,6 +1,8 @@
 import re
+import contextlib
 
 import pytest
+from sqlalchemy import event
 from freezegun import freeze_time
 
 import psef
@@ -946,6 +948,151 @@ def test_get_assignment_all_feedback(
             match_res(res, only_own_subs=False)
 
 
+def test_assignment_feedback_permissions(
+    logged_in, test_client, session, admin_user, describe, tomorrow,
+    make_add_reply, app
+):
+    with describe('setup'), logged_in(admin_user):
+        assignment = helpers.create_assignment(
+            test_client, state='open', deadline=tomorrow
+        )
+        course = assignment['course']
+        teacher = admin_user
+        student1, student2, student3 = [
+            helpers.create_user_with_role(session, 'Student', course)
+            for _ in range(3)
+        ]
+        group_set = helpers.create_group_set(
+            test_client, course, 1, 2, [get_id(assignment)]
+        )
+        helpers.create_group(test_client, group_set, [student1, student2])
+
+        with logged_in(student1):
+            group_sub = helpers.create_submission(test_client, assignment)
+        with logged_in(student3):
+            solo_sub = helpers.create_submission(test_client, assignment)
+
+        add_group_reply = make_add_reply(get_id(group_sub))
+        add_solo_reply = make_add_reply(get_id(solo_sub))
+        with logged_in(teacher):
+            add_group_reply('teacher reply')
+            add_solo_reply('teacher reply')
+        with logged_in(student1):
+            add_group_reply('own reply')
+        with logged_in(student2):
+            add_group_reply('reply of group member')
+        with logged_in(student3):
+            add_solo_reply('own reply')
+
+        feedback_url = f'/api/v1/assignments/{get_id(assignment)}/feedbacks/'
+
+    def get_feedback(user):
+        # Make sure nothing cached for a previous user is reused.
+        session.expunge_all()
+        with app.test_request_context('/'), psef.auth.as_current_user(user):
+            assig = m.Assignment.query.get(get_id(assignment))
+            perms = psef.auth.AssignmentFeedbackPermissions(assig)
+            works = assig.get_all_latest_submissions().all()
+            user_feedback, linter_feedback = m.Work.get_feedback_of_works(
+                works,
+                may_see_reply=perms.may_see_reply,
+                may_see_linter_feedback=perms.may_see_linter_feedback,
+            )
+
+            for work in works:
+                work_perms = psef.auth.WorkPermissions(work)
+                assert perms.may_see_general_feedback(work) == (
+                    work_perms.ensure_may_see_general_feedback.as_bool()
+                )
+                assert perms.may_see_linter_feedback(work) == (
+                    work_perms.ensure_may_see_linter_feedback.as_bool()
+                )
+                replies = m.CommentReply.query.filter(
+                    m.CommentReply.comment_base.has(
+                        m.CommentBase.file.has(work=work)
+                    )
+                ).all()
+                assert replies
+                for reply in replies:
+                    assert perms.may_see_reply(work, reply) == (
+                        psef.auth.FeedbackReplyPermissions(reply)
+                        .ensure_may_see.as_bool()
+                    )
+
+                assert user_feedback.get(work.id, []) == list(
+                    work.get_user_feedback()
+                )
+                if perms.may_see_linter_feedback(work):
+                    assert linter_feedback.get(work.id, []) == list(
+                        work.get_linter_feedback()
+                    )
+                else:
+                    assert work.id not in linter_feedback
+
+            return {
+                work.id: [
+                    fb.split(': ', 1)[1]
+                    for fb in user_feedback.get(work.id, [])
+                ]
+                for work in works
+            }
+
+    with describe('group authors see the replies of their group'):
+        assert get_feedback(student1) == {
+            get_id(group_sub): ['own reply'],
+            get_id(solo_sub): [],
+        }
+        assert get_feedback(student2) == {
+            get_id(group_sub): ['reply of group member'],
+            get_id(solo_sub): [],
+        }
+
+    with describe('students without can_see_others_work see only own'):
+        assert get_feedback(student3) == {
+            get_id(group_sub): [],
+            get_id(solo_sub): ['own reply'],
+        }
+
+    with describe('teachers see all replies'):
+        assert get_feedback(teacher) == {
+            get_id(group_sub): [
+                'teacher reply', 'own reply', 'reply of group member'
+            ],
+            get_id(solo_sub): ['teacher reply', 'own reply'],
+        }
+
+    @contextlib.contextmanager
+    def count_queries():
+        queries = []
+
+        def on_query(*_):
+            queries.append(True)
+
+        event.listen(m.db.engine, 'before_cursor_execute', on_query)
+        try:
+            yield queries
+        finally:
+            event.remove(m.db.engine, 'before_cursor_execute', on_query)
+
+    with describe('the amount of queries does not depend on the submissions'
+                  ), logged_in(teacher):
+        test_client.req('get', feedback_url, 200, result=dict)
+        with count_queries() as queries_before:
+            test_client.req('get', feedback_url, 200, result=dict)
+
+        for _ in range(3):
+            student = helpers.create_user_with_role(session, 'Student', course)
+            with logged_in(student):
+                sub = helpers.create_submission(test_client, assignment)
+            make_add_reply(get_id(sub))('teacher reply')
+
+        with count_queries() as queries_after:
+            res = test_client.req('get', feedback_url, 200, result=dict)
+
+        assert len(res) == 5
+        assert len(queries_after) == len(queries_before)
+
+
 def test_reply(
     logged_in, test_client, session, admin_user, mail_functions, describe,
     tomorrow, make_add_reply
@@ -1,5 +1,7 @@
 # SPDX-License-Identifier: AGPL-3.0-only
+import io
 import os
+import shutil
 import datetime
 import tempfile
 
@@ -179,3 +181,125 @@ def test_save_stream(describe, monkeypatch, app):
                 psef.files.save_stream(FileStorage(f))
 
             assert os.listdir(upload_dir) == old_files
+
+
+def test_deduplicate_stored_files(describe, monkeypatch, app):
+    with tempfile.TemporaryDirectory() as upload_dir:
+        monkeypatch.setitem(app.config, 'UPLOAD_DIR', upload_dir)
+
+        def make_file(content):
+            path, _ = psef.files.random_file_path()
+            with open(path, 'wb') as f:
+                f.write(content)
+            psef.files.deduplicate_file(path)
+            return path
+
+        with describe('files with the same content share a blob'):
+            path1 = make_file(b'hello')
+            path2 = make_file(b'hello')
+            path3 = make_file(b'bye')
+
+            assert psef.files.is_same_stored_file(path1, path2)
+            assert not psef.files.is_same_stored_file(path1, path3)
+            assert os.stat(path1).st_nlink == 3
+            assert open(path2, 'rb').read() == b'hello'
+
+        with describe('blobs are removed with their last reference'):
+            blob_dir = os.path.join(upload_dir, '.blobs')
+
+            def blobs():
+                return sorted(f for _, _, fs in os.walk(blob_dir) for f in fs)
+
+            assert len(blobs()) == 2
+
+            psef.files.delete_stored_file(path1)
+            assert len(blobs()) == 2
+            assert open(path2, 'rb').read() == b'hello'
+
+            psef.files.delete_stored_file(path2)
+            assert len(blobs()) == 1
+            psef.files.delete_stored_file(path3)
+            assert blobs() == []
+
+        with describe('copies share the storage of the original'):
+            path1 = make_file(b'copy me')
+            path2, _ = psef.files.random_file_path()
+            psef.files.copy_stored_file(path1, path2)
+            assert psef.files.is_same_stored_file(path1, path2)
+
+
+def test_file_tree_path_index(describe):
+    FileTree = psef.files.FileTree
+
+    tree = FileTree(
+        name='root',
+        id=1,
+        entries=[
+            FileTree(name='a', id=2, entries=None),
+            FileTree(
+                name='dir',
+                id=3,
+                entries=[FileTree(name='b', id=4, entries=None)],
+            ),
+            # A duplicate name, the first entry should be used.
+            FileTree(name='a', id=5, entries=None),
+        ],
+    )
+
+    with describe('all paths should be indexed relative to the root'):
+        assert tree.get_path_index() == {'': 1, 'a': 2, 'dir': 3, 'dir/b': 4}
+
+    with describe('the index should be cached'):
+        assert tree.get_path_index() is tree.get_path_index()
+
+    with describe('search should use the index'):
+        assert psef.files.search_path_in_filetree(tree, '/dir//b/') == 4
+        with pytest.raises(KeyError):
+            psef.files.search_path_in_filetree(tree, 'dir/a')
+
+
+@pytest.mark.parametrize('ext', ['tar.gz', 'zip', '7z'])
+def test_extract_from_upload_stream(describe, app, ext):
+    fname = f'test_data/test_submissions/multiple_dir_archive.{ext}'
+    expected = {
+        'dir/single_file_work',
+        'dir/single_file_work_copy',
+        'dir2/single_file_work',
+        'dir2/single_file_work_copy',
+    }
+
+    def extract(stream):
+        tmpdir, _ = psef.files.extract_to_temp(
+            FileStorage(stream, filename=os.path.basename(fname)),
+            app.max_file_size,
+        )
+        try:
+            return {
+                os.path.relpath(os.path.join(root, f), tmpdir)
+                for root, _, files in os.walk(tmpdir) for f in files
+            }
+        finally:
+            shutil.rmtree(tmpdir)
+
+    with describe('seekable uploads are read directly'):
+        with open(fname, 'rb') as f:
+            assert extract(f) == expected
+            assert not f.closed
+
+    with describe('other uploads are saved first'):
+
+        class NotSeekable(io.RawIOBase):
+            def __init__(self, f):
+                self.f = f
+
+            def readinto(self, buf):
+                return self.f.readinto(buf)
+
+            def readable(self):
+                return True
+
+            def seekable(self):
+                return False
+
+        with open(fname, 'rb') as f:
+            assert extract(NotSeekable(f)) == expected
@@ -1,9 +1,11 @@
 # SPDX-License-Identifier: AGPL-3.0-only
 """Here be dragons, watch out!
 """
+import io
 import os
 import copy
 import time
+import uuid
 import datetime
 from random import shuffle
 
@@ -593,6 +595,222 @@ def test_lint_later_submission(
         assert not exps
 
 
+@pytest.mark.parametrize('filename', ['test_flake8.tar.gz'], indirect=True)
+@pytest.mark.parametrize('batch_size', [1, 2])
+@pytest.mark.parametrize(
+    'cfg,crashed', [
+        ('', False),
+        ('[flake8]\ndisable_noqa=Trues # This should crash', True),
+    ]
+)
+def test_linter_batches(
+    teacher_user, test_client, logged_in, assignment_real_works, session,
+    monkeypatch_celery, app, monkeypatch, batch_size, cfg, crashed, describe
+):
+    assignment, single_work = assignment_real_works
+    monkeypatch.setitem(app.config, 'LINTER_BATCH_SIZE', batch_size)
+
+    with describe('all submissions should be linted'), logged_in(
+        teacher_user
+    ):
+        linter_id = test_client.req(
+            'post',
+            f'/api/v1/assignments/{assignment.id}/linter',
+            200,
+            data={'name': 'Flake8', 'cfg': cfg},
+        )['id']
+        test_client.req(
+            'get',
+            f'/api/v1/linters/{linter_id}',
+            200,
+            result={
+                'name': 'Flake8',
+                'done': 0 if crashed else 3,
+                'working': 0,
+                'id': linter_id,
+                'crashed': 3 if crashed else 0,
+            }
+        )
+
+    with describe('comments should be added to the correct submission'
+                  ), logged_in(teacher_user):
+        code_id = session.query(m.File.id).filter(
+            m.File.work_id == single_work['id'],
+            m.File.parent != None,  # NOQA
+            m.File.name != '__init__.py',
+        ).first()[0]
+        res = test_client.req(
+            'get',
+            f'/api/v1/code/{code_id}',
+            200,
+            query={'type': 'linter-feedback'},
+        )
+        codes = [
+            linter_comm['code']
+            for _, feedbacks in sorted(res.items())
+            for _, linter_comm in feedbacks
+        ]
+        if crashed:
+            assert codes == []
+        else:
+            assert codes == ['W191', 'E211', 'E201', 'E202']
+
+
+@pytest.mark.parametrize('filename', ['test_flake8.tar.gz'], indirect=True)
+def test_linter_feedback_cache(
+    teacher_user, test_client, logged_in, assignment_real_works, session,
+    monkeypatch_celery, monkeypatch, describe
+):
+    assignment, single_work = assignment_real_works
+    # Make sure the cache is not shared with other tests.
+    cfg = f'[flake8]\n# {uuid.uuid4()}\n'
+    code_id = session.query(m.File.id).filter(
+        m.File.work_id == single_work['id'],
+        m.File.parent != None,  # NOQA
+        m.File.name != '__init__.py',
+    ).first()[0]
+
+    def run_linter():
+        linter_id = test_client.req(
+            'post',
+            f'/api/v1/assignments/{assignment.id}/linter',
+            200,
+            data={'name': 'Flake8', 'cfg': cfg},
+        )['id']
+        test_client.req(
+            'get',
+            f'/api/v1/linters/{linter_id}',
+            200,
+            result={
+                'name': 'Flake8',
+                'done': 3,
+                'working': 0,
+                'id': linter_id,
+                'crashed': 0,
+            }
+        )
+        res = test_client.req(
+            'get',
+            f'/api/v1/code/{code_id}',
+            200,
+            query={'type': 'linter-feedback'},
+        )
+        test_client.req('delete', f'/api/v1/linters/{linter_id}', 204)
+        return [
+            linter_comm['code']
+            for _, feedbacks in sorted(res.items())
+            for _, linter_comm in feedbacks
+        ]
+
+    orig_run_command = psef.linters._run_command
+    amount_runs = 0
+
+    def run_command(cmd):
+        nonlocal amount_runs
+        amount_runs += 1
+        return orig_run_command(cmd)
+
+    monkeypatch.setattr(psef.linters, '_run_command', run_command)
+
+    with logged_in(teacher_user):
+        with describe('first run should lint all files'):
+            assert run_linter() == ['W191', 'E211', 'E201', 'E202']
+            assert amount_runs > 0
+
+        with describe('second run should use the cache'):
+            amount_runs = 0
+            assert run_linter() == ['W191', 'E211', 'E201', 'E202']
+            assert amount_runs == 0
+
+
+def test_prune_lint_cache(app, monkeypatch_celery, describe):
+    with describe('setup'):
+        cache_dir = os.path.join(
+            app.config['UPLOAD_DIR'], '.linter_cache', str(uuid.uuid4())
+        )
+        os.makedirs(cache_dir)
+        old_entry = os.path.join(cache_dir, 'old.json')
+        new_entry = os.path.join(cache_dir, 'new.json')
+        for entry in [old_entry, new_entry]:
+            with open(entry, 'w') as f:
+                f.write('{}')
+
+        max_age = psef.linters._LintCache.MAX_AGE
+        old_time = time.time() - (max_age + datetime.timedelta(days=1)
+                                  ).total_seconds()
+        os.utime(old_entry, (old_time, old_time))
+
+    with describe('only entries that were not used recently are removed'):
+        psef.tasks.prune_lint_cache()
+        assert not os.path.exists(old_entry)
+        assert os.path.exists(new_entry)
+
+
+def test_linter_feedback_cache_other_files(
+    teacher_user, test_client, logged_in, assignment, session,
+    monkeypatch_celery, describe
+):
+    # The ``JavadocPackage`` check of a file depends on the existence of
+    # another file, so this feedback should not be cached per file.
+    cfg = (
+        '<?xml version="1.0"?>\n'
+        '<!DOCTYPE module PUBLIC '
+        '"-//Checkstyle//DTD Checkstyle Configuration 1.3//EN" '
+        '"https://checkstyle.org/dtds/configuration_1_3.dtd">\n'
+        f'<!-- {uuid.uuid4()} -->\n'
+        '<module name="Checker"><module name="JavadocPackage"/></module>\n'
+    )
+    student = m.User.query.filter_by(name='Student1').one()
+    package_info = b'/** My package. */\npackage my.pkg;\n'
+
+    def submit(code, with_package_info=True):
+        data = {'file1': (io.BytesIO(code), 'A.java')}
+        if with_package_info:
+            data['file2'] = (io.BytesIO(package_info), 'package-info.java')
+        with logged_in(student):
+            return test_client.req(
+                'post',
+                f'/api/v1/assignments/{assignment.id}/submission',
+                201,
+                real_data=data,
+            )
+
+    def run_linter(work):
+        linter_id = test_client.req(
+            'post',
+            f'/api/v1/assignments/{assignment.id}/linter',
+            200,
+            data={'name': 'Checkstyle', 'cfg': cfg},
+        )['id']
+        code_id = session.query(m.File.id).filter(
+            m.File.work_id == work['id'],
+            m.File.name == 'A.java',
+        ).one()[0]
+        res = test_client.req(
+            'get',
+            f'/api/v1/code/{code_id}',
+            200,
+            query={'type': 'linter-feedback'},
+        )
+        test_client.req('delete', f'/api/v1/linters/{linter_id}', 204)
+        return res
+
+    with describe('first run should find the package-info.java'):
+        work = submit(b'package my.pkg;\nclass A {}\n')
+        with logged_in(teacher_user):
+            assert run_linter(work) == {}
+
+    with describe('unchanged package-info.java should still be linted'):
+        work = submit(b'package my.pkg;\nclass A { int a; }\n')
+        with logged_in(teacher_user):
+            assert run_linter(work) == {}
+
+    with describe('missing package-info.java should be reported'):
+        work = submit(b'package my.pkg;\nclass A {}\n', False)
+        with logged_in(teacher_user):
+            assert run_linter(work) != {}
+
+
 @pytest.mark.parametrize('with_works', [True], indirect=True)
 def test_already_running_linter(
     teacher_user, test_client, assignment, logged_in, error_template,
@@ -10,6 +10,7 @@ import pylti1p3.service_connector
 import pylti1p3.assignments_grades
 
 import helpers
+import psef.helpers
 import psef.models as m
 import psef.signals as signals
 import requests_stubs
@@ -687,3 +688,101 @@ def test_find_assignment_without_resource_id(
         res = lti1p3_provider.find_assignment(lti_course, None, None)
         assert res is None
         assert not spy.called
+
+
+def test_passback_with_retries(describe, monkeypatch, stub_function_class):
+    # pylint: disable=protected-access
+    passback_with_retries = m.lti_provider._passback_with_retries
+    monkeypatch.setattr(psef.helpers.time, 'sleep', lambda _: None)
+
+    with describe('should stop after the first successful try'):
+        send = stub_function_class()
+        passback_with_retries(send, 3)
+        assert send.called_amount == 1
+
+    with describe('should retry failing passbacks'):
+        tries = []
+
+        def send_fail_once():
+            tries.append(None)
+            if len(tries) == 1:
+                raise ValueError
+
+        passback_with_retries(send_fail_once, 3)
+        assert len(tries) == 2
+
+    with describe('should raise the last error if all tries fail'):
+        send = stub_function_class(raise_pylti1p3_exc)
+        with pytest.raises(pylti1p3.exception.LtiException):
+            passback_with_retries(send, 3)
+        assert send.called_amount == 3
+
+
+def test_lti1p1_passback_grades_retries_only_failed(
+    describe, logged_in, admin_user, watch_signal, test_client, session, app,
+    monkeypatch
+):
+    # pylint: disable=protected-access
+    with describe('setup'), logged_in(admin_user):
+        watch_signal(signals.WORK_CREATED, clear_all_but=[])
+        watch_signal(signals.GRADE_UPDATED, clear_all_but=[])
+        watch_signal(signals.ASSIGNMENT_STATE_CHANGED, clear_all_but=[])
+        monkeypatch.setattr(psef.helpers.time, 'sleep', lambda _: None)
+
+        course = helpers.create_lti_course(session, app, admin_user)
+        assig = helpers.create_lti_assignment(session, course, state='done')
+        subs = []
+        for _ in range(2):
+            student = helpers.create_user_with_role(session, 'Student', course)
+            sub = helpers.to_db_object(
+                helpers.create_submission(
+                    test_client, assig.id, for_user=student
+                ), m.Work
+            )
+            sub.set_grade(5.0, m.User.resolve(admin_user))
+            subs.append(sub)
+        session.commit()
+        ok_sub, failing_sub = subs
+
+        passed_back = []
+        fail = True
+
+        def passback_grade(_self, sub, *, initial, run):
+            def send():
+                if fail and sub.id == failing_sub.id:
+                    raise ValueError('LMS is down')
+                passed_back.append(sub.id)
+
+            run(send)
+
+        monkeypatch.setattr(
+            m.LTI1p1Provider, '_passback_grade', passback_grade
+        )
+
+        retries = []
+
+        class Task:
+            def retry(self, args, exc):
+                retries.append(args)
+                return exc
+
+        monkeypatch.setattr(m.lti_provider, 'current_task', Task())
+
+        def is_passed_back(sub):
+            return m.GradeHistory.query.filter_by(work=sub).one().passed_back
+
+    with describe('should only retry the failed submissions'):
+        with pytest.raises(ValueError):
+            m.LTI1p1Provider._passback_grades(
+                ([ok_sub.id, failing_sub.id], assig.id)
+            )
+        assert passed_back == [ok_sub.id]
+        assert retries == [([failing_sub.id], assig.id)]
+        assert is_passed_back(ok_sub)
+        assert not is_passed_back(failing_sub)
+
+    with describe('retry should not pass back the others again'):
+        fail = False
+        m.LTI1p1Provider._passback_grades(retries[0])
+        assert passed_back == [ok_sub.id, failing_sub.id]
+        assert is_passed_back(failing_sub)
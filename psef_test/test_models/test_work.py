@@ -0,0 +1,154 @@
+import datetime
+import threading
+
+import pytest
+from sqlalchemy import orm
+
+import psef
+import helpers
+import psef.models as m
+from cg_dt_utils import DatetimeWithTimezone
+
+
+def get_latest_works(assig_id):
+    return {
+        user_id: work_id
+        for user_id, work_id in m.LatestWork.query.filter_by(
+            assignment_id=assig_id
+        ).with_entities(m.LatestWork.user_id, m.LatestWork.work_id)
+    }
+
+
+def test_latest_work_table(
+    describe, logged_in, test_client, session, admin_user, tomorrow
+):
+    with describe('setup'), logged_in(admin_user):
+        course = helpers.create_course(test_client)
+        assig_id = helpers.get_id(
+            helpers.create_assignment(
+                test_client, course, 'open', deadline=tomorrow
+            )
+        )
+        student1 = helpers.create_user_with_role(session, 'Student', course)
+        student2 = helpers.create_user_with_role(session, 'Student', course)
+
+    with describe('Table is updated when submissions are created'):
+        with logged_in(student1):
+            sub1 = helpers.get_id(
+                helpers.create_submission(test_client, assig_id)
+            )
+            sub2 = helpers.get_id(
+                helpers.create_submission(test_client, assig_id)
+            )
+        with logged_in(student2):
+            sub3 = helpers.get_id(
+                helpers.create_submission(test_client, assig_id)
+            )
+
+        assert get_latest_works(assig_id) == {
+            student1.id: sub2,
+            student2.id: sub3,
+        }
+        assert not m.LatestWork.find_inconsistencies(assig_id)
+
+    with describe('Table is updated when submissions are deleted'
+                  ), logged_in(admin_user):
+        test_client.req('delete', f'/api/v1/submissions/{sub2}', 204)
+        assert get_latest_works(assig_id) == {
+            student1.id: sub1,
+            student2.id: sub3,
+        }
+
+        test_client.req('delete', f'/api/v1/submissions/{sub3}', 204)
+        assert get_latest_works(assig_id) == {student1.id: sub1}
+        assert not m.LatestWork.find_inconsistencies(assig_id)
+
+        assig = m.Assignment.query.get(assig_id)
+        assert [w.id for w in assig.get_all_latest_submissions()] == [sub1]
+
+    with describe('Inconsistencies can be found and fixed'):
+        m.LatestWork.query.filter_by(assignment_id=assig_id).delete()
+        assert m.LatestWork.find_inconsistencies(assig_id) == [
+            (assig_id, student1.id, None, sub1)
+        ]
+
+        m.LatestWork.backfill(assig_id)
+        assert get_latest_works(assig_id) == {student1.id: sub1}
+        assert not m.LatestWork.find_inconsistencies(assig_id)
+
+
+@pytest.mark.parametrize('use_transaction', [False], indirect=True)
+def test_latest_work_concurrent_submissions(describe, session, assignment):
+    if psef.models.db.engine.dialect.name != 'postgresql':
+        pytest.skip('Concurrent transactions need postgresql')
+
+    with describe('setup'):
+        user_id = m.User.query.filter_by(name='Student1').one().id
+        assig_id = assignment.id
+        now = DatetimeWithTimezone.utcnow()
+        connections = []
+
+        def make_session():
+            conn = psef.models.db.engine.connect()
+            connections.append(conn)
+            return orm.Session(bind=conn)
+
+        def add_work(ses, created_at):
+            work = m.Work(
+                assignment_id=assig_id,
+                user_id=user_id,
+                created_at=created_at,
+            )
+            ses.add(work)
+            ses.flush()
+            return work.id
+
+        def submit_concurrently(newer, older):
+            """Create a submission at ``newer`` in a transaction that commits
+            after a concurrent transaction created a submission at ``older``.
+            """
+            ses1, ses2 = make_session(), make_session()
+            errors = []
+
+            def submit_older():
+                try:
+                    add_work(ses2, older)
+                    ses2.commit()
+                except Exception as exc:  # pylint: disable=broad-except
+                    errors.append(exc)
+                    ses2.rollback()
+
+            newer_id = add_work(ses1, newer)
+            thread = threading.Thread(target=submit_older)
+            thread.start()
+            thread.join(0.5)
+            # The other transaction should wait until we are done.
+            assert thread.is_alive()
+            ses1.commit()
+            thread.join()
+
+            assert errors == []
+            ses1.close()
+            ses2.close()
+            return newer_id
+
+        def get_latest():
+            session.expire_all()
+            return get_latest_works(assig_id).get(user_id)
+
+    try:
+        with describe('first submissions of an author should not conflict'):
+            newest = submit_concurrently(now, now - datetime.timedelta(1))
+            assert get_latest() == newest
+            assert not m.LatestWork.find_inconsistencies(assig_id)
+
+        with describe('an older submission should not overwrite a newer one'):
+            newest = submit_concurrently(
+                now + datetime.timedelta(2),
+                now + datetime.timedelta(1),
+            )
+            assert get_latest() == newest
+            assert not m.LatestWork.find_inconsistencies(assig_id)
+    finally:
+        for conn in connections:
+            conn.close()
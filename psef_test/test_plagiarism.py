@@ -4,7 +4,9 @@ import os
 import csv
 import json
 import math
+import uuid
 import random
+import datetime
 import tempfile
 import itertools
 import contextlib
@@ -14,6 +16,7 @@ import pytest
 from sqlalchemy import func
 
 import psef
+import helpers
 import psef.models as models
 from helpers import create_marker
 
@@ -1041,5 +1044,429 @@ def test_get_plagiarism_providers(test_client):
                                 'placeholder': 'default: 50',
                             }],
             },
+            {
+                'name': 'Winnow',
+                'base_code': True,
+                'progress': True,
+                'options': [{
+                    'name': 'suffixes',
+                    'title': 'Suffixes to include',
+                    'description': str,
+                    'type': 'strvalue',
+                    'mandatory': bool,
+                    'placeholder': '.xxx, .yyy',
+                },
+                            {
+                                'name': 'simil',
+                                'title': 'Minimal similarity',
+                                'description': str,
+                                'type': 'numbervalue',
+                                'mandatory': bool,
+                                'placeholder': 'default: 50',
+                            }],
+            },
         ],
     )
+
+
+WINNOW_CODE = '\n'.join([
+    'def fib(n):',
+    '    if n < 2:',
+    '        return n',
+    '    a, b = 0, 1',
+    '    for i in range(n):',
+    '        a, b = b, a + b',
+    '    print("value", a)',
+    '    return a',
+    '',
+    'def other(xs):',
+    '    total = 0',
+    '    for x in xs:',
+    '        if x > 10:',
+    '            total += x * 2',
+    '        else:',
+    '            total -= x',
+    '    return total',
+])
+
+
+def test_winnow_provider(app, describe):
+    from psef.plagiarism_providers.winnow import Winnow
+
+    code = WINNOW_CODE
+    renamed = code.replace('fib', 'fibo').replace('total', 'tot')
+    different = 'import os\nprint(os.listdir("."))\n'
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        restored_dir = os.path.join(tmpdir, 'restored')
+        archive_dir = os.path.join(tmpdir, 'archive')
+        result_dir = os.path.join(tmpdir, 'result')
+        os.mkdir(result_dir)
+        os.mkdir(archive_dir)
+        for name, content in [
+            ('sub1', code), ('sub2', renamed), ('sub3', different)
+        ]:
+            os.makedirs(os.path.join(restored_dir, name, 'top'))
+            with open(os.path.join(restored_dir, name, 'top', 'a.py'),
+                      'w') as f:
+                f.write(content)
+
+        with describe('renamed identifiers should still be found'):
+            lines = []
+            ok, _ = Winnow.run_program(
+                [
+                    restored_dir, '--result-dir', result_dir,
+                    '--archive-dir', archive_dir, '--progress', 'PROG',
+                    '--simil', '50'
+                ],
+                lambda line: lines.append(line) or False,
+            )
+            assert ok
+            assert 'PROG 3 / 3' in lines
+
+            with open(os.path.join(result_dir, 'matches.csv')) as f:
+                rows = list(csv.reader(f, delimiter=';'))
+            assert len(rows) == 1
+            assert rows[0][:4] == ['sub1', 'sub2', '100.0', '100.0']
+            # Lines start at zero and matches are given per file.
+            assert len(rows[0]) == 10
+            assert rows[0][4:6] == ['top/a.py', '0']
+            assert rows[0][7:9] == ['top/a.py', '0']
+
+        with describe('progress lines should be parsed'):
+            assert Winnow.get_progress_from_line('PROG', 'PROG 2 / 3\n') == (
+                2, 3
+            )
+            assert Winnow.get_progress_from_line('PROG', 'other') is None
+
+
+def test_winnow_incremental(app, describe, make_function_spy, monkeypatch):
+    from psef.plagiarism_providers import winnow
+
+    renamed = WINNOW_CODE.replace('fib', 'fibo').replace('total', 'tot')
+    add_spy = make_function_spy(winnow._Index, 'add', pass_self=True)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        restored_dir = os.path.join(tmpdir, 'restored')
+        archive_dir = os.path.join(tmpdir, 'archive')
+        result_dir = os.path.join(tmpdir, 'result')
+        for dirname in [restored_dir, archive_dir, result_dir]:
+            os.mkdir(dirname)
+        index_name = str(uuid.uuid4())
+
+        def add_sub(name, content):
+            # Submissions are linked from the corpus cache by the task.
+            cached_dir = os.path.join(tmpdir, 'corpus', name)
+            os.makedirs(os.path.join(cached_dir, 'top'))
+            with open(os.path.join(cached_dir, 'top', 'a.py'), 'w') as f:
+                f.write(content)
+            os.symlink(cached_dir, os.path.join(restored_dir, name))
+
+        def run():
+            ok, _ = winnow.Winnow.run_program(
+                [
+                    restored_dir, '--result-dir', result_dir,
+                    '--archive-dir', archive_dir,
+                    '--progress', 'PROG', '--simil', '50',
+                    '--index-name', index_name,
+                ],
+                lambda _: False,
+            )
+            assert ok
+            with open(os.path.join(result_dir, 'matches.csv')) as f:
+                return [row[:4] for row in csv.reader(f, delimiter=';')]
+
+        add_sub('sub1', WINNOW_CODE)
+        add_sub('sub2', renamed)
+
+        with describe('first run should index all submissions'):
+            assert run() == [['sub1', 'sub2', '100.0', '100.0']]
+            assert add_spy.called_amount == 2
+
+        with describe('second run should not compare anything again'):
+            assert run() == [['sub1', 'sub2', '100.0', '100.0']]
+            assert add_spy.called_amount == 0
+
+        with describe('new submissions should be compared to the index'):
+            add_sub('sub3', WINNOW_CODE)
+            assert run() == [
+                ['sub1', 'sub2', '100.0', '100.0'],
+                ['sub1', 'sub3', '100.0', '100.0'],
+                ['sub2', 'sub3', '100.0', '100.0'],
+            ]
+            assert add_spy.called_amount == 1
+
+        with describe('fingerprints in too many submissions are ignored'):
+            monkeypatch.setattr(winnow, '_MAX_DOCUMENTS_PER_FINGERPRINT', 2)
+            assert run() == []
+
+
+def test_corpus_cache(
+    describe, logged_in, assignment, test_client, teacher_user, session,
+    app, make_function_spy
+):
+    with describe('setup'):
+        student = models.User.query.filter_by(name='Student1').one()
+        content = f'print("{uuid.uuid4()}")\n'.encode('utf8')
+        with logged_in(teacher_user):
+            sub = helpers.create_submission(
+                test_client,
+                assignment.id,
+                submission_data=(io.BytesIO(content), 'code.py'),
+                for_user=student,
+            )
+        work = models.Work.query.get(sub['id'])
+        code_file = models.File.query.filter_by(
+            work=work, is_directory=False
+        ).one()
+        stored_path = code_file.get_diskname()
+        blob_path = psef.files._get_blob_path(
+            psef.files.get_file_digest(stored_path)
+        )
+
+        # The cache should be on the same file system as the uploads.
+        corpus = psef.plagiarism.CorpusCache(
+            os.path.join(app.config['UPLOAD_DIR'], f'corpus-{uuid.uuid4()}')
+        )
+        copy_spy = make_function_spy(psef.files, 'copy_stored_file')
+
+        def get_dir():
+            mapping = models.Work.get_file_children_mappings(
+                [work], models.FileOwner.teacher
+            )[work.id]
+            return corpus.get_submission_dir(work, mapping)
+
+        def get_restored_files(path):
+            return [
+                os.path.join(root, f) for root, _, fs in os.walk(path)
+                for f in fs
+            ]
+
+    with describe('a miss should restore the submission'):
+        path, tree = get_dir()
+        assert copy_spy.called_amount == 1
+        restored, = get_restored_files(path)
+        with open(restored, 'rb') as f:
+            assert f.read() == content
+        assert psef.files.is_same_stored_file(restored, stored_path)
+        assert os.stat(blob_path).st_nlink == 3
+
+        top, = os.listdir(path)
+        assert tree.name == top
+        assert [e.id for e in tree.entries] == [code_file.id]
+
+    with describe('a hit should not restore the submission again'):
+        assert get_dir() == (path, tree)
+        assert copy_spy.called_amount == 0
+
+    with describe('a changed submission should be restored again'):
+        code_file.name = 'renamed.py'
+        session.commit()
+        new_path, _ = get_dir()
+        assert new_path != path
+        assert copy_spy.called_amount == 1
+        assert os.stat(blob_path).st_nlink == 4
+
+    with describe('recently used entries should not be pruned'):
+        corpus.prune(datetime.timedelta(days=1))
+        assert os.path.isdir(path)
+        assert os.path.isdir(new_path)
+
+    with describe('pruning should release the links to the blob'):
+        psef.files.delete_stored_file(stored_path)
+        # The cache keeps the blob alive after the file itself is deleted.
+        assert os.stat(blob_path).st_nlink == 3
+
+        for entry in [path, new_path]:
+            os.utime(entry, (0, 0))
+        corpus.prune(datetime.timedelta(days=1))
+        assert not os.path.exists(blob_path)
+        assert os.listdir(corpus.base_dir) == []
+
+
+@pytest.mark.parametrize('bb_tar_gz', ['correct.tar.gz'])
+def test_plagiarism_run_reuses_corpus_cache(
+    bb_tar_gz, describe, logged_in, assignment, test_client, teacher_user,
+    monkeypatch, monkeypatch_celery, make_function_spy, app
+):
+    with describe('setup'):
+        bb_tar_gz = (
+            f'{os.path.dirname(__file__)}/'
+            f'../test_data/test_blackboard/{bb_tar_gz}'
+        )
+        corpus_dir = os.path.realpath(
+            os.path.join(
+                app.config['UPLOAD_DIR'], psef.tasks._PLAGIARISM_CORPUS_DIR
+            )
+        )
+
+        def callback(call, **kwargs):
+            data_dir = call[3]
+            for name in os.listdir(data_dir):
+                target = os.path.realpath(os.path.join(data_dir, name))
+                assert target.startswith(corpus_dir + os.sep)
+
+            result_dir = call[call.index('-r') + 1]
+            open(os.path.join(result_dir, 'computer_matches.csv'), 'w').close()
+
+        monkeypatch.setattr(subprocess, 'Popen', make_popen_stub(callback))
+        copy_spy = make_function_spy(psef.files, 'copy_stored_file')
+
+        with logged_in(teacher_user):
+            test_client.req(
+                'post',
+                f'/api/v1/assignments/{assignment.id}/submissions/',
+                204,
+                real_data={'file': (bb_tar_gz, 'bb.tar.gz')},
+            )
+
+        def run(simil):
+            with logged_in(teacher_user):
+                plag = test_client.req(
+                    'post',
+                    f'/api/v1/assignments/{assignment.id}/plagiarism',
+                    200,
+                    data={
+                        'provider': 'JPlag',
+                        'old_assignments': [],
+                        'lang': 'Python 3',
+                        'simil': simil,
+                        'has_old_submissions': False,
+                        'has_base_code': False,
+                    },
+                )
+                test_client.req(
+                    'get',
+                    f'/api/v1/plagiarism/{plag["id"]}',
+                    200,
+                    result={'state': 'done', '__allow_extra__': True},
+                )
+
+    with describe('the first run should restore the submissions'):
+        run(40)
+        assert copy_spy.called_amount > 0
+
+    with describe('a second run should reuse the restored submissions'):
+        run(50)
+        assert copy_spy.called_amount == 0
+
+
+def test_process_output_csv(
+    describe, logged_in, assignment, test_client, teacher_user, session
+):
+    with describe('setup'):
+        names = ['Student1', 'Student2', 'Student3', 'Œlµo']
+        works = []
+        with logged_in(teacher_user):
+            for name in names:
+                sub = helpers.create_submission(
+                    test_client,
+                    assignment.id,
+                    for_user=models.User.query.filter_by(name=name).one(),
+                )
+                works.append(models.Work.query.get(sub['id']))
+        sub_a, sub_b, sub_c, sub_d = [work.id for work in works]
+        lookup = dict(zip('abcd', [sub_a, sub_b, sub_c, sub_d]))
+
+        mappings = models.Work.get_file_children_mappings(
+            works, models.FileOwner.teacher
+        )
+
+        def to_tree(code, mapping):
+            if not code.is_directory:
+                return psef.files.FileTree(
+                    name=code.name, id=code.id, entries=None
+                )
+            return psef.files.FileTree(
+                name=code.name,
+                id=code.id,
+                entries=[
+                    to_tree(child, mapping) for child in mapping[code.id]
+                ],
+            )
+
+        trees = {}
+        paths = {}
+        for work in works:
+            mapping = mappings[work.id]
+            root, = mapping[None]
+            trees[work.id] = psef.files.FileTree(
+                name=str(work.id), id=-1, entries=[to_tree(root, mapping)]
+            )
+            file_ids = {
+                child.id
+                for children in mapping.values() for child in children
+                if not child.is_directory
+            }
+            paths[work.id] = sorted(
+                path for path, f_id in trees[work.id].get_path_index().items()
+                if f_id in file_ids
+            )
+
+        def file_path(work_id, idx):
+            return paths[work_id][idx]
+
+        def file_id(work_id, idx):
+            return trees[work_id].get_path_index()[file_path(work_id, idx)]
+
+        rows = [
+            ['a', 'b', 50, 40, file_path(sub_a, 0), 0, 5,
+             file_path(sub_b, 0), 1, 6],
+            # A duplicate pair, in the other order.
+            ['b', 'a', 30, 20, file_path(sub_b, 1), 2, 3,
+             file_path(sub_a, 1), 4, 5],
+            # The unknown path should only skip its own match.
+            ['a', 'c', 10, 20, file_path(sub_a, 0), 0, 1,
+             'unknown/path', 0, 1, file_path(sub_a, 1), 1, 2,
+             file_path(sub_c, 0), 3, 4],
+            # Both submissions are old.
+            ['c', 'd', 100, 100, file_path(sub_c, 0), 0, 1,
+             file_path(sub_d, 0), 0, 1],
+            # Matches within a single submission are ignored.
+            ['a', 'a', 100, 100, file_path(sub_a, 0), 0, 1,
+             file_path(sub_a, 1), 0, 1],
+        ]
+
+        run = models.PlagiarismRun(json_config='[]', assignment=assignment)
+        session.add(run)
+        session.commit()
+
+    with describe('cases and matches should be stored'
+                  ), tempfile.NamedTemporaryFile('w', newline='') as f:
+        csv.writer(f, delimiter=';').writerows(rows)
+        f.flush()
+
+        psef.plagiarism.process_output_csv(
+            run, lookup, {sub_c, sub_d}, trees, f.name, batch_size=1
+        )
+        session.commit()
+
+        cases = {
+            (case.work1_id, case.work2_id): case
+            for case in models.PlagiarismCase.query.filter_by(
+                plagiarism_run_id=run.id
+            )
+        }
+        assert set(cases) == {(sub_a, sub_b), (sub_a, sub_c)}
+        assert cases[(sub_a, sub_b)].match_max == 50
+        assert cases[(sub_a, sub_b)].match_avg == 45
+        assert cases[(sub_a, sub_c)].match_max == 20
+        assert cases[(sub_a, sub_c)].match_avg == 15
+
+        def get_matches(case):
+            return sorted(
+                (
+                    m.file1_id, m.file1_start, m.file1_end, m.file2_id,
+                    m.file2_start, m.file2_end
+                ) for m in models.PlagiarismMatch.query.filter_by(
+                    plagiarism_case_id=case.id
+                )
+            )
+
+        assert get_matches(cases[(sub_a, sub_b)]) == sorted([
+            (file_id(sub_a, 0), 0, 5, file_id(sub_b, 0), 1, 6),
+            (file_id(sub_b, 1), 2, 3, file_id(sub_a, 1), 4, 5),
+        ])
+        assert get_matches(cases[(sub_a, sub_c)]) == [
+            (file_id(sub_a, 1), 1, 2, file_id(sub_c, 0), 3, 4),
+        ]
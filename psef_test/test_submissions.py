@@ -892,6 +892,58 @@ def test_get_dir_contents(
             )
 
 
+@pytest.mark.parametrize(
+    'filename', ['../test_submissions/single_dir_archive.zip'], indirect=True
+)
+def test_get_dir_contents_etag(
+    test_client, logged_in, student_user, assignment_real_works
+):
+    assignment, work = assignment_real_works
+    work_id = work['id']
+    url = f'/api/v1/submissions/{work_id}/files/'
+
+    with logged_in(student_user):
+        tree, rv = test_client.req('get', url, 200, include_response=True)
+        etag = rv.headers['ETag']
+        assert not etag.startswith('W/')
+
+        rv = test_client.get(url, headers={'If-None-Match': etag})
+        assert rv.status_code == 304
+        assert rv.get_data(as_text=True) == ''
+
+        sub_id = tree['entries'][0]['id']
+        sub, rv = test_client.req(
+            'get',
+            url,
+            200,
+            query={'file_id': sub_id},
+            result=tree['entries'][0],
+            include_response=True,
+        )
+        assert rv.headers['ETag'] not in {etag, None}
+        rv = test_client.get(
+            url,
+            query_string={'file_id': sub_id},
+            headers={'If-None-Match': rv.headers['ETag']},
+        )
+        assert rv.status_code == 304
+
+        test_client.req(
+            'post',
+            url,
+            200,
+            query={'path': f'/{tree["name"]}/new_dir/'},
+        )
+        new_tree, rv = test_client.req(
+            'get', url, 200, include_response=True
+        )
+        assert rv.headers['ETag'] != etag
+        assert 'new_dir' in [e['name'] for e in new_tree['entries']]
+
+        rv = test_client.get(url, headers={'If-None-Match': etag})
+        assert rv.status_code == 200
+
+
 @pytest.mark.parametrize('user_type', ['student'])
 @pytest.mark.parametrize(
     'named_user, get_own', [
@@ -968,6 +1020,41 @@ def test_get_zip_file(
                 assert res.status_code == 404
 
 
+@pytest.mark.parametrize(
+    'filename', ['../test_submissions/multiple_dir_archive.zip'],
+    indirect=True
+)
+def test_stream_zip_file(
+    test_client, logged_in, assignment_real_works, ta_user, describe
+):
+    assignment, work = assignment_real_works
+    work_id = work['id']
+    other_student = m.User.query.filter_by(name='Student3').one()
+
+    with describe('can download as teacher'), logged_in(ta_user):
+        res = test_client.get(
+            f'/api/v1/submissions/{work_id}/zip?owner=student'
+        )
+        assert res.status_code == 200
+        assert res.mimetype == 'application/zip'
+        assert 'attachment' in res.headers['Content-Disposition']
+        files = zipfile.ZipFile(io.BytesIO(res.get_data())).infolist()
+        assert set(f.filename for f in files) == {
+            'multiple_dir_archive.zip/',
+            'multiple_dir_archive.zip/dir/single_file_work',
+            'multiple_dir_archive.zip/dir/single_file_work_copy',
+            'multiple_dir_archive.zip/dir2/single_file_work',
+            'multiple_dir_archive.zip/dir2/single_file_work_copy',
+        }
+
+    with describe('other students cannot download'
+                  ), logged_in(other_student):
+        res = test_client.get(
+            f'/api/v1/submissions/{work_id}/zip?owner=student'
+        )
+        assert res.status_code == 403
+
+
 @pytest.mark.parametrize(
     'filename', ['../test_submissions/multiple_dir_archive.zip'],
     indirect=True
@@ -231,7 +231,8 @@ def test_batch_run_auto_test(
     monkeypatch.setattr(
         m.AutoTestResult, 'clear', lambda *args: stub_clear(*args)
     )
-    monkeypatch.setattr(t, 'adjust_amount_runners', stub_function_class())
+    stub_adjust = stub_function_class()
+    monkeypatch.setattr(t, 'adjust_amount_runners_at', stub_adjust)
     monkeypatch.setattr(
         t, 'update_latest_results_in_broker', stub_function_class()
     )
@@ -281,6 +282,14 @@ def test_batch_run_auto_test(
 
     assert stub_clear.all_args[0][0].work.assignment.id == assig2.id
 
+    # The batch run of assig1 is upcoming, so runners should be started
+    # before its deadline.
+    prewarm_args, = [
+        a for a in stub_adjust.all_args
+        if a[0] == (assig1.auto_test.run.id, )
+    ]
+    assert now <= prewarm_args['eta'] <= assig1.deadline
+
 
 @pytest.mark.parametrize(
     'filename', ['../test_submissions/multiple_dir_archive.tar.gz'],